@@ -1,10 +1,13 @@
 """Top level package for html2manual."""
 
 from .config import Html2ManualConfig, load_config
+from .events import aiter_build, iter_build
 from .pipeline import build_manuals
 
 __all__ = [
     "Html2ManualConfig",
     "load_config",
     "build_manuals",
+    "iter_build",
+    "aiter_build",
 ]
@@ -1,17 +1,29 @@
 """Manual content auditing utilities."""
+
 from __future__ import annotations
 
+import json
+import os
 import re
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
+import structlog
 from bs4 import BeautifulSoup
 
 from .flatten.encoding import read_text
+from .journal import atomic_output
+from .render.cache import file_digest
+
+LOGGER = structlog.get_logger(__name__)
 
 SCROLL_PATTERN = re.compile(r"overflow(?:-[xy])?\s*:\s*(auto|scroll)", re.IGNORECASE)
 EXTERNAL_PROTOCOLS = ("http://", "https://", "mailto:", "tel:")
+AUDIT_CACHE_FILE = "audit_cache.json"
+# Bump when the audit rules change so cached results are not reused.
+AUDIT_CACHE_VERSION = 1
 
 
 @dataclass(slots=True)
@@ -24,15 +36,29 @@ class AuditIssue:
 
 
 def _is_external(reference: str) -> bool:
-    return reference.startswith(EXTERNAL_PROTOCOLS) or reference.startswith("#") or reference.startswith("data:")
+    return (
+        reference.startswith(EXTERNAL_PROTOCOLS)
+        or reference.startswith("#")
+        or reference.startswith("data:")
+    )
 
 
 def _resolve_reference(html_path: Path, reference: str) -> Path:
     return (html_path.parent / reference).resolve()
 
 
-def audit_html(path: Path) -> List[AuditIssue]:
-    """Audit a single HTML file for scrollable containers and missing assets."""
+def audit_html(path: Path, checked: Optional[Dict[Path, bool]] = None) -> List[AuditIssue]:
+    """Audit a single HTML file for scrollable containers and missing assets.
+
+    ``checked`` collects every referenced file whose existence the audit
+    depended on.
+    """
+
+    def exists(target: Path) -> bool:
+        found = target.exists()
+        if checked is not None:
+            checked[target] = found
+        return found
 
     html = read_text(path)
     soup = BeautifulSoup(html, "html.parser")
@@ -47,7 +73,8 @@ def audit_html(path: Path) -> List[AuditIssue]:
                 AuditIssue(
                     file=path,
                     issue="Scrollable container detected",
-                    suggestion="Enable overflow_fix or adjust CSS to use height:auto and overflow:visible.",
+                    suggestion="Enable overflow_fix or adjust CSS to use height:auto and "
+                    "overflow:visible.",
                 )
             )
 
@@ -71,16 +98,21 @@ def audit_html(path: Path) -> List[AuditIssue]:
                 continue
             if tag_name == "link":
                 rel = tag.get("rel")
-                rel_values = {entry.lower() for entry in rel} if isinstance(rel, list) else {str(rel).lower()} if rel else set()
+                rel_values = (
+                    {entry.lower() for entry in rel}
+                    if isinstance(rel, list)
+                    else {str(rel).lower()} if rel else set()
+                )
                 if rel_values and "stylesheet" not in rel_values:
                     continue
             asset_path = _resolve_reference(path, value)
-            if not asset_path.exists():
+            if not exists(asset_path):
                 issues.append(
                     AuditIssue(
                         file=path,
                         issue=f"Missing asset: {value}",
-                        suggestion="Ensure the file exists relative to the HTML document or adjust the reference.",
+                        suggestion="Ensure the file exists relative to the HTML document or adjust "
+                        "the reference.",
                     )
                 )
 
@@ -91,7 +123,7 @@ def audit_html(path: Path) -> List[AuditIssue]:
         if not isinstance(href, str) or not href or _is_external(href):
             continue
         target = _resolve_reference(path, href)
-        if target.suffix.lower() in {".html", ".htm"} and not target.exists():
+        if target.suffix.lower() in {".html", ".htm"} and not exists(target):
             issues.append(
                 AuditIssue(
                     file=path,
@@ -103,13 +135,98 @@ def audit_html(path: Path) -> List[AuditIssue]:
     return issues
 
 
-def audit_manual(input_dir: Path, pattern: str) -> List[AuditIssue]:
-    """Audit all HTML files matching ``pattern`` relative to ``input_dir``."""
+class AuditCache:
+    """Audit results of previous runs, keyed by page content and whether what it references exists.
+
+    A page is audited again only when its bytes changed or one of the assets
+    or pages it references appeared or disappeared, so the cached issues are
+    exactly what a full audit would report. Paths are stored relative to
+    ``root`` so a cache restored into another checkout still applies.
+    """
+
+    def __init__(self, path: Path, root: Path) -> None:
+        self.path = path
+        self.root = root.resolve()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._seen: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == AUDIT_CACHE_VERSION:
+                    self._pages = dict(data.get("pages", {}))
+            except (OSError, ValueError, AttributeError) as exc:
+                LOGGER.warning("audit_cache_unreadable", path=str(path), error=str(exc))
+
+    def _key(self, path: Path) -> str:
+        return Path(os.path.relpath(path.resolve(), self.root)).as_posix()
+
+    def audit(self, path: Path) -> List[AuditIssue]:
+        """Return the audit of ``path``, reusing the cached result while it still applies."""
+
+        key = self._key(path)
+        digest = file_digest(path)
+        with self._lock:
+            entry = self._pages.get(key)
+        if (
+            entry is not None
+            and entry.get("digest") == digest
+            and self._references_unchanged(entry)
+        ):
+            issues = [
+                AuditIssue(file=path, issue=issue, suggestion=suggestion)
+                for issue, suggestion in entry["issues"]
+            ]
+            with self._lock:
+                self.hits += 1
+                self._seen[key] = entry
+            return issues
+        checked: Dict[Path, bool] = {}
+        issues = audit_html(path, checked)
+        entry = {
+            "digest": digest,
+            "references": {self._key(target): found for target, found in checked.items()},
+            "issues": [[issue.issue, issue.suggestion] for issue in issues],
+        }
+        with self._lock:
+            self.misses += 1
+            self._seen[key] = entry
+        return issues
+
+    def _references_unchanged(self, entry: Dict[str, Any]) -> bool:
+        references = entry.get("references")
+        if not isinstance(references, dict):
+            return False
+        return all((self.root / target).exists() == found for target, found in references.items())
+
+    def save(self) -> None:
+        """Write the pages audited this run; pages no longer audited are dropped."""
+
+        with self._lock:
+            payload = {"version": AUDIT_CACHE_VERSION, "pages": dict(sorted(self._seen.items()))}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_output(self.path) as partial:
+            partial.write_text(json.dumps(payload), encoding="utf-8")
+        LOGGER.info("audit_cache_stats", hits=self.hits, misses=self.misses)
+
+
+def audit_manual(
+    input_dir: Path, pattern: str, cache: Optional[AuditCache] = None
+) -> List[AuditIssue]:
+    """Audit all HTML files matching ``pattern`` relative to ``input_dir``.
+
+    With ``cache`` unchanged pages are not parsed again and the cache is saved
+    afterwards.
+    """
 
     issues: List[AuditIssue] = []
     for html_file in sorted(input_dir.glob(pattern)):
-        issues.extend(audit_html(html_file))
+        issues.extend(cache.audit(html_file) if cache is not None else audit_html(html_file))
+    if cache is not None:
+        cache.save()
     return issues
 
 
-__all__ = ["AuditIssue", "audit_html", "audit_manual"]
+__all__ = ["AUDIT_CACHE_FILE", "AuditCache", "AuditIssue", "audit_html", "audit_manual"]
@@ -0,0 +1,179 @@
+"""Measure the installed rendering engines and pick the fastest correct one."""
+
+from __future__ import annotations
+
+import json
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import structlog
+from pypdf import PdfReader
+
+from .config import Html2ManualConfig
+from .menu_parser import SectionMapping
+from .pipeline import make_processor
+from .render.registry import RendererFactory, renderer_factories
+
+LOGGER = structlog.get_logger(__name__)
+CALIBRATION_FILE = "renderer_calibration.json"
+
+
+@dataclass(slots=True)
+class EngineResult:
+    """How one engine did on the calibration sample."""
+
+    name: str
+    passed: bool
+    seconds: Optional[float] = None
+    pages: int = 0
+    error: Optional[str] = None
+
+    @property
+    def seconds_per_page(self) -> Optional[float]:
+        return self.seconds / self.pages if self.seconds is not None and self.pages else None
+
+
+@dataclass(slots=True)
+class Calibration:
+    sample: List[str]
+    engines: List[EngineResult] = field(default_factory=list)
+    chosen: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        engines = [asdict(result) for result in self.engines]
+        return {"chosen": self.chosen, "sample": self.sample, "engines": engines}
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2), encoding="utf-8")
+
+
+def calibration_path(config: Html2ManualConfig) -> Path:
+    return config.output_dir / ".cache" / CALIBRATION_FILE
+
+
+def load_choice(config: Html2ManualConfig) -> Optional[str]:
+    """Return the engine picked by the last calibration run, if any."""
+
+    path = calibration_path(config)
+    try:
+        chosen = json.loads(path.read_text(encoding="utf-8")).get("chosen")
+    except (OSError, ValueError, AttributeError):
+        return None
+    return chosen if isinstance(chosen, str) else None
+
+
+def sample_pages(sections: SectionMapping, count: int) -> List[Path]:
+    """Pick up to ``count`` distinct existing pages spread evenly over the manual."""
+
+    pages = list(
+        dict.fromkeys(path for files in sections.values() for path in files if path.exists())
+    )
+    if len(pages) <= count:
+        return pages
+    step = len(pages) / count
+    return [pages[int(index * step)] for index in range(count)]
+
+
+def check_output(pdfs: Sequence[Path], expected_pages: int) -> Optional[str]:
+    """Return why an engine's output is wrong, or ``None`` when it looks correct.
+
+    Every input page must produce a readable PDF page; engines start each
+    HTML file on a new page, so fewer pages means content was dropped.
+    """
+
+    pages = 0
+    for pdf in pdfs:
+        if not pdf.is_file() or pdf.stat().st_size == 0:
+            return f"missing output {pdf.name}"
+        try:
+            pages += len(PdfReader(str(pdf)).pages)
+        except Exception as exc:  # pypdf raises several unrelated error types
+            return f"unreadable output {pdf.name}: {exc}"
+    if pages < expected_pages:
+        return f"{pages} PDF pages for {expected_pages} HTML pages"
+    return None
+
+
+def _measure(
+    name: str,
+    factory: RendererFactory,
+    config: Html2ManualConfig,
+    pages: Sequence[Path],
+    scratch: Path,
+) -> EngineResult:
+    renderer: Any = None
+    try:
+        renderer = factory(config, None)
+        started = time.perf_counter()
+        pdfs = renderer.render("calibration", pages, scratch / name)
+        seconds = time.perf_counter() - started
+    except Exception as exc:  # a missing or broken engine just drops out
+        return EngineResult(name=name, passed=False, error=str(exc) or type(exc).__name__)
+    finally:
+        close = getattr(renderer, "close", None)
+        if callable(close):
+            close()
+    error = check_output(pdfs, len(pages))
+    return EngineResult(
+        name=name, passed=error is None, seconds=seconds, pages=len(pages), error=error
+    )
+
+
+def calibrate(
+    config: Html2ManualConfig,
+    sections: SectionMapping,
+    factories: Optional[Mapping[str, RendererFactory]] = None,
+) -> Calibration:
+    """Render a sample of flattened pages with every engine and choose the fastest that passes.
+
+    The result is written to ``output_dir/.cache/renderer_calibration.json``,
+    where ``renderer: auto`` picks it up.
+    """
+
+    factories = factories if factories is not None else renderer_factories()
+    sources = sample_pages(sections, config.calibration_pages)
+    calibration = Calibration(sample=[str(path) for path in sources])
+    processor = make_processor(config)
+    with tempfile.TemporaryDirectory(prefix="html2manual-calibrate-") as tmp:
+        scratch = Path(tmp)
+        flattened: List[Path] = []
+        # The index prefix keeps same-named pages from different folders apart.
+        for index, source in enumerate(sources):
+            destination = scratch / "flattened" / f"{index:03d}_{source.name}"
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            processor.flatten_to_file(source, destination)
+            flattened.append(destination)
+        for name, factory in factories.items():
+            result = _measure(name, factory, config, flattened, scratch)
+            LOGGER.info(
+                "renderer_calibrated",
+                renderer=name,
+                passed=result.passed,
+                seconds=round(result.seconds, 3) if result.seconds is not None else None,
+                error=result.error,
+            )
+            calibration.engines.append(result)
+    passed = [
+        result for result in calibration.engines if result.passed and result.seconds is not None
+    ]
+    if passed:
+        calibration.chosen = min(passed, key=lambda result: result.seconds or 0.0).name
+    LOGGER.info("renderer_selected", renderer=calibration.chosen, sample=len(sources))
+    calibration.save(calibration_path(config))
+    return calibration
+
+
+__all__ = [
+    "CALIBRATION_FILE",
+    "Calibration",
+    "EngineResult",
+    "calibrate",
+    "calibration_path",
+    "check_output",
+    "load_choice",
+    "sample_pages",
+]
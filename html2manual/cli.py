@@ -1,18 +1,37 @@
 """Command line interface for html2manual."""
+
 from __future__ import annotations
 
+import asyncio
 import json
+from contextlib import contextmanager, suppress
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 import typer
 from rich.console import Console
 from rich.table import Table
 
-from .audit import AuditIssue, audit_manual
+from . import tracing
+from .audit import AUDIT_CACHE_FILE, AuditCache, AuditIssue, audit_manual
+from .calibration import calibrate as run_calibration
+from .calibration import calibration_path
 from .config import Html2ManualConfig, load_config
+from .journal import ConfigChangedError
 from .logging_setup import configure_logging
-from .pipeline import build_manuals, flatten_sections, parse_sections, render_sections
+from .metrics import RunMetrics
+from .perf_audit import SectionCost, estimate_sections, perf_issues
+from .pipeline import (
+    METRICS_FILE,
+    build_manuals,
+    flatten_sections,
+    load_flattened,
+    parse_sections,
+    render_sections,
+    variant_configs,
+)
+from .progress import ProgressTracker, progress_reporter
+from .server import serve as run_server
 
 app = typer.Typer(help="Generate manuals from HTML content.")
 console = Console()
@@ -45,20 +64,37 @@ def _load_runtime_config(
     input_dir: Optional[Path],
     output_dir: Optional[Path],
     verbose: bool,
+    **extra: Any,
 ) -> Html2ManualConfig:
-    overrides: Dict[str, Path | str] = {}
+    overrides: Dict[str, Any] = dict(extra)
     if input_dir:
         overrides["input_dir"] = input_dir
     if output_dir:
         overrides["output_dir"] = output_dir
     config = load_config(config_path, overrides)
     log_level = "DEBUG" if verbose or config.verbose else "INFO"
-    configure_logging(log_level)
+    configure_logging(
+        log_level,
+        queued=config.log_queue,
+        warning_burst=config.log_warning_burst,
+        aggregate_interval=config.log_aggregate_interval,
+    )
     return config
 
 
+@contextmanager
+def _resume_errors() -> Iterator[None]:
+    try:
+        yield
+    except ConfigChangedError as exc:
+        typer.echo(str(exc), err=True)
+        raise typer.Exit(code=1) from None
+
+
 @app.command()
-def init(config_path: Path = typer.Option(Path("html2manual.yaml"), help="Path to write configuration.")) -> None:
+def init(
+    config_path: Path = typer.Option(Path("html2manual.yaml"), help="Path to write configuration.")
+) -> None:
     """Write a sample configuration file."""
 
     if config_path.exists():
@@ -74,11 +110,33 @@ def flatten(
     input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
     output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    section: Optional[List[str]] = typer.Option(
+        None,
+        "--section",
+        help="Only process this section (repeatable); other outputs are left untouched.",
+    ),
+    pages: Optional[List[str]] = typer.Option(
+        None,
+        "--pages",
+        help="Only process pages whose file name matches this glob (repeatable), e.g. "
+        "'intro*.html'.",
+    ),
+    trace: Optional[Path] = typer.Option(
+        None,
+        "--trace",
+        help="Write a Chrome trace-event timeline of the run (open in Perfetto or "
+        "chrome://tracing).",
+    ),
 ) -> None:
-    cfg = _load_runtime_config(config, input_dir, output_dir, verbose)
-    sections = parse_sections(cfg)
-    flattened = flatten_sections(cfg, sections)
-    typer.echo(f"Flattened {sum(len(v) for v in flattened.values())} files into {cfg.output_dir / 'flattened'}")
+    cfg = _load_runtime_config(
+        config, input_dir, output_dir, verbose, sections=section, pages=pages
+    )
+    metrics = RunMetrics()
+    with tracing.recording(trace):
+        flattened = flatten_sections(cfg, parse_sections(cfg), metrics)
+    metrics.write(cfg.output_dir / METRICS_FILE, cfg.filtered)
+    count = sum(len(v) for v in flattened.values())
+    typer.echo(f"Flattened {count} files into {cfg.output_dir / 'flattened'}")
 
 
 @app.command()
@@ -87,18 +145,45 @@ def render(
     input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
     output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    section: Optional[List[str]] = typer.Option(
+        None,
+        "--section",
+        help="Only process this section (repeatable); other outputs are left untouched.",
+    ),
+    pages: Optional[List[str]] = typer.Option(
+        None,
+        "--pages",
+        help="Only process pages whose file name matches this glob (repeatable), e.g. "
+        "'intro*.html'.",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Continue an interrupted run from its journal (the configuration must be unchanged).",
+    ),
+    trace: Optional[Path] = typer.Option(
+        None,
+        "--trace",
+        help="Write a Chrome trace-event timeline of the run (open in Perfetto or "
+        "chrome://tracing).",
+    ),
 ) -> None:
-    cfg = _load_runtime_config(config, input_dir, output_dir, verbose)
+    cfg = _load_runtime_config(
+        config, input_dir, output_dir, verbose, sections=section, pages=pages, resume=resume or None
+    )
     flattened_root = cfg.output_dir / "flattened"
     if not flattened_root.exists():
         typer.echo("Flattened directory not found. Run 'html2manual flatten' first.")
         raise typer.Exit(code=1)
-    flattened: Dict[str, List[Path]] = {}
-    for section_dir in flattened_root.iterdir():
-        if section_dir.is_dir():
-            flattened[section_dir.name] = sorted(section_dir.glob("*.html"))
-    manuals = render_sections(cfg, flattened)
-    typer.echo(f"Rendered {len(manuals)} manuals to {cfg.output_dir / 'Manuals'}")
+    flattened = load_flattened(cfg)
+    # Every variant renders the same flattened pages.
+    targets = variant_configs(cfg) or {"": cfg}
+    with _resume_errors(), tracing.recording(trace):
+        for target in targets.values():
+            metrics = RunMetrics()
+            manuals = render_sections(target, flattened, metrics)
+            metrics.write(target.output_dir / METRICS_FILE, target.filtered)
+            typer.echo(f"Rendered {len(manuals)} manuals to {target.output_dir / 'Manuals'}")
 
 
 @app.command()
@@ -107,21 +192,172 @@ def build(
     input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
     output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    in_memory: bool = typer.Option(
+        False,
+        "--in-memory",
+        help="Keep flattened pages and chunk PDFs in a scratch area instead of output_dir.",
+    ),
+    keep_flattened: bool = typer.Option(
+        False,
+        "--keep-flattened",
+        help="With --in-memory, still write flattened pages to output_dir/flattened.",
+    ),
+    progress: bool = typer.Option(
+        True,
+        "--progress/--no-progress",
+        help="Show live progress on a terminal or log build_progress events.",
+    ),
+    section: Optional[List[str]] = typer.Option(
+        None,
+        "--section",
+        help="Only process this section (repeatable); other outputs are left untouched.",
+    ),
+    pages: Optional[List[str]] = typer.Option(
+        None,
+        "--pages",
+        help="Only process pages whose file name matches this glob (repeatable), e.g. "
+        "'intro*.html'.",
+    ),
+    resume: bool = typer.Option(
+        False,
+        "--resume",
+        help="Continue an interrupted run from its journal (the configuration must be unchanged).",
+    ),
+    trace: Optional[Path] = typer.Option(
+        None,
+        "--trace",
+        help="Write a Chrome trace-event timeline of the run (open in Perfetto or "
+        "chrome://tracing).",
+    ),
 ) -> None:
-    cfg = _load_runtime_config(config, input_dir, output_dir, verbose)
-    manuals = build_manuals(cfg)
+    cfg = _load_runtime_config(
+        config,
+        input_dir,
+        output_dir,
+        verbose,
+        in_memory=in_memory or None,
+        keep_flattened=keep_flattened or None,
+        sections=section,
+        pages=pages,
+        resume=resume or None,
+    )
+    with _resume_errors(), tracing.recording(trace):
+        if progress:
+            tracker = ProgressTracker()
+            with progress_reporter(
+                tracker, interval=cfg.progress_interval, console=Console(stderr=True)
+            ):
+                manuals = build_manuals(cfg, tracker)
+        else:
+            manuals = build_manuals(cfg)
     typer.echo(json.dumps({k: str(v) for k, v in manuals.items()}, indent=2))
 
 
+@app.command()
+def serve(
+    config: Optional[Path] = typer.Option(None, help="Path to configuration file."),
+    input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
+    output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    host: str = typer.Option("127.0.0.1", help="Address to listen on."),
+    port: int = typer.Option(8765, help="Port to listen on."),
+    max_concurrent: Optional[int] = typer.Option(None, help="Jobs to run at the same time."),
+    max_queued: Optional[int] = typer.Option(None, help="Jobs to queue before rejecting new ones."),
+) -> None:
+    """Serve build and section jobs over HTTP with warm caches."""
+
+    cfg = _load_runtime_config(
+        config,
+        input_dir,
+        output_dir,
+        verbose,
+        serve_max_concurrent=max_concurrent,
+        serve_max_queued=max_queued,
+    )
+    with suppress(KeyboardInterrupt):
+        asyncio.run(run_server(cfg, host, port))
+
+
+@app.command()
+def calibrate(
+    config: Optional[Path] = typer.Option(None, help="Path to configuration file."),
+    input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
+    output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    sample_pages: Optional[int] = typer.Option(
+        None, "--sample-pages", help="Number of sample pages to render per engine."
+    ),
+) -> None:
+    """Time every installed rendering engine on sample pages and pick the fastest correct one."""
+
+    cfg = _load_runtime_config(
+        config, input_dir, output_dir, verbose, calibration_pages=sample_pages
+    )
+    result = run_calibration(cfg, parse_sections(cfg))
+    table = Table(title=f"Renderer Calibration ({len(result.sample)} pages)")
+    table.add_column("Engine", style="cyan")
+    table.add_column("Seconds", justify="right")
+    table.add_column("s/page", justify="right")
+    table.add_column("Result")
+    for engine in result.engines:
+        per_page = engine.seconds_per_page
+        table.add_row(
+            engine.name,
+            f"{engine.seconds:.2f}" if engine.seconds is not None else "-",
+            f"{per_page:.3f}" if per_page is not None else "-",
+            "[green]ok[/green]" if engine.passed else f"[red]{engine.error}[/red]",
+        )
+    console.print(table)
+    if result.chosen is None:
+        console.print("[red]No engine produced correct output.[/red]")
+        raise typer.Exit(code=1)
+    console.print(
+        f"Selected [cyan]{result.chosen}[/cyan]; "
+        f"set 'renderer: auto' to use it ({calibration_path(cfg)})."
+    )
+
+
 @app.command()
 def audit(
     config: Optional[Path] = typer.Option(None, help="Path to configuration file."),
     input_dir: Optional[Path] = typer.Option(None, help="Override input directory."),
     output_dir: Optional[Path] = typer.Option(None, help="Override output directory."),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose logging."),
+    perf: bool = typer.Option(
+        False, "--perf", help="Also run performance rules and estimate render cost."
+    ),
+    as_json: bool = typer.Option(
+        False, "--json", help="Print the results as JSON instead of tables."
+    ),
 ) -> None:
     cfg = _load_runtime_config(config, input_dir, output_dir, verbose)
-    issues: List[AuditIssue] = audit_manual(cfg.input_dir, cfg.contents_glob)
+    cache = (
+        AuditCache(cfg.output_dir / ".cache" / AUDIT_CACHE_FILE, cfg.input_dir)
+        if cfg.audit_cache
+        else None
+    )
+    issues: List[AuditIssue] = audit_manual(cfg.input_dir, cfg.contents_glob, cache)
+    estimates: List[SectionCost] = []
+    if perf:
+        estimates = estimate_sections(parse_sections(cfg))
+        measured = {page.file: page for section in estimates for page in section.pages}
+        for page in measured.values():
+            issues.extend(perf_issues(page))
+
+    if as_json:
+        payload: Dict[str, Any] = {
+            "issues": [
+                {"file": str(i.file), "issue": i.issue, "suggestion": i.suggestion} for i in issues
+            ]
+        }
+        if perf:
+            payload["sections"] = [section.as_dict() for section in estimates]
+            payload["pages"] = [page.as_dict() for section in estimates for page in section.pages]
+        typer.echo(json.dumps(payload, indent=2))
+        return
+
+    if perf:
+        _print_estimates(estimates)
     if not issues:
         console.print("[green]No audit issues detected.[/green]")
         return
@@ -132,11 +368,34 @@ def audit(
     table.add_column("Suggestion", style="green")
 
     for issue in issues:
-        relative = issue.file.relative_to(cfg.input_dir) if issue.file.is_relative_to(cfg.input_dir) else issue.file
+        relative = (
+            issue.file.relative_to(cfg.input_dir)
+            if issue.file.is_relative_to(cfg.input_dir)
+            else issue.file
+        )
         table.add_row(str(relative), issue.issue, issue.suggestion)
 
     console.print(table)
-    console.print(f"[yellow]{len(issues)} issue(s) detected across {len({i.file for i in issues})} file(s).[/yellow]")
+    files = len({i.file for i in issues})
+    console.print(f"[yellow]{len(issues)} issue(s) detected across {files} file(s).[/yellow]")
+
+
+def _print_estimates(estimates: List[SectionCost]) -> None:
+    table = Table(title="Estimated Cost")
+    table.add_column("Section", style="cyan")
+    table.add_column("Pages", justify="right")
+    table.add_column("Flatten (s)", justify="right")
+    table.add_column("Render (s)", justify="right")
+    table.add_column("PDF (MB)", justify="right")
+    for section in estimates:
+        table.add_row(
+            section.section,
+            str(len(section.pages)),
+            f"{section.estimated_flatten_seconds:.1f}",
+            f"{section.estimated_render_seconds:.1f}",
+            f"{section.estimated_pdf_bytes / 1_048_576:.1f}",
+        )
+    console.print(table)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 """Configuration models and helpers for :mod:`html2manual`."""
+
 from __future__ import annotations
 
 from pathlib import Path
@@ -8,6 +9,28 @@ import yaml
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
 DEFAULT_CONFIG_FILE = Path("html2manual.yaml")
+VARIANTS_DIR = "variants"
+
+
+class RenderVariant(BaseModel):
+    """Render settings of one output variant; fields left unset keep the top-level value."""
+
+    name: str = Field(
+        ...,
+        pattern=r"^[A-Za-z0-9_.-]+$",
+        description="Variant name; its outputs go to output_dir/variants/<name>.",
+    )
+    page_size: Optional[str] = Field(None, description="Page size passed to the renderer.")
+    margin_top: Optional[str] = Field(None, description="Top margin for PDFs.")
+    margin_bottom: Optional[str] = Field(None, description="Bottom margin for PDFs.")
+    margin_left: Optional[str] = Field(None, description="Left margin for PDFs.")
+    margin_right: Optional[str] = Field(None, description="Right margin for PDFs.")
+    zoom: Optional[float] = Field(
+        None, description="Zoom level for wkhtmltopdf or Playwright rendering."
+    )
+    renderer: Optional[str] = Field(
+        None, description="Rendering engine, as for the top-level renderer."
+    )
 
 
 class Html2ManualConfig(BaseModel):
@@ -17,11 +40,25 @@ class Html2ManualConfig(BaseModel):
     output_dir: Path = Field(..., description="Directory to place generated artifacts.")
     menu_file: str = Field("menu.html", description="Menu file used to infer sections.")
     contents_glob: str = Field(
-        "Contents/**/*.html", description="Glob pattern for discovering HTML content when no menu is present."
+        "Contents/**/*.html",
+        description="Glob pattern for discovering HTML content when no menu is present.",
     )
     fallback_strategy: str = Field(
         "prefix",
-        description="Fallback grouping strategy when no menu parser succeeds (single, prefix, or subfolder).",
+        description="Fallback grouping strategy when no menu parser succeeds (single, prefix, or "
+        "subfolder).",
+    )
+    sections: List[str] = Field(
+        default_factory=list,
+        description="Only process these sections; other sections' outputs are left untouched. "
+        "Empty means all.",
+    )
+    pages: List[str] = Field(
+        default_factory=list,
+        description=(
+            "Only process pages whose file name (not its directory) matches one of these glob "
+            "patterns. Empty means all."
+        ),
     )
     wkhtmltopdf_path: Optional[Path] = Field(
         None, description="Optional path to wkhtmltopdf binary; falls back to PATH if not provided."
@@ -32,7 +69,9 @@ class Html2ManualConfig(BaseModel):
     margin_left: str = Field("10mm", description="Left margin for PDFs.")
     margin_right: str = Field("10mm", description="Right margin for PDFs.")
     zoom: float = Field(1.0, description="Zoom level for wkhtmltopdf or Playwright rendering.")
-    overflow_fix_enable: bool = Field(True, description="Enable removing overflow scroll containers during flattening.")
+    overflow_fix_enable: bool = Field(
+        True, description="Enable removing overflow scroll containers during flattening."
+    )
     overflow_fix_selectors: List[str] = Field(
         default_factory=lambda: [".container"],
         description="CSS selectors targeted when removing overflow styles.",
@@ -40,14 +79,240 @@ class Html2ManualConfig(BaseModel):
     images_inline: bool = Field(True, description="Inline image assets via base64 data URIs.")
     css_inline: bool = Field(True, description="Inline external CSS stylesheets.")
     js_inline: bool = Field(True, description="Inline external JavaScript files.")
+    minify_html: bool = Field(
+        False,
+        description="After the other flatten steps, remove comments and collapse insignificant "
+        "whitespace in each page's HTML, style sheets and inline scripts (never inside <pre> or "
+        "<textarea>).",
+    )
+    js_classify: bool = Field(
+        True,
+        description="Group pages by whether printing needs their scripts and render the chunks "
+        "that do not with JavaScript disabled and no JavaScript delay.",
+    )
+    js_keep_scripts: List[str] = Field(
+        default_factory=list,
+        description="Regular expressions for scripts printing needs, searched in a script's src or "
+        "inline code; they take precedence over js_strip_scripts.",
+    )
+    js_strip_scripts: List[str] = Field(
+        default_factory=list,
+        description="Regular expressions for scripts that only drive interactive behaviour; "
+        "matching scripts are removed while flattening. Scripts matching neither list are kept.",
+    )
+    renderer: str = Field(
+        "wkhtmltopdf",
+        description="Rendering engine: 'wkhtmltopdf', 'playwright', an engine registered under the "
+        "html2manual.renderers entry point group, or 'auto' for the engine picked by 'html2manual "
+        "calibrate'.",
+    )
+    variants: List[RenderVariant] = Field(
+        default_factory=list,
+        description="During 'build' and 'render', render the manual once per variant from a single "
+        "flatten pass, into output_dir/variants/<name>. Empty renders the top-level settings into "
+        "output_dir.",
+    )
+    calibration_pages: int = Field(
+        5,
+        ge=1,
+        description="Pages 'html2manual calibrate' renders with every engine to compare them.",
+    )
     playwright_fallback: bool = Field(
-        True, description="Enable Playwright rendering fallback when wkhtmltopdf is unavailable or fails."
+        True,
+        description="Enable Playwright rendering fallback when wkhtmltopdf is unavailable or "
+        "fails.",
+    )
+    failed_page_action: str = Field(
+        "fallback",
+        pattern="^(fallback|skip)$",
+        description="What to do with a page wkhtmltopdf cannot render once its failed chunk has "
+        "been bisected down to it: 'fallback' renders just that page with Playwright, 'skip' "
+        "leaves it out. Both are listed in output_dir/failed_pages.json.",
     )
     chunk_size: int = Field(
         50,
-        description="Maximum number of HTML files to render per chunk when invoking wkhtmltopdf on Windows to avoid argument limits.",
+        description="Maximum number of HTML files to render per chunk when invoking wkhtmltopdf on "
+        "Windows to avoid argument limits.",
+    )
+    render_mode: str = Field(
+        "pages",
+        pattern="^(pages|concat)$",
+        description=(
+            "'pages' passes each flattened page to the renderer as its own document; 'concat' "
+            "merges a chunk's pages into one document with shared stylesheets hoisted once and "
+            "page breaks between pages."
+        ),
+    )
+    volume_max_pages: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Split each section's manual into volumes of at most this many PDF pages.",
+    )
+    volume_max_mb: Optional[float] = Field(
+        None,
+        gt=0,
+        description="Split each section's manual into volumes of at most this many megabytes. "
+        "Volumes break between chunks, so a single chunk above a limit forms its own volume.",
+    )
+    chunk_cache_enable: bool = Field(
+        True,
+        description="Reuse previously rendered chunk PDFs whose inputs and renderer options are "
+        "unchanged.",
+    )
+    chunk_cache_dir: Optional[Path] = Field(
+        None, description="Directory for the chunk PDF cache; defaults to output_dir/.cache/chunks."
+    )
+    chunk_cache_max_mb: int = Field(
+        2048,
+        description="Size cap for the chunk PDF cache in megabytes; least recently used entries "
+        "are evicted.",
+    )
+    render_workers: int = Field(
+        1, ge=1, description="Number of chunks rendered concurrently during 'build'."
+    )
+    pipeline_queue_size: int = Field(
+        4,
+        ge=1,
+        description="Capacity of the bounded queues between the flatten, render and merge stages.",
+    )
+    render_timeout: Optional[float] = Field(
+        None, gt=0, description="Wall-clock limit in seconds for each wkhtmltopdf process."
+    )
+    render_memory_limit_mb: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Kill a wkhtmltopdf process whose resident memory exceeds this many megabytes.",
+    )
+    render_address_space_limit_mb: Optional[int] = Field(
+        None,
+        gt=0,
+        description="Address-space rlimit in megabytes applied to each wkhtmltopdf process "
+        "(POSIX).",
+    )
+    render_retries: int = Field(1, ge=0, description="Retries for a failed or killed chunk render.")
+    render_retry_backoff: float = Field(
+        2.0,
+        ge=0,
+        description="Base delay in seconds before a retry; doubles with every further attempt.",
+    )
+    straggler_factor: float = Field(
+        0.0,
+        ge=0,
+        description="During 'build', reschedule chunks running this many times longer than the "
+        "median per-page render time (0 disables straggler handling).",
+    )
+    straggler_min_seconds: float = Field(
+        60.0,
+        ge=0,
+        description="Never treat a chunk as a straggler before it has run this many seconds.",
+    )
+    memory_budget_mb: Optional[int] = Field(
+        None,
+        gt=0,
+        description="During 'build', hold back new flatten and render work while the resident "
+        "memory of html2manual and its wkhtmltopdf processes is near this many megabytes.",
+    )
+    memory_high_water: float = Field(
+        0.9, gt=0, le=1, description="Fraction of memory_budget_mb at which new work is held back."
+    )
+    memory_low_water: float = Field(
+        0.75,
+        gt=0,
+        le=1,
+        description="Fraction of memory_budget_mb below which held-back work resumes.",
+    )
+    memory_sample_interval: float = Field(
+        0.5,
+        gt=0,
+        description="Seconds between memory samples for the budget and the peak_rss_mb metrics.",
+    )
+    in_memory: bool = Field(
+        False,
+        description="During 'build', keep flattened pages and chunk PDFs in a scratch area instead "
+        "of output_dir.",
+    )
+    keep_flattened: bool = Field(
+        False,
+        description="With in_memory builds, still write flattened pages to output_dir/flattened.",
+    )
+    scratch_dir: Optional[Path] = Field(
+        None,
+        description="Scratch directory for in-memory builds; defaults to /dev/shm when available.",
+    )
+    build_journal: bool = Field(
+        True,
+        description="Record finished flatten, render and merge units in "
+        "output_dir/.cache/build_journal.jsonl so an interrupted build can be resumed.",
+    )
+    resume: bool = Field(
+        False,
+        description="Continue an interrupted build from its journal (the configuration must be "
+        "unchanged).",
+    )
+    dedupe_pages: bool = Field(
+        True,
+        description="Flatten and render pages that occur in several sections only once and reuse "
+        "the PDF.",
+    )
+    pdf_optimize: bool = Field(
+        False,
+        description="Deduplicate identical objects and compress content streams in merged manuals.",
+    )
+    pdf_linearize: bool = Field(
+        False,
+        description="Linearize optimized manuals for fast web view (requires the 'optimize' "
+        "extra).",
+    )
+    audit_cache: bool = Field(
+        True,
+        description="Reuse 'html2manual audit' results (output_dir/.cache/audit_cache.json) for "
+        "pages whose content and referenced files' existence are unchanged.",
+    )
+    history_scheduling: bool = Field(
+        True,
+        description=(
+            "Balance chunks by predicted render time from previous builds "
+            "(output_dir/.cache/render_history.json) and dispatch the longest chunks first."
+        ),
+    )
+    history_rebalance_drift: float = Field(
+        0.25,
+        ge=0,
+        description=(
+            "Keep the previous build's chunk boundaries unless rebalancing would shorten the "
+            "slowest chunk by more than this fraction, so chunk cache keys stay stable."
+        ),
+    )
+    serve_max_concurrent: int = Field(
+        1,
+        ge=1,
+        description="Jobs `html2manual serve` runs at the same time; further jobs wait in a queue.",
+    )
+    serve_max_queued: int = Field(
+        16, ge=0, description="Jobs `html2manual serve` queues before rejecting new ones with 503."
+    )
+    progress_interval: float = Field(
+        10.0,
+        gt=0,
+        description="Seconds between build_progress log events when not attached to a terminal.",
     )
     verbose: bool = Field(False, description="Enable verbose (debug) logging output.")
+    log_queue: bool = Field(
+        False,
+        description="Queue log events and render and write them on a background thread instead of "
+        "the logging thread.",
+    )
+    log_warning_burst: Optional[int] = Field(
+        20,
+        ge=1,
+        description="With log_queue, log each distinct warning at most this many times per "
+        "log_aggregate_interval and report how many were dropped (None logs every warning).",
+    )
+    log_aggregate_interval: float = Field(
+        10.0,
+        gt=0,
+        description="Seconds per warning rate-limit window and between dropped-warning reports.",
+    )
 
     model_config = ConfigDict(arbitrary_types_allowed=True, validate_assignment=True)
 
@@ -58,6 +323,36 @@ class Html2ManualConfig(BaseModel):
             return value
         return Path(value).expanduser().resolve()
 
+    @field_validator("variants")
+    @classmethod
+    def _validate_variants(cls, value: List[RenderVariant]) -> List[RenderVariant]:
+        names = [variant.name for variant in value]
+        if len(set(names)) != len(names):
+            raise ValueError("variant names must be unique")
+        return value
+
+    @property
+    def filtered(self) -> bool:
+        """Whether ``sections`` or ``pages`` limit the run to part of the manuals."""
+
+        return bool(self.sections or self.pages)
+
+    def variant_configs(self) -> Dict[str, Html2ManualConfig]:
+        """The configuration of each render variant, keyed by name.
+
+        A variant keeps every top-level setting it does not override and writes
+        to ``output_dir/variants/<name>``.
+        """
+
+        configs: Dict[str, Html2ManualConfig] = {}
+        for variant in self.variants:
+            overrides = variant.model_dump(exclude={"name"}, exclude_none=True)
+            output_dir = self.output_dir / VARIANTS_DIR / variant.name
+            configs[variant.name] = self.model_copy(
+                update={**overrides, "variants": [], "output_dir": output_dir}
+            )
+        return configs
+
     @field_validator("fallback_strategy")
     @classmethod
     def _validate_strategy(cls, value: str) -> str:
@@ -77,7 +372,9 @@ def _load_yaml(path: Path) -> Dict[str, Any]:
     return data
 
 
-def load_config(config_path: Optional[Path] = None, overrides: Optional[Dict[str, Any]] = None) -> Html2ManualConfig:
+def load_config(
+    config_path: Optional[Path] = None, overrides: Optional[Dict[str, Any]] = None
+) -> Html2ManualConfig:
     """Load configuration from YAML and optional overrides."""
 
     path = (config_path or DEFAULT_CONFIG_FILE).expanduser().resolve()
@@ -97,4 +394,10 @@ def load_config(config_path: Optional[Path] = None, overrides: Optional[Dict[str
     return Html2ManualConfig(**data)
 
 
-__all__ = ["Html2ManualConfig", "load_config", "DEFAULT_CONFIG_FILE"]
+__all__ = [
+    "Html2ManualConfig",
+    "RenderVariant",
+    "load_config",
+    "DEFAULT_CONFIG_FILE",
+    "VARIANTS_DIR",
+]
@@ -0,0 +1,131 @@
+"""Detect pages that occur more than once across a build."""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .render.cache import file_digest
+
+
+@dataclass
+class PlannedChunk:
+    """A chunk of pages to render, optionally shared between sections."""
+
+    inputs: List[Path]
+    output: Path
+    shared_key: Optional[str] = None
+
+
+class DuplicateIndex:
+    """Map pages to content keys and report which keys occur more than once."""
+
+    def __init__(self, keys: Mapping[Path, str], occurrences: Iterable[Path]) -> None:
+        self._keys = dict(keys)
+        self._counts = Counter(self._keys[path] for path in occurrences)
+
+    @classmethod
+    def from_sources(cls, sections: Mapping[str, Sequence[Path]]) -> "DuplicateIndex":
+        """Key source pages by content and directory.
+
+        Flattening only depends on a page's bytes and the directory its assets
+        are resolved from, so equal keys guarantee equal flattened output.
+        """
+
+        keys: Dict[Path, str] = {}
+        occurrences: List[Path] = []
+        for files in sections.values():
+            for path in files:
+                if not path.exists():
+                    continue
+                if path not in keys:
+                    digest = hashlib.sha256(str(path.parent.resolve()).encode("utf-8"))
+                    digest.update(b"\0")
+                    digest.update(path.read_bytes())
+                    keys[path] = digest.hexdigest()
+                occurrences.append(path)
+        return cls(keys, occurrences)
+
+    @classmethod
+    def from_flattened(cls, flattened: Mapping[str, Sequence[Path]]) -> "DuplicateIndex":
+        """Key already flattened pages by their content hash."""
+
+        occurrences = [path for files in flattened.values() for path in files]
+        keys = {path: file_digest(path) for path in set(occurrences)}
+        return cls(keys, occurrences)
+
+    def key(self, path: Path) -> str:
+        return self._keys[path]
+
+    def is_shared(self, path: Path) -> bool:
+        key = self._keys.get(path)
+        return key is not None and self._counts[key] > 1
+
+    @property
+    def shared_pages(self) -> int:
+        return sum(1 for count in self._counts.values() if count > 1)
+
+    @property
+    def duplicate_occurrences(self) -> int:
+        return sum(count - 1 for count in self._counts.values() if count > 1)
+
+    def split(
+        self,
+        files: Sequence[Path],
+        chunk_size: int,
+        chunker: Optional[Callable[[Sequence[Path]], List[List[Path]]]] = None,
+    ) -> List[Tuple[List[Path], Optional[str]]]:
+        """Chunk ``files`` so shared pages at the edges of a chunk are rendered on their own.
+
+        ``files`` is cut into ``chunk_size`` pieces, or by ``chunker`` when one
+        is given. Shared pages at the start or end of a piece are split off so
+        their PDF can be reused; splitting one out of the middle would cost two
+        extra renderer processes, so those stay in their chunk.
+        """
+
+        chunk_size = max(1, chunk_size)
+        if chunker is not None:
+            chunks = [chunk for chunk in chunker(files) if chunk]
+        else:
+            chunks = [
+                list(files[start : start + chunk_size])
+                for start in range(0, len(files), chunk_size)
+            ]
+        segments: List[Tuple[List[Path], Optional[str]]] = []
+        for chunk in chunks:
+            start, end = 0, len(chunk)
+            while start < end and self.is_shared(chunk[start]):
+                start += 1
+            while end > start and self.is_shared(chunk[end - 1]):
+                end -= 1
+            segments.extend(([path], self.key(path)) for path in chunk[:start])
+            if start < end:
+                segments.append((chunk[start:end], None))
+            segments.extend(([path], self.key(path)) for path in chunk[end:])
+        return segments
+
+
+def plan_chunks(
+    section: str,
+    segments: Sequence[Tuple[List[Path], Optional[str]]],
+    output_dir: Path,
+    shared_dir: Path,
+) -> List[PlannedChunk]:
+    """Assign output paths to ``segments`` using the renderer's chunk naming."""
+
+    planned: List[PlannedChunk] = []
+    single = len(segments) == 1
+    for index, (inputs, shared_key) in enumerate(segments, start=1):
+        if shared_key is not None:
+            output = shared_dir / f"{shared_key}.pdf"
+        else:
+            suffix = "" if single else f"_{index:02d}"
+            output = output_dir / f"{section}{suffix}.pdf"
+        planned.append(PlannedChunk(inputs=list(inputs), output=output, shared_key=shared_key))
+    return planned
+
+
+__all__ = ["DuplicateIndex", "PlannedChunk", "plan_chunks"]
@@ -0,0 +1,224 @@
+"""Typed build events and iterator APIs over a streaming build."""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional, Union
+
+from .config import Html2ManualConfig
+from .progress import ProgressTracker
+
+
+@dataclass(slots=True)
+class BuildEvent:
+    """Base class for build events; ``elapsed`` is seconds since the build started."""
+
+    elapsed: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return a JSON-ready representation tagged with the event type."""
+
+        data: Dict[str, Any] = {"type": type(self).__name__}
+        for item in fields(self):
+            data[item.name] = _jsonable(getattr(self, item.name))
+        return data
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+
+@dataclass(slots=True)
+class SectionParsed(BuildEvent):
+    section: str
+    pages: int
+
+
+@dataclass(slots=True)
+class PageFlattened(BuildEvent):
+    section: str
+    source: Path
+    output: Path
+    seconds: float
+    reused: bool = False
+
+
+@dataclass(slots=True)
+class ChunkRendered(BuildEvent):
+    section: str
+    output: Path
+    pages: int
+    seconds: float
+    reused: bool = False
+
+
+@dataclass(slots=True)
+class SectionMerged(BuildEvent):
+    section: str
+    pdf: Path
+    seconds: float
+
+
+@dataclass(slots=True)
+class VolumeWritten(BuildEvent):
+    section: str
+    pdf: Path
+    pages: int
+
+
+@dataclass(slots=True)
+class BuildWarning(BuildEvent):
+    event: str
+    details: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class BuildFinished(BuildEvent):
+    manuals: Dict[str, Path]
+
+
+class EventEmitter:
+    """Stamp events with the time since the build started and hand them to ``deliver``."""
+
+    def __init__(
+        self, deliver: Callable[[BuildEvent], None], clock: Callable[[], float] = time.perf_counter
+    ) -> None:
+        self._deliver = deliver
+        self._clock = clock
+        self._started = clock()
+
+    def emit(self, event_type: type[BuildEvent], **fields: Any) -> None:
+        self._deliver(event_type(elapsed=self._clock() - self._started, **fields))
+
+
+async def aiter_build(
+    config: Html2ManualConfig, progress: Optional[ProgressTracker] = None
+) -> AsyncGenerator[BuildEvent, None]:
+    """Run a build and yield its events as they happen.
+
+    The last event is :class:`BuildFinished`; a failed build raises after the
+    events produced so far. Closing the iterator early (or cancelling the task
+    consuming it) cancels the build and kills in-flight renderer processes.
+    """
+
+    from .metrics import RunMetrics
+    from .pipeline import METRICS_FILE, parse_sections
+    from .streaming import stream_build
+
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Queue[Union[BuildEvent, BaseException, None]] = asyncio.Queue()
+
+    def deliver(item: Union[BuildEvent, BaseException, None]) -> None:
+        # Flatten warnings are raised from worker threads.
+        loop.call_soon_threadsafe(pending.put_nowait, item)
+
+    emitter = EventEmitter(deliver)
+
+    async def produce() -> None:
+        try:
+            sections = await asyncio.to_thread(parse_sections, config)
+            for section, files in sections.items():
+                emitter.emit(SectionParsed, section=section, pages=len(files))
+            metrics = RunMetrics()
+            manuals = await stream_build(config, sections, metrics, progress, events=emitter)
+            await asyncio.to_thread(
+                metrics.write, config.output_dir / METRICS_FILE, config.filtered
+            )
+            emitter.emit(BuildFinished, manuals=manuals)
+        except Exception as exc:
+            deliver(exc)
+        finally:
+            deliver(None)
+
+    task = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+
+_DONE = object()
+
+
+def iter_build(
+    config: Html2ManualConfig, progress: Optional[ProgressTracker] = None
+) -> Generator[BuildEvent, None, None]:
+    """Synchronous counterpart of :func:`aiter_build`.
+
+    The build runs on its own event loop in a background thread. Closing the
+    generator (for example by breaking out of a ``for`` loop) cancels it.
+    """
+
+    items: queue.Queue[Any] = queue.Queue()
+    loop = asyncio.new_event_loop()
+
+    async def consume() -> None:
+        try:
+            async for event in aiter_build(config, progress):
+                items.put(event)
+        except Exception as exc:
+            items.put(exc)
+        finally:
+            items.put(_DONE)
+
+    task = loop.create_task(consume())
+
+    def run() -> None:
+        try:
+            with suppress(asyncio.CancelledError):
+                loop.run_until_complete(task)
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=run, name="html2manual-build", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        if thread.is_alive():
+            with suppress(RuntimeError):  # the loop closed in the meantime
+                loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+
+
+__all__ = [
+    "BuildEvent",
+    "BuildFinished",
+    "BuildWarning",
+    "ChunkRendered",
+    "EventEmitter",
+    "PageFlattened",
+    "SectionMerged",
+    "SectionParsed",
+    "VolumeWritten",
+    "aiter_build",
+    "iter_build",
+]
@@ -1,16 +1,22 @@
 """CSS inlining helpers."""
+
 from __future__ import annotations
 
 import base64
 import mimetypes
 import re
+import threading
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 from bs4 import BeautifulSoup
 
 from .encoding import read_text
 
+# Bytes of encoded assets kept in memory; logos and icons repeat on nearly every page.
+ASSET_CACHE_BYTES = 32 * 1024 * 1024
+
 URL_PATTERN = re.compile(r"url\((?P<quote>['\"]?)(?!data:)(?P<path>[^)\"']+)(?P=quote)\)")
 
 
@@ -25,17 +31,61 @@ def _as_string(value: object) -> Optional[str]:
     return str(value)
 
 
-def _encode_asset(path: Path) -> Optional[str]:
-    if not path.exists():
-        return None
+def _data_uri(path: Path) -> str:
     mime, _ = mimetypes.guess_type(path)
     if mime is None:
         mime = "application/octet-stream"
-    data = path.read_bytes()
-    encoded = base64.b64encode(data).decode("ascii")
+    encoded = base64.b64encode(path.read_bytes()).decode("ascii")
     return f"data:{mime};base64,{encoded}"
 
 
+class AssetCache:
+    """Least recently used data URIs, bounded by their total size in bytes.
+
+    An asset bigger than a quarter of the budget is encoded every time rather
+    than pushing out the small ones that repeat on every page.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: OrderedDict[Tuple[Path, int, int], str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def data_uri(self, path: Path, mtime_ns: int, size: int) -> str:
+        # mtime and size are part of the key so edited assets are re-encoded.
+        key = (path, mtime_ns, size)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                return cached
+        uri = _data_uri(path)
+        if len(uri) > self.max_bytes // 4:
+            return uri
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = uri
+                self.bytes += len(uri)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+        return uri
+
+
+_ASSETS = AssetCache(ASSET_CACHE_BYTES)
+
+
+def _encode_asset(path: Path) -> Optional[str]:
+    """Return ``path`` as a data URI, reusing the encoding of unchanged assets."""
+
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return _ASSETS.data_uri(path, stat.st_mtime_ns, stat.st_size)
+
+
 def _resolve_asset(base_dir: Path, asset_ref: str) -> Optional[Path]:
     if re.match(r"^[a-zA-Z]+://", asset_ref):
         return None
@@ -87,4 +137,4 @@ def inline_css(html: str, html_path: Path) -> str:
     return str(soup)
 
 
-__all__ = ["inline_css", "embed_css_urls"]
+__all__ = ["AssetCache", "inline_css", "embed_css_urls"]
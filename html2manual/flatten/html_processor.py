@@ -1,19 +1,58 @@
 """High level HTML flattening orchestration."""
+
 from __future__ import annotations
 
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, FrozenSet, Iterable, List
 
+from .. import tracing
+from ..journal import atomic_output
 from . import css_inliner, image_inliner, js_inliner
 from .encoding import read_text
+from .js_classifier import JS_NONE, SCRIPT_HINT, ScriptRules, classify_scripts
+from .minify import minify_html
 from .overflow_fix import apply_overflow_fix
 
+# Byte patterns whose absence proves a transform cannot change a page.
+PRESCAN_PATTERNS: Dict[str, "re.Pattern[bytes]"] = {
+    "css": re.compile(rb"<(?:link|style)\b", re.IGNORECASE),
+    "js": re.compile(rb"<script\b", re.IGNORECASE),
+    "images": re.compile(rb"<img\b|\bstyle\s*=", re.IGNORECASE),
+    "overflow": re.compile(rb"\bstyle\b", re.IGNORECASE),
+}
+UNSCANNABLE_PREFIXES = (b"\xff\xfe", b"\xfe\xff")
+
+
+def prescan(raw: bytes) -> FrozenSet[str]:
+    """Return the transforms that might rewrite a page with content ``raw``.
+
+    The scan works on raw bytes, so encodings that are not ASCII compatible
+    (UTF-16/32) are reported as needing every transform.
+    """
+
+    if raw.startswith(UNSCANNABLE_PREFIXES) or b"\x00" in raw:
+        return frozenset(PRESCAN_PATTERNS)
+    return frozenset(name for name, pattern in PRESCAN_PATTERNS.items() if pattern.search(raw))
+
 
 @dataclass
 class FlattenResult:
     html: str
     warnings: List[str]
+    transforms: List[str] = field(default_factory=list)
+    js_class: str = JS_NONE
+    scripts_stripped: int = 0
+    # UTF-8 size of the page before and after minification, when it was minified.
+    bytes_before_minify: int = 0
+    bytes_after_minify: int = 0
+
+    @property
+    def skipped(self) -> bool:
+        """True when the pre-scan found nothing to rewrite and the page was copied through."""
+
+        return not self.transforms
 
 
 class HtmlProcessor:
@@ -27,32 +66,94 @@ class HtmlProcessor:
         images_inline: bool = True,
         overflow_fix_enable: bool = True,
         overflow_selectors: Iterable[str] | None = None,
+        script_rules: ScriptRules | None = None,
+        minify: bool = False,
     ) -> None:
         self.css_inline = css_inline
         self.js_inline = js_inline
         self.images_inline = images_inline
         self.overflow_fix_enable = overflow_fix_enable
         self.overflow_selectors = list(overflow_selectors or [".container"])
+        self.script_rules = script_rules
+        self.minify = minify
+
+    @property
+    def enabled_transforms(self) -> FrozenSet[str]:
+        flags = {
+            "css": self.css_inline,
+            "js": self.js_inline,
+            "images": self.images_inline,
+            "overflow": self.overflow_fix_enable,
+        }
+        return frozenset(name for name, enabled in flags.items() if enabled)
 
     def flatten(self, path: Path) -> FlattenResult:
-        html = read_text(path)
+        raw = path.read_bytes()
+        found = prescan(raw)
+        needed = found & self.enabled_transforms
+        if "css" in needed and self.overflow_fix_enable:
+            # Inlined style sheets can bring overflow rules the page itself lacks.
+            needed |= {"overflow"}
+        # The same check as needs_javascript(), so pages with only handlers are classified too.
+        has_scripts = "js" in found or SCRIPT_HINT.search(raw) is not None
         warnings: List[str] = []
+        if not needed and not has_scripts and not self.minify:
+            try:
+                html = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                html = read_text(path)
+            return FlattenResult(html=html, warnings=warnings)
 
-        if self.css_inline:
-            html = css_inliner.inline_css(html, path)
-        if self.js_inline:
-            html = js_inliner.inline_js(html, path)
-        if self.images_inline:
-            html = image_inliner.inline_images(html, path)
-        if self.overflow_fix_enable:
-            html = apply_overflow_fix(html, self.overflow_selectors)
+        html = read_text(path)
+        applied: List[str] = []
+        js_class = JS_NONE
+        stripped = 0
+        if has_scripts:
+            # Classify before js_inline so the strip rules still see script URLs.
+            with tracing.span("scripts", "transform", page=str(path)):
+                html, js_class, stripped = classify_scripts(html, self.script_rules)
+            if stripped:
+                applied.append("scripts")
+        if "css" in needed:
+            with tracing.span("css", "transform", page=str(path)):
+                html = css_inliner.inline_css(html, path)
+            applied.append("css")
+        if "js" in needed:
+            with tracing.span("js", "transform", page=str(path)):
+                html = js_inliner.inline_js(html, path)
+            applied.append("js")
+        if "images" in needed:
+            with tracing.span("images", "transform", page=str(path)):
+                html = image_inliner.inline_images(html, path)
+            applied.append("images")
+        if "overflow" in needed:
+            with tracing.span("overflow", "transform", page=str(path)):
+                html = apply_overflow_fix(html, self.overflow_selectors)
+            applied.append("overflow")
+        bytes_before = bytes_after = 0
+        if self.minify:
+            # Last, so inlined style sheets and scripts are minified too.
+            with tracing.span("minify", "transform", page=str(path)):
+                bytes_before = len(html.encode("utf-8"))
+                html = minify_html(html)
+                bytes_after = len(html.encode("utf-8"))
+            applied.append("minify")
 
-        return FlattenResult(html=html, warnings=warnings)
+        return FlattenResult(
+            html=html,
+            warnings=warnings,
+            transforms=applied,
+            js_class=js_class,
+            scripts_stripped=stripped,
+            bytes_before_minify=bytes_before,
+            bytes_after_minify=bytes_after,
+        )
 
     def flatten_to_file(self, path: Path, destination: Path) -> FlattenResult:
         result = self.flatten(path)
-        destination.write_text(result.html, encoding="utf-8")
+        with atomic_output(destination) as partial:
+            partial.write_text(result.html, encoding="utf-8")
         return result
 
 
-__all__ = ["HtmlProcessor", "FlattenResult"]
+__all__ = ["HtmlProcessor", "FlattenResult", "prescan"]
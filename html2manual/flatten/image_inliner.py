@@ -1,14 +1,13 @@
 """Image inlining utilities."""
+
 from __future__ import annotations
 
-import base64
-import mimetypes
 from pathlib import Path
 from typing import Optional
 
 from bs4 import BeautifulSoup
 
-from .css_inliner import embed_css_urls
+from .css_inliner import _encode_asset, embed_css_urls
 
 
 def _as_string(value: object) -> Optional[str]:
@@ -23,14 +22,7 @@ def _as_string(value: object) -> Optional[str]:
 
 
 def _encode_image(path: Path) -> Optional[str]:
-    if not path.exists():
-        return None
-    mime, _ = mimetypes.guess_type(path)
-    if mime is None:
-        mime = "application/octet-stream"
-    data = path.read_bytes()
-    encoded = base64.b64encode(data).decode("ascii")
-    return f"data:{mime};base64,{encoded}"
+    return _encode_asset(path)
 
 
 def inline_images(html: str, html_path: Path) -> str:
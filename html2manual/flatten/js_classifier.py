@@ -0,0 +1,157 @@
+"""Classify pages by whether printing them needs JavaScript."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from bs4 import BeautifulSoup, Tag
+
+JS_NONE = "none"
+JS_STRIP_SAFE = "strip-safe"
+JS_NEEDED = "needs-js"
+
+# Script types browsers execute; anything else (JSON data, templates) is inert.
+EXECUTABLE_TYPES = frozenset(
+    {
+        "",
+        "module",
+        "text/javascript",
+        "application/javascript",
+        "application/x-javascript",
+        "text/ecmascript",
+        "application/ecmascript",
+    }
+)
+# Event handler attributes that fire while a page renders, without any user
+# interaction, so they need JavaScript even on a page without a script tag.
+RENDER_HANDLERS = ("onload", "onerror", "onpageshow", "onbeforeprint", "onafterprint")
+# Bytes that show a page may run script: a script tag or one of the handlers above.
+SCRIPT_HINT = re.compile(
+    rb"<script\b|\b(?:" + "|".join(RENDER_HANDLERS).encode("ascii") + rb")\s*=", re.IGNORECASE
+)
+
+
+@dataclass(frozen=True)
+class ScriptRules:
+    """Allow and deny lists deciding which scripts printing can do without.
+
+    Each pattern is a regular expression searched in a script's ``src`` or,
+    for inline scripts, its code. ``keep`` wins over ``strip``; scripts that
+    match neither list are kept, as is everything when both lists are empty.
+    """
+
+    keep: Tuple[str, ...] = ()
+    strip: Tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        # Compile eagerly so an invalid pattern fails when the processor is built.
+        for pattern in (*self.keep, *self.strip):
+            re.compile(pattern)
+
+    def strippable(self, script: Tag) -> bool:
+        src = _attr(script, "src")
+        subject = src if src is not None else script.get_text()
+        if any(re.search(pattern, subject) for pattern in self.keep):
+            return False
+        return any(re.search(pattern, subject) for pattern in self.strip)
+
+
+def _attr(tag: Tag, name: str) -> Optional[str]:
+    value = tag.get(name)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value if isinstance(value, str) else None
+
+
+def _executable(script: Tag) -> bool:
+    return (_attr(script, "type") or "").strip().lower() in EXECUTABLE_TYPES
+
+
+def classify_scripts(html: str, rules: Optional[ScriptRules] = None) -> Tuple[str, str, int]:
+    """Return ``html`` without strippable scripts, the page's class and how many were removed.
+
+    The class is :data:`JS_NONE` for pages without executable scripts,
+    :data:`JS_STRIP_SAFE` when every script matched the strip list and
+    :data:`JS_NEEDED` otherwise. Without ``rules`` nothing is stripped.
+    """
+
+    soup = BeautifulSoup(html, "html.parser")
+    scripts = [script for script in soup.find_all("script") if _executable(script)]
+    removable: List[Tag] = [
+        script for script in scripts if rules is not None and rules.strippable(script)
+    ]
+    for script in removable:
+        script.decompose()
+    handlers = soup.find(lambda tag: any(tag.has_attr(name) for name in RENDER_HANDLERS))
+    if len(removable) < len(scripts) or handlers is not None:
+        js_class = JS_NEEDED
+    else:
+        js_class = JS_STRIP_SAFE if removable else JS_NONE
+    return (str(soup) if removable else html), js_class, len(removable)
+
+
+def classify_page(path: Path, rules: Optional[ScriptRules] = None) -> str:
+    """Class of an already flattened page, as :func:`classify_scripts` would report it.
+
+    Pages without a :data:`SCRIPT_HINT` are :data:`JS_NONE` without being parsed;
+    an unreadable page is :data:`JS_NEEDED`.
+    """
+
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return JS_NEEDED
+    if SCRIPT_HINT.search(data) is None:
+        return JS_NONE
+    return classify_scripts(data.decode("utf-8", errors="replace"), rules)[1]
+
+
+def javascript_runs(
+    pages: Sequence[Path], needs_js: Sequence[bool], min_run: int = 1
+) -> List[Tuple[List[Path], bool]]:
+    """Split ``pages`` into contiguous runs that all need, or all do without, JavaScript.
+
+    Every run is one more renderer process, so a run without script shorter
+    than ``min_run`` pages is not split off and renders with JavaScript along
+    with its neighbours. A chunk that needs no script at all stays one run.
+    """
+
+    runs: List[Tuple[List[Path], bool]] = []
+    for page, flag in zip(pages, needs_js, strict=True):
+        if runs and runs[-1][1] == flag:
+            runs[-1][0].append(page)
+        else:
+            runs.append(([page], flag))
+    if len(runs) == 1:
+        return runs
+    merged: List[Tuple[List[Path], bool]] = []
+    for run_pages, flag in runs:
+        flag = flag or len(run_pages) < min_run
+        if merged and merged[-1][1] == flag:
+            merged[-1][0].extend(run_pages)
+        else:
+            merged.append((run_pages, flag))
+    return merged
+
+
+def run_output(output: Path, index: int, runs: int) -> Path:
+    """Output path for run ``index`` (1-based) of a chunk split into ``runs`` runs."""
+
+    return output if runs == 1 else output.with_name(f"{output.stem}_run{index}.pdf")
+
+
+__all__ = [
+    "JS_NEEDED",
+    "JS_NONE",
+    "JS_STRIP_SAFE",
+    "RENDER_HANDLERS",
+    "SCRIPT_HINT",
+    "ScriptRules",
+    "classify_page",
+    "classify_scripts",
+    "javascript_runs",
+    "run_output",
+]
@@ -0,0 +1,99 @@
+"""Strip comments and insignificant whitespace from flattened pages."""
+
+from __future__ import annotations
+
+import re
+
+from .js_classifier import EXECUTABLE_TYPES
+
+# Conditional comments are not matched; the tag alternative below keeps them.
+COMMENT = r"<!--(?!\[if\b|<!).*?-->"
+# Alternatives are tried in order at each position, so comments and the
+# contents of raw elements are consumed before their text could be rewritten.
+# A run of comments takes the whitespace around it, which collapses to one space.
+HTML_TOKEN = re.compile(
+    rf"(?P<comment>(?:[ \t\n\r\f]*{COMMENT})+[ \t\n\r\f]*)"
+    r"|(?P<raw><(?P<raw_name>pre|textarea)\b.*?</(?P=raw_name)\s*>)"
+    r"|(?P<style_open><style\b[^>]*>)(?P<css>.*?)(?P<style_close></style\s*>)"
+    r"|(?P<script_open><script\b[^>]*>)(?P<js>.*?)(?P<script_close></script\s*>)"
+    r"|(?P<tag><[A-Za-z/!?](?:\"[^\"]*\"|'[^']*'|[^'\">])*>)"
+    r"|(?P<space>[ \t\n\r\f]+)",
+    re.IGNORECASE | re.DOTALL,
+)
+SCRIPT_TYPE = re.compile(r"""\btype\s*=\s*["']?([^"'\s>]*)""", re.IGNORECASE)
+CSS_STRING = r""""(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'"""
+CSS_SPACE = re.compile(rf"(?P<string>{CSS_STRING})|/\*.*?\*/|\s+", re.DOTALL)
+# A space before a colon can be a descendant combinator (``a :hover``); after one it never matters.
+CSS_PUNCTUATION = re.compile(
+    rf"(?P<string>{CSS_STRING})|\s*(?P<punct>[{{}};,>])\s*|(?P<colon>:)\s+"
+)
+CSS_LAST_SEMICOLON = re.compile(rf"(?P<string>{CSS_STRING})|;(?=}})")
+
+
+def minify_css(css: str) -> str:
+    """Remove comments and the whitespace around CSS punctuation, leaving strings intact."""
+
+    css = CSS_SPACE.sub(lambda match: match.group("string") or " ", css)
+    css = CSS_PUNCTUATION.sub(
+        lambda match: match.group("string") or match.group("punct") or ":", css
+    )
+    return CSS_LAST_SEMICOLON.sub(lambda match: match.group("string") or "", css).strip()
+
+
+def minify_js(code: str) -> str:
+    """Drop indentation, blank lines and whole-line ``//`` comments from a script.
+
+    Line breaks are kept so automatic semicolon insertion still applies.
+    Scripts with template literals are returned unchanged because their
+    whitespace is part of the string, as is a line continued from a string
+    ending in a backslash.
+    """
+
+    if "`" in code:
+        return code
+    lines = []
+    continued = False
+    for line in code.splitlines():
+        if continued:
+            lines.append(line)
+        else:
+            stripped = line.strip()
+            if stripped and not stripped.startswith("//"):
+                lines.append(stripped)
+        continued = line.endswith("\\")
+    return "\n".join(lines)
+
+
+def _script(open_tag: str, code: str) -> str:
+    match = SCRIPT_TYPE.search(open_tag)
+    script_type = match.group(1).lower() if match else ""
+    # JSON data and templates are not JavaScript; their whitespace may matter.
+    return minify_js(code) if script_type in EXECUTABLE_TYPES else code
+
+
+def _token(match: re.Match[str]) -> str:
+    if match.group("comment") is not None:
+        return " " if re.sub(COMMENT, "", match.group("comment"), flags=re.DOTALL) else ""
+    if match.group("space") is not None:
+        return " "
+    if match.group("css") is not None:
+        return (
+            match.group("style_open") + minify_css(match.group("css")) + match.group("style_close")
+        )
+    if match.group("js") is not None:
+        open_tag = match.group("script_open")
+        return open_tag + _script(open_tag, match.group("js")) + match.group("script_close")
+    return match.group(0)
+
+
+def minify_html(html: str) -> str:
+    """Remove comments and collapse whitespace in ``html``, its style sheets and inline scripts.
+
+    Whitespace in text collapses to one space, as the browser would render it;
+    tags, attribute values and ``<pre>``/``<textarea>`` content are left as they are.
+    """
+
+    return HTML_TOKEN.sub(_token, html).strip()
+
+
+__all__ = ["minify_css", "minify_html", "minify_js"]
@@ -0,0 +1,140 @@
+"""Isolate pages that fail to render so the rest of their chunk still renders."""
+
+from __future__ import annotations
+
+import json
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Collection, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import structlog
+
+from .render.merge import PdfMerger
+from .render.registry import ChunkRenderer, Renderer
+
+LOGGER = structlog.get_logger(__name__)
+FAILED_PAGES_FILE = "failed_pages.json"
+
+
+@dataclass(slots=True)
+class FailedPage:
+    section: str
+    page: Path
+    error: str
+    action: str
+
+    def as_dict(self) -> Dict[str, str]:
+        return {
+            "section": self.section,
+            "page": str(self.page),
+            "error": self.error,
+            "action": self.action,
+        }
+
+
+class FailedPageReport:
+    """Pages the primary renderer could not render, and what was done with each."""
+
+    def __init__(self) -> None:
+        self.pages: List[FailedPage] = []
+        self._lock = threading.Lock()
+
+    def add(self, section: str, page: Path, error: str, action: str) -> None:
+        with self._lock:
+            self.pages.append(FailedPage(section=section, page=page, error=error, action=action))
+
+    def write(self, path: Path, scope: Optional[Mapping[str, Collection[Path]]] = None) -> None:
+        """Write the report to ``path``, or remove a stale one when nothing failed.
+
+        A build limited to some pages passes them as ``scope``, by section; the
+        entries ``path`` already holds for pages outside it are kept.
+        """
+
+        with self._lock:
+            pages = [failed.as_dict() for failed in self.pages]
+        if scope is not None:
+            pages = _outside_scope(path, scope) + pages
+        if not pages:
+            path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"pages": pages}, indent=2), encoding="utf-8")
+        LOGGER.warning("failed_pages_reported", pages=len(pages), report=str(path))
+
+
+def _outside_scope(path: Path, scope: Mapping[str, Collection[Path]]) -> List[Dict[str, str]]:
+    """Entries of the report at ``path`` for pages a build limited to ``scope`` did not render."""
+
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))["pages"]
+    except (OSError, ValueError, KeyError):
+        return []
+    # Pages keep their file name when flattened, so source and flattened pages compare equal.
+    names = {section: {page.name for page in pages} for section, pages in scope.items()}
+    return [
+        entry
+        for entry in entries
+        if Path(entry["page"]).name not in names.get(entry["section"], ())
+    ]
+
+
+def half_outputs(output: Path) -> Tuple[Path, Path]:
+    """Output paths for the two halves of a split chunk; they sort in page order."""
+
+    return output.with_name(f"{output.stem}a.pdf"), output.with_name(f"{output.stem}b.pdf")
+
+
+def render_with_fallback(fallback: Renderer, section: str, page: Path, output: Path) -> None:
+    """Render the single ``page`` with ``fallback`` into ``output``."""
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix=f"{output.stem}-", dir=output.parent) as scratch:
+        pdfs = fallback.render(f"{section}_{page.stem}", [page], Path(scratch))
+        PdfMerger().merge(pdfs, output)
+
+
+def bisect_render(
+    renderer: ChunkRenderer,
+    inputs: Sequence[Path],
+    output: Path,
+    on_failed_page: Callable[[Path, Path, subprocess.CalledProcessError], Optional[Path]],
+    *,
+    javascript: bool = True,
+) -> List[Tuple[Path, List[Path]]]:
+    """Render ``inputs`` into ``output``, splitting the chunk in half whenever it fails.
+
+    Halves are rendered recursively until each failure is down to a single
+    page, which ``on_failed_page(page, output, error)`` handles by returning a
+    replacement PDF or ``None`` to leave the page out. Returns the PDFs with
+    the pages each holds, in page order.
+    """
+
+    try:
+        renderer.render_chunk(inputs, output, javascript=javascript)
+        return [(output, list(inputs))]
+    except subprocess.CalledProcessError as exc:
+        if renderer.cancelled:
+            raise
+        if len(inputs) == 1:
+            replacement = on_failed_page(inputs[0], output, exc)
+            return [(replacement, list(inputs))] if replacement is not None else []
+        LOGGER.info("render_chunk_bisected", output=str(output), pages=len(inputs))
+    middle = len(inputs) // 2
+    first, second = half_outputs(output)
+    return [
+        *bisect_render(renderer, inputs[:middle], first, on_failed_page, javascript=javascript),
+        *bisect_render(renderer, inputs[middle:], second, on_failed_page, javascript=javascript),
+    ]
+
+
+__all__ = [
+    "FAILED_PAGES_FILE",
+    "FailedPage",
+    "FailedPageReport",
+    "bisect_render",
+    "half_outputs",
+    "render_with_fallback",
+]
@@ -0,0 +1,280 @@
+"""Journal of finished build units so an interrupted build can resume."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+
+from .config import Html2ManualConfig
+
+LOGGER = structlog.get_logger(__name__)
+JOURNAL_FILE = "build_journal.jsonl"
+# Settings that change how a build runs but not what it produces.
+RUN_ONLY_FIELDS = {
+    "resume",
+    "build_journal",
+    "verbose",
+    "log_queue",
+    "log_warning_burst",
+    "log_aggregate_interval",
+    "audit_cache",
+    "progress_interval",
+    "render_workers",
+    "memory_budget_mb",
+    "memory_high_water",
+    "memory_low_water",
+    "memory_sample_interval",
+    "pipeline_queue_size",
+    "render_timeout",
+    "render_memory_limit_mb",
+    "render_address_space_limit_mb",
+    "render_retries",
+    "render_retry_backoff",
+    "straggler_factor",
+    "straggler_min_seconds",
+    "serve_max_concurrent",
+    "serve_max_queued",
+}
+
+
+class ConfigChangedError(ValueError):
+    """``--resume`` was asked for, but the configuration differs from the interrupted build's."""
+
+
+def partial_path(path: Path) -> Path:
+    """A hidden sibling of ``path`` to write to before renaming it into place.
+
+    The name ends in ``.tmp``, so a partial file left by a killed build never
+    matches a glob for the real outputs (``*.html``, ``*.pdf``).
+    """
+
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """Yield a temporary path and rename it to ``path`` once the block succeeds.
+
+    A crash or error leaves either the previous file or none at all, never a
+    truncated one.
+    """
+
+    partial = partial_path(path)
+    try:
+        yield partial
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+
+
+def config_fingerprint(config: Html2ManualConfig) -> str:
+    data = config.model_dump(mode="json", exclude=RUN_ONLY_FIELDS)
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def journal_path(config: Html2ManualConfig) -> Path:
+    return config.output_dir / ".cache" / JOURNAL_FILE
+
+
+def _stats(paths: Sequence[Path]) -> List[List[Any]]:
+    """Identify the versions of ``paths`` a unit was built from."""
+
+    stats: List[List[Any]] = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except OSError:
+            stats.append([str(path), None, None])
+        else:
+            stats.append([str(path), stat.st_size, stat.st_mtime_ns])
+    return stats
+
+
+def _read(path: Path) -> Tuple[Optional[Dict[str, Any]], Dict[Tuple[str, str], Dict[str, Any]]]:
+    """Return the journal's header and its units; a line torn by a crash ends the journal."""
+
+    header: Optional[Dict[str, Any]] = None
+    units: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None, units
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break
+        if header is None:
+            header = entry
+        else:
+            units[(entry["kind"], entry["key"])] = entry
+    return header, units
+
+
+class BuildJournal:
+    """Append-only record of the flatten, render and merge units a build finished.
+
+    Each unit is written and flushed only after its output has been renamed
+    into place, so every recorded unit is complete and survives the process
+    being killed. Syncing to disk, which only matters if the machine itself
+    goes down, is batched: at most every ``sync_interval`` seconds, and for
+    every merged section. Units are trusted on resume only while their output
+    exists and their inputs are unchanged. The journal is removed once a build
+    finishes.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path],
+        fingerprint: str,
+        units: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None,
+        sync_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.fingerprint = fingerprint
+        self.units = units or {}
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._handle: Optional[IO[str]] = None
+        self._synced = time.monotonic()
+        if path is not None:
+            # Rewriting the resumed units drops a line torn by the crash.
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = path.open("w", encoding="utf-8")
+            self._append({"config": fingerprint}, *self.units.values())
+
+    @classmethod
+    def start(cls, config: Html2ManualConfig) -> BuildJournal:
+        """Open the journal for a build; with ``config.resume``, load the interrupted build's units.
+
+        Raises :class:`ConfigChangedError` when resuming under a different
+        configuration.
+        """
+
+        fingerprint = config_fingerprint(config)
+        if not config.build_journal:
+            return cls(None, fingerprint)
+        path = journal_path(config)
+        units: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        if config.resume:
+            header, units = _read(path)
+            if header is None:
+                LOGGER.warning("resume_journal_missing", journal=str(path))
+            elif header.get("config") != fingerprint:
+                raise ConfigChangedError(
+                    f"The configuration changed since the interrupted build ({path}); "
+                    "run without --resume"
+                )
+            else:
+                LOGGER.info("build_resumed", journal=str(path), units=len(units))
+        return cls(path, fingerprint, units)
+
+    def _append(self, *entries: Dict[str, Any], sync: bool = False) -> None:
+        with self._lock:
+            # A worker still finishing after cancellation may record after close().
+            if self._handle is None:
+                return
+            self._handle.write("".join(json.dumps(entry) + "\n" for entry in entries))
+            self._handle.flush()
+            now = time.monotonic()
+            if sync or now - self._synced >= self.sync_interval:
+                os.fsync(self._handle.fileno())
+                self._synced = now
+
+    def _record(self, kind: str, key: str, sync: bool = False, **fields: Any) -> None:
+        entry = {"kind": kind, "key": key, **fields}
+        with self._lock:
+            self.units[(kind, key)] = entry
+        self._append(entry, sync=sync)
+
+    def _unit(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self.units.get((kind, key))
+
+    def flattened(self, source: Path, destination: Path) -> Optional[str]:
+        """Return the JavaScript class of a page flattened before the interruption, if current."""
+
+        unit = self._unit("flatten", str(destination))
+        if unit is None or not destination.exists() or unit["source"] != _stats([source]):
+            return None
+        js_class: str = unit["js_class"]
+        return js_class
+
+    def record_flatten(self, source: Path, destination: Path, js_class: str) -> None:
+        self._record("flatten", str(destination), source=_stats([source]), js_class=js_class)
+
+    def rendered(self, inputs: Sequence[Path], output: Path, javascript: bool = True) -> bool:
+        """Whether ``output`` was rendered from the current ``inputs`` before the interruption."""
+
+        unit = self._unit("render", str(output))
+        return (
+            unit is not None
+            and output.exists()
+            and unit["javascript"] == javascript
+            and unit["inputs"] == _stats(inputs)
+        )
+
+    def record_render(self, inputs: Sequence[Path], output: Path, javascript: bool = True) -> None:
+        self._record("render", str(output), inputs=_stats(inputs), javascript=javascript)
+
+    def merged(self, section: str, inputs: Sequence[Path]) -> Optional[Path]:
+        """Return the manual merged from the current ``inputs`` before the interruption, if any.
+
+        ``inputs`` are the section's pages; the chunk PDFs merged from them are
+        removed after merging, so the pages stand in for them. The manual must
+        also be the one that was written.
+        """
+
+        unit = self._unit("merge", section)
+        if unit is None:
+            return None
+        manual = Path(unit["manual"])
+        if unit["inputs"] != _stats(inputs) or unit["output"] != _stats([manual]):
+            return None
+        return manual
+
+    def record_merge(self, section: str, manual: Path, inputs: Sequence[Path]) -> None:
+        self._record(
+            "merge",
+            section,
+            sync=True,
+            manual=str(manual),
+            output=_stats([manual]),
+            inputs=_stats(inputs),
+        )
+
+    def close(self) -> None:
+        """Close the journal, keeping it for a later ``--resume``."""
+
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+                self._handle.close()
+                self._handle = None
+
+    def finish(self) -> None:
+        """Close and remove the journal of a build that ran to completion."""
+
+        self.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+__all__ = [
+    "BuildJournal",
+    "ConfigChangedError",
+    "JOURNAL_FILE",
+    "atomic_output",
+    "config_fingerprint",
+    "journal_path",
+    "partial_path",
+]
@@ -1,18 +1,168 @@
 """Structured logging helpers using structlog."""
+
 from __future__ import annotations
 
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
 from logging.config import dictConfig
+from logging.handlers import QueueHandler
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Union
 
 import structlog
+from structlog.typing import EventDict, WrappedLogger
+
+LOGGER = structlog.get_logger(__name__)
+SUMMARY_EVENT = "log_warnings_suppressed"
+
+_writer: Optional[QueuedLogWriter] = None
+
+
+class WarningRateLimiter:
+    """structlog processor passing at most ``burst`` of each warning per ``interval`` seconds.
+
+    Warnings are told apart by their event name, so a warning repeated for
+    thousands of pages is logged ``burst`` times per interval and the rest are
+    only counted; :meth:`drain` returns and resets those counts. Errors and
+    lower levels are never dropped.
+    """
+
+    def __init__(
+        self, burst: int, interval: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.burst = burst
+        self.interval = interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._windows: Dict[str, float] = {}
+        self._seen: Counter[str] = Counter()
+        self._suppressed: Counter[str] = Counter()
+
+    def __call__(self, logger: WrappedLogger, method_name: str, event_dict: EventDict) -> EventDict:
+        if method_name not in ("warning", "warn"):
+            return event_dict
+        event = str(event_dict.get("event"))
+        if event == SUMMARY_EVENT:
+            return event_dict
+        now = self.clock()
+        with self._lock:
+            if now - self._windows.get(event, float("-inf")) >= self.interval:
+                self._windows[event] = now
+                self._seen[event] = 0
+            self._seen[event] += 1
+            if self._seen[event] > self.burst:
+                self._suppressed[event] += 1
+                raise structlog.DropEvent
+        return event_dict
+
+    def drain(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._suppressed)
+            self._suppressed.clear()
+        return counts
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records untouched so the writer thread, not the caller, formats them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class QueuedLogWriter:
+    """Background thread that formats and writes the records logging calls put on a queue.
+
+    Every ``interval`` seconds, and once more on :meth:`stop`, the warnings the
+    rate limiter dropped are logged as one ``log_warnings_suppressed`` event
+    with a count per warning.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        handlers: List[logging.Handler],
+        limiter: Optional[WarningRateLimiter],
+        interval: float,
+    ) -> None:
+        self.handlers = handlers
+        self.limiter = limiter
+        self.interval = interval
+        self.queue: queue.SimpleQueue[Union[logging.LogRecord, object]] = queue.SimpleQueue()
+        self.handler = _DeferredQueueHandler(self.queue)  # type: ignore[arg-type]
+        self._thread = threading.Thread(
+            target=self._run, name="html2manual-log-writer", daemon=True
+        )
 
+    def start(self) -> None:
+        self._thread.start()
 
-def configure_logging(log_level: str = "INFO", log_file: Optional[Path] = None) -> None:
-    """Configure structlog with JSON output and optional file logging."""
+    def _run(self) -> None:
+        next_report = time.monotonic() + self.interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0.0, next_report - time.monotonic()))
+            except queue.Empty:
+                record = None
+            if record is self._STOP:
+                return
+            if isinstance(record, logging.LogRecord):
+                self._write(record)
+            if time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + self.interval
+
+    def _write(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def report(self) -> None:
+        """Log how many of each warning were dropped since the last report."""
+
+        counts = self.limiter.drain() if self.limiter is not None else {}
+        if counts:
+            LOGGER.warning(SUMMARY_EVENT, counts=counts, total=sum(counts.values()))
+
+    def stop(self) -> None:
+        """Write everything still queued, including a final report, and stop the thread."""
+
+        if not self._thread.is_alive():
+            return
+        self.report()
+        self.queue.put(self._STOP)
+        self._thread.join()
+        for handler in self.handlers:
+            handler.flush()
+
+
+def configure_logging(
+    log_level: str = "INFO",
+    log_file: Optional[Path] = None,
+    *,
+    queued: bool = False,
+    warning_burst: Optional[int] = None,
+    aggregate_interval: float = 10.0,
+) -> None:
+    """Configure structlog with JSON output and optional file logging.
+
+    With ``queued`` a logging call only builds the event and puts it on a
+    queue; a background thread renders the JSON and writes it to the handlers.
+    ``warning_burst`` then limits each distinct warning to that many events per
+    ``aggregate_interval`` seconds and logs the dropped counts periodically.
+    """
+
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
 
     shared_handlers = ["default"]
-    handler_defs = {
+    handler_defs: Dict[str, Dict[str, Any]] = {
         "default": {
             "class": "logging.StreamHandler",
             "formatter": "json",
@@ -45,19 +195,57 @@ def configure_logging(log_level: str = "INFO", log_file: Optional[Path] = None)
         }
     )
 
-    structlog.configure(
-        processors=[
+    if queued:
+        root = logging.getLogger()
+        limiter = (
+            WarningRateLimiter(warning_burst, aggregate_interval)
+            if warning_burst is not None
+            else None
+        )
+        _writer = QueuedLogWriter(list(root.handlers), limiter, aggregate_interval)
+        root.handlers = [_writer.handler]
+        _writer.start()
+        atexit.register(_writer.stop)
+        processors: List[Any] = [
+            structlog.stdlib.filter_by_level,
+            structlog.processors.add_log_level,
+        ]
+        if limiter is not None:
+            processors.append(limiter)
+        # Rendering to JSON is left to the formatter on the writer thread.
+        processors.extend(
+            [
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.StackInfoRenderer(),
+                structlog.processors.format_exc_info,
+                structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+            ]
+        )
+    else:
+        processors = [
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.add_log_level,
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
             structlog.processors.JSONRenderer(),
-        ],
+        ]
+
+    structlog.configure(
+        processors=processors,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
 
 
-__all__ = ["configure_logging"]
+def stop_logging() -> None:
+    """Flush and stop the queued log writer, if one is running."""
+
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+__all__ = ["QueuedLogWriter", "WarningRateLimiter", "configure_logging", "stop_logging"]
@@ -0,0 +1,200 @@
+"""Keep a build's resident memory within a budget by holding back new work."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+import structlog
+
+from .metrics import RunMetrics
+
+LOGGER = structlog.get_logger(__name__)
+MB = 1024 * 1024
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Return the resident set size of ``pid`` on Linux, or ``None`` if unknown."""
+
+    try:
+        with open(f"/proc/{pid}/statm", "rb") as handle:
+            resident_pages = int(handle.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def descendant_pids(pid: Optional[int] = None) -> List[int]:
+    """Return the processes below ``pid`` (this process by default) on Linux.
+
+    Children of children are included, so a renderer's helper processes such as
+    Playwright's driver and browser are counted along with wkhtmltopdf.
+    """
+
+    root = os.getpid() if pid is None else pid
+    children: Dict[int, List[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as handle:
+                # The command name may contain spaces, so fields are counted after it.
+                parent = int(handle.read().rsplit(b")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    found: List[int] = []
+    pending = list(children.get(root, ()))
+    while pending:
+        child = pending.pop()
+        found.append(child)
+        pending.extend(children.get(child, ()))
+    return found
+
+
+class MemoryGovernor:
+    """Track the resident memory of this process and its children against a budget.
+
+    While at least one build is :meth:`monitor`-ing, a sampling thread records
+    the peak usage of each stage (``peak_rss_mb_<stage>``) into the metrics of
+    every such build while that stage has work running. With a ``budget_mb``,
+    :meth:`stage` holds back new work once usage reaches ``high_water`` of the
+    budget and lets it through again when usage drops below ``low_water``. Work
+    is never held back while nothing else is running, so a build over budget
+    still makes progress. Builds that run side by side share one governor, so
+    the budget covers all of them.
+    """
+
+    def __init__(
+        self,
+        budget_mb: Optional[int],
+        child_pids: Callable[[], Iterable[int]] = descendant_pids,
+        *,
+        high_water: float = 0.9,
+        low_water: float = 0.75,
+        interval: float = 0.5,
+    ) -> None:
+        self.budget_mb = budget_mb
+        self.child_pids = child_pids
+        self.high_water = high_water
+        self.low_water = min(low_water, high_water)
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active: Counter[str] = Counter()
+        self._throttled = False
+        self._monitored: List[RunMetrics] = []
+        self._stop: Optional[threading.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def usage(self) -> int:
+        """Resident bytes of this process and every process it started."""
+
+        return sum(rss_bytes(pid) or 0 for pid in (os.getpid(), *self.child_pids()))
+
+    def poll(self) -> int:
+        """Sample the usage and record it as a peak for every stage with work running."""
+
+        usage = self.usage()
+        with self._lock:
+            stages = [stage for stage, running in self._active.items() if running]
+            monitored = list(self._monitored)
+        usage_mb = round(usage / MB, 1)
+        for metrics in monitored:
+            metrics.record_max("peak_rss_mb", usage_mb)
+            for stage in stages:
+                metrics.record_max(f"peak_rss_mb_{stage}", usage_mb)
+        return usage
+
+    def _run(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            self.poll()
+
+    @contextmanager
+    def monitor(self, metrics: RunMetrics) -> Iterator[None]:
+        """Record peak usage into ``metrics`` for the duration of the block.
+
+        The sampling thread runs from the first monitored block until the last one ends.
+        """
+
+        with self._lock:
+            self._monitored.append(metrics)
+            if self._stop is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop,), name="html2manual-memory", daemon=True
+                )
+                self._thread.start()
+        self.poll()
+        try:
+            yield
+        finally:
+            stopped: Optional[threading.Thread] = None
+            with self._lock:
+                self._monitored.remove(metrics)
+                if not self._monitored and self._stop is not None:
+                    self._stop.set()
+                    self._stop = None
+                    stopped = self._thread
+            if stopped is not None:
+                stopped.join()
+
+    def _over_budget(self, usage: int) -> bool:
+        if self.budget_mb is None:
+            return False
+        water = self.low_water if self._throttled else self.high_water
+        throttled = usage >= water * self.budget_mb * MB
+        if throttled != self._throttled:
+            event = "memory_throttle_start" if throttled else "memory_throttle_end"
+            LOGGER.info(event, rss_mb=round(usage / MB, 1), budget_mb=self.budget_mb)
+            self._throttled = throttled
+        return throttled
+
+    def running(self, stage: Optional[str] = None) -> int:
+        """Number of blocks of ``stage``, or of any stage, running now."""
+
+        with self._lock:
+            return self._active[stage] if stage is not None else sum(self._active.values())
+
+    @contextmanager
+    def track(self, stage: str) -> Iterator[None]:
+        """Count the block as running work of ``stage`` without ever holding it back."""
+
+        with self._lock:
+            self._active[stage] += 1
+        try:
+            yield
+        finally:
+            # Short blocks may fall between two samples of the thread.
+            self.poll()
+            with self._lock:
+                self._active[stage] -= 1
+
+    @asynccontextmanager
+    async def stage(self, stage: str, metrics: RunMetrics) -> AsyncIterator[None]:
+        """Wait until there is memory to start more ``stage`` work, then track the block.
+
+        Time spent waiting is counted in ``metrics``, the metrics of the waiting build.
+        """
+
+        waited: Optional[float] = None
+        while self.budget_mb is not None and self.running() and self._over_budget(self.poll()):
+            if waited is None:
+                waited = time.perf_counter()
+                metrics.increment(f"memory_throttled_{stage}")
+            await asyncio.sleep(self.interval)
+        if waited is not None:
+            metrics.increment("memory_throttle_seconds", round(time.perf_counter() - waited, 3))
+        with self.track(stage):
+            yield
+
+
+__all__ = ["MemoryGovernor", "descendant_pids", "rss_bytes"]
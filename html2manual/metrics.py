@@ -0,0 +1,73 @@
+"""Run metrics collected while building manuals."""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict
+
+import structlog
+
+LOGGER = structlog.get_logger(__name__)
+
+
+@dataclass
+class RunMetrics:
+    """Thread-safe counters and gauges reported at the end of a run."""
+
+    values: Dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self.values[name] = value
+
+    def record_max(self, name: str, value: float) -> None:
+        with self._lock:
+            if value > self.values.get(name, float("-inf")):
+                self.values[name] = value
+
+    def get(self, name: str, default: float = 0) -> float:
+        with self._lock:
+            return self.values.get(name, default)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            values = dict(self.values)
+        if values.get("pages_flattened"):
+            values["prescan_skip_rate"] = round(
+                values.get("pages_prescan_skipped", 0) / values["pages_flattened"], 4
+            )
+        if values.get("minify_bytes_before"):
+            saved = values["minify_bytes_before"] - values.get("minify_bytes_after", 0)
+            values["minify_bytes_saved"] = saved
+            values["minify_reduction"] = round(saved / values["minify_bytes_before"], 4)
+        return dict(sorted(values.items()))
+
+    def write(self, path: Path, merge: bool = False) -> Path:
+        """Log the metrics and write them as JSON to ``path``.
+
+        With ``merge`` (a run limited to some sections or pages), metrics the
+        file already holds and this run did not report are kept.
+        """
+
+        snapshot = self.snapshot()
+        LOGGER.info("run_metrics", **snapshot)
+        values = dict(snapshot)
+        if merge:
+            try:
+                values = {**json.loads(path.read_text(encoding="utf-8")), **snapshot}
+            except (OSError, ValueError):
+                pass
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(dict(sorted(values.items())), indent=2), encoding="utf-8")
+        return path
+
+
+__all__ = ["RunMetrics"]
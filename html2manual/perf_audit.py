@@ -0,0 +1,273 @@
+"""Performance audit rules and a render cost estimator."""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from .audit import AuditIssue, _is_external, _resolve_reference
+from .flatten.css_inliner import URL_PATTERN
+from .flatten.encoding import read_text
+
+# Base64 data URIs are a third larger than the bytes they encode.
+BASE64_OVERHEAD = 4 / 3
+MB = 1024 * 1024
+
+
+@dataclass(slots=True)
+class PerfThresholds:
+    """Limits above which a page is flagged by the performance rules."""
+
+    image_bytes: int = 2 * MB
+    inline_script_bytes: int = 512 * 1024
+    table_depth: int = 4
+    page_weight_bytes: int = 10 * MB
+
+
+@dataclass(slots=True)
+class CostModel:
+    """Linear cost model for flatten time, render time and PDF size.
+
+    The defaults are rough figures for wkhtmltopdf on a single core; they only
+    need to rank pages and sections correctly, not to predict exact seconds.
+    """
+
+    flatten_base_seconds: float = 0.01
+    flatten_seconds_per_mb: float = 0.15
+    render_base_seconds: float = 0.25
+    render_seconds_per_mb: float = 0.6
+    render_seconds_per_table_level: float = 0.05
+    pdf_base_bytes: int = 20 * 1024
+    pdf_image_ratio: float = 0.9
+    pdf_text_ratio: float = 0.3
+
+    def flatten_seconds(self, page: "PageCost") -> float:
+        return self.flatten_base_seconds + self.flatten_seconds_per_mb * page.inlined_bytes / MB
+
+    def render_seconds(self, page: "PageCost") -> float:
+        depth_penalty = self.render_seconds_per_table_level * max(0, page.max_table_depth - 1)
+        return (
+            self.render_base_seconds
+            + self.render_seconds_per_mb * page.inlined_bytes / MB
+            + depth_penalty
+        )
+
+    def pdf_bytes(self, page: "PageCost") -> int:
+        text_bytes = page.source_bytes + page.style_bytes + page.script_bytes
+        return int(
+            self.pdf_base_bytes
+            + self.pdf_image_ratio * page.image_bytes
+            + self.pdf_text_ratio * text_bytes
+        )
+
+
+@dataclass(slots=True)
+class PageCost:
+    """Measured weight of a page and its estimated processing cost."""
+
+    file: Path
+    source_bytes: int = 0
+    style_bytes: int = 0
+    script_bytes: int = 0
+    image_bytes: int = 0
+    largest_image_bytes: int = 0
+    largest_inline_script_bytes: int = 0
+    max_table_depth: int = 0
+    inlined_bytes: int = 0
+    estimated_flatten_seconds: float = 0.0
+    estimated_render_seconds: float = 0.0
+    estimated_pdf_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["file"] = str(self.file)
+        return data
+
+
+@dataclass(slots=True)
+class SectionCost:
+    """Estimated totals for one manual section."""
+
+    section: str
+    pages: List[PageCost] = field(default_factory=list)
+
+    @property
+    def estimated_flatten_seconds(self) -> float:
+        return sum(page.estimated_flatten_seconds for page in self.pages)
+
+    @property
+    def estimated_render_seconds(self) -> float:
+        return sum(page.estimated_render_seconds for page in self.pages)
+
+    @property
+    def estimated_pdf_bytes(self) -> int:
+        return sum(page.estimated_pdf_bytes for page in self.pages)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "section": self.section,
+            "pages": len(self.pages),
+            "estimated_flatten_seconds": round(self.estimated_flatten_seconds, 3),
+            "estimated_render_seconds": round(self.estimated_render_seconds, 3),
+            "estimated_pdf_bytes": self.estimated_pdf_bytes,
+        }
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size if path.is_file() else 0
+    except OSError:
+        return 0
+
+
+def _css_url_bytes(css_text: str, base_dir: Path) -> int:
+    total = 0
+    for match in URL_PATTERN.finditer(css_text):
+        reference = match.group("path").strip()
+        if not _is_external(reference):
+            total += _size((base_dir / reference).resolve())
+    return total
+
+
+def _attr(tag: Any, name: str) -> Optional[str]:
+    value = tag.get(name)
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return value if isinstance(value, str) and value else None
+
+
+def measure_page(path: Path, model: Optional[CostModel] = None) -> PageCost:
+    """Measure the weight a page will have after inlining and estimate its cost."""
+
+    model = model or CostModel()
+    html = read_text(path)
+    soup = BeautifulSoup(html, "html.parser")
+    cost = PageCost(file=path, source_bytes=_size(path))
+    embedded = 0
+
+    for link in soup.find_all("link", rel=lambda value: value and "stylesheet" in value):
+        href = _attr(link, "href")
+        if href and not _is_external(href):
+            css_path = _resolve_reference(path, href)
+            cost.style_bytes += _size(css_path)
+            if css_path.is_file():
+                embedded += _css_url_bytes(read_text(css_path), css_path.parent)
+    for style in soup.find_all("style"):
+        if style.string:
+            embedded += _css_url_bytes(str(style.string), path.parent)
+
+    for script in soup.find_all("script"):
+        src = _attr(script, "src")
+        if src and not _is_external(src):
+            # External scripts are inlined whole by js_inline.
+            inline = _size(_resolve_reference(path, src))
+            cost.script_bytes += inline
+        elif script.string:
+            inline = len(str(script.string).encode("utf-8"))
+        else:
+            continue
+        cost.largest_inline_script_bytes = max(cost.largest_inline_script_bytes, inline)
+
+    for img in soup.find_all("img"):
+        src = _attr(img, "src")
+        if src and not _is_external(src):
+            size = _size(_resolve_reference(path, src))
+            cost.image_bytes += size
+            cost.largest_image_bytes = max(cost.largest_image_bytes, size)
+    for tag in soup.find_all(style=True):
+        style_value = _attr(tag, "style")
+        if style_value:
+            embedded += _css_url_bytes(style_value, path.parent)
+
+    for table in soup.find_all("table"):
+        cost.max_table_depth = max(cost.max_table_depth, 1 + len(table.find_parents("table")))
+
+    cost.image_bytes += embedded
+    cost.inlined_bytes = int(
+        cost.source_bytes
+        + cost.style_bytes
+        + cost.script_bytes
+        + BASE64_OVERHEAD * cost.image_bytes
+    )
+    cost.estimated_flatten_seconds = model.flatten_seconds(cost)
+    cost.estimated_render_seconds = model.render_seconds(cost)
+    cost.estimated_pdf_bytes = model.pdf_bytes(cost)
+    return cost
+
+
+def perf_issues(cost: PageCost, thresholds: Optional[PerfThresholds] = None) -> List[AuditIssue]:
+    """Apply the performance rules to a measured page."""
+
+    thresholds = thresholds or PerfThresholds()
+    issues: List[AuditIssue] = []
+    if cost.largest_image_bytes > thresholds.image_bytes:
+        issues.append(
+            AuditIssue(
+                file=cost.file,
+                issue=f"Oversized image ({cost.largest_image_bytes / MB:.1f} MB)",
+                suggestion="Downscale or recompress the image; it is base64 inlined and rasterised "
+                "per page.",
+            )
+        )
+    if cost.largest_inline_script_bytes > thresholds.inline_script_bytes:
+        issues.append(
+            AuditIssue(
+                file=cost.file,
+                issue=f"Huge inlined script ({cost.largest_inline_script_bytes / 1024:.0f} KB)",
+                suggestion="Disable js_inline for this content or strip scripts that are not "
+                "needed in print.",
+            )
+        )
+    if cost.max_table_depth > thresholds.table_depth:
+        issues.append(
+            AuditIssue(
+                file=cost.file,
+                issue=f"Deeply nested tables (depth {cost.max_table_depth})",
+                suggestion="Flatten layout tables; nested tables are slow for wkhtmltopdf to lay "
+                "out.",
+            )
+        )
+    if cost.inlined_bytes > thresholds.page_weight_bytes:
+        issues.append(
+            AuditIssue(
+                file=cost.file,
+                issue=f"Heavy page after inlining ({cost.inlined_bytes / MB:.1f} MB)",
+                suggestion="Split the page or reduce embedded assets to keep render time and PDF "
+                "size down.",
+            )
+        )
+    return issues
+
+
+def estimate_sections(
+    sections: Mapping[str, Sequence[Path]], model: Optional[CostModel] = None
+) -> List[SectionCost]:
+    """Measure every existing page of ``sections`` and group the estimates per section."""
+
+    model = model or CostModel()
+    measured: Dict[Path, PageCost] = {}
+    estimates: List[SectionCost] = []
+    for section, files in sections.items():
+        section_cost = SectionCost(section=section)
+        for path in files:
+            if not path.exists():
+                continue
+            if path not in measured:
+                measured[path] = measure_page(path, model)
+            section_cost.pages.append(measured[path])
+        estimates.append(section_cost)
+    return estimates
+
+
+__all__ = [
+    "CostModel",
+    "PageCost",
+    "PerfThresholds",
+    "SectionCost",
+    "estimate_sections",
+    "measure_page",
+    "perf_issues",
+]
@@ -1,53 +1,190 @@
 """Pipeline orchestration for html2manual."""
+
 from __future__ import annotations
 
+import asyncio
+import shutil
 import subprocess
+import time
+from fnmatch import fnmatch
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
 
 import structlog
 
+from . import tracing
 from .config import Html2ManualConfig
-from .flatten.html_processor import HtmlProcessor
+from .dedupe import DuplicateIndex, plan_chunks
+from .flatten.html_processor import FlattenResult, HtmlProcessor
+from .flatten.js_classifier import (
+    JS_NEEDED,
+    ScriptRules,
+    classify_page,
+    javascript_runs,
+    run_output,
+)
+from .isolation import FAILED_PAGES_FILE, FailedPageReport, bisect_render, render_with_fallback
+from .journal import BuildJournal
+from .memory import MemoryGovernor
 from .menu_parser import SectionMapping, iter_entry_point_parsers
 from .menu_parser.fallback_contents import FallbackStrategy, fallback_sections
 from .menu_parser.mftbc_menu import MFTBCMenuParser
+from .metrics import RunMetrics
+from .progress import ProgressTracker
+from .render.cache import ChunkCache
 from .render.merge import PdfMerger
+from .render.optimize import PdfOptimizer
 from .render.playwright import PlaywrightRenderer
+from .render.registry import ChunkAdapter, ChunkRenderer, Renderer, renderer_factories
 from .render.wkhtml import WkhtmlRenderer
+from .volumes import manual_path, split_section
 
 LOGGER = structlog.get_logger(__name__)
+METRICS_FILE = "metrics.json"
+SHARED_DIR_NAME = "_shared"
 
 
 def parse_sections(config: Html2ManualConfig) -> SectionMapping:
-    menu_path = config.input_dir / config.menu_file
-    if menu_path.exists():
-        parsers = [MFTBCMenuParser(), *iter_entry_point_parsers()]
-        for parser in parsers:
-            try:
-                sections = parser.parse(menu_path, config.input_dir)
-            except Exception as exc:  # pragma: no cover - plugin errors logged
-                LOGGER.warning("menu_parser_failed", parser=parser.name, error=str(exc))
-                continue
-            if sections:
-                LOGGER.info("menu_parser_selected", parser=parser.name, sections=len(sections))
-                return sections
-    LOGGER.info("menu_fallback", strategy=config.fallback_strategy)
-    return fallback_sections(
-        config.input_dir, config.contents_glob, FallbackStrategy(mode=config.fallback_strategy)
+    """Group the manual's pages into sections, keeping only those selected by the config."""
+
+    with tracing.span("parse_menu", "menu", menu=config.menu_file):
+        menu_path = config.input_dir / config.menu_file
+        if menu_path.exists():
+            parsers = [MFTBCMenuParser(), *iter_entry_point_parsers()]
+            for parser in parsers:
+                try:
+                    sections = parser.parse(menu_path, config.input_dir)
+                except Exception as exc:  # pragma: no cover - plugin errors logged
+                    LOGGER.warning("menu_parser_failed", parser=parser.name, error=str(exc))
+                    continue
+                if sections:
+                    LOGGER.info("menu_parser_selected", parser=parser.name, sections=len(sections))
+                    tracing.annotate(parser=parser.name, sections=len(sections))
+                    return select_sections(config, sections)
+        LOGGER.info("menu_fallback", strategy=config.fallback_strategy)
+        tracing.annotate(parser="fallback")
+        strategy = FallbackStrategy(mode=config.fallback_strategy)
+        return select_sections(
+            config, fallback_sections(config.input_dir, config.contents_glob, strategy)
+        )
+
+
+def select_sections(config: Html2ManualConfig, sections: SectionMapping) -> SectionMapping:
+    """Apply the ``sections`` and ``pages`` filters of ``config`` to ``sections``.
+
+    Only paths are compared, so nothing outside the selection is read. Page
+    patterns match a file's name, which a page keeps when it is flattened, so
+    the same patterns select the same pages in every command.
+    """
+
+    if not config.sections and not config.pages:
+        return sections
+    wanted = set(config.sections)
+    unknown = wanted.difference(sections)
+    if unknown:
+        LOGGER.warning("section_filter_unmatched", sections=sorted(unknown))
+    selected: SectionMapping = {}
+    for section, files in sections.items():
+        if wanted and section not in wanted:
+            continue
+        pages = [
+            path
+            for path in files
+            if not config.pages or any(fnmatch(path.name, pattern) for pattern in config.pages)
+        ]
+        if pages:
+            selected[section] = pages
+    LOGGER.info(
+        "sections_selected",
+        sections=list(selected),
+        pages=sum(len(files) for files in selected.values()),
+        skipped_sections=len(sections) - len(selected),
     )
+    return selected
+
 
+def load_flattened(config: Html2ManualConfig) -> SectionMapping:
+    """List previously flattened pages per section, honouring the section and page filters.
+
+    With a section filter only the selected section folders are listed.
+    """
+
+    flattened_root = config.output_dir / "flattened"
+    if config.sections:
+        section_dirs = [flattened_root / name for name in config.sections]
+    else:
+        section_dirs = list(flattened_root.iterdir())
+    flattened: SectionMapping = {}
+    for section_dir in section_dirs:
+        if section_dir.is_dir():
+            # Hidden files are partial writes of a killed build, not pages.
+            pages = [path for path in section_dir.glob("*.html") if not path.name.startswith(".")]
+            flattened[section_dir.name] = sorted(pages)
+    return select_sections(config, flattened)
 
-def flatten_sections(config: Html2ManualConfig, sections: SectionMapping) -> Dict[str, List[Path]]:
-    processor = HtmlProcessor(
+
+def script_rules(config: Html2ManualConfig) -> ScriptRules:
+    return ScriptRules(keep=tuple(config.js_keep_scripts), strip=tuple(config.js_strip_scripts))
+
+
+def js_min_run(config: Html2ManualConfig) -> int:
+    """Fewest pages a run without script needs before it is rendered as its own process."""
+
+    return max(1, config.chunk_size // 2)
+
+
+def make_processor(config: Html2ManualConfig) -> HtmlProcessor:
+    return HtmlProcessor(
         css_inline=config.css_inline,
         js_inline=config.js_inline,
         images_inline=config.images_inline,
         overflow_fix_enable=config.overflow_fix_enable,
         overflow_selectors=config.overflow_fix_selectors,
+        script_rules=script_rules(config),
+        minify=config.minify_html,
     )
+
+
+def flatten_page(
+    processor: HtmlProcessor,
+    html_file: Path,
+    destination: Path,
+    metrics: Optional[RunMetrics] = None,
+    warn: Optional[Callable[..., Any]] = None,
+) -> FlattenResult:
+    """Flatten ``html_file`` into ``destination`` and log any warnings.
+
+    ``warn`` replaces the logger's ``warning`` method for the flatten warnings.
+    """
+
+    with tracing.span("flatten", "flatten", page=str(html_file)):
+        result = processor.flatten_to_file(html_file, destination)
+    if result.warnings:
+        for warning in result.warnings:
+            (warn or LOGGER.warning)("flatten_warning", file=str(html_file), warning=warning)
+    if metrics is not None:
+        metrics.increment("pages_flattened")
+        metrics.increment(f"pages_js_{result.js_class.replace('-', '_')}")
+        if result.scripts_stripped:
+            metrics.increment("scripts_stripped", result.scripts_stripped)
+        if result.skipped:
+            metrics.increment("pages_prescan_skipped")
+        if "minify" in result.transforms:
+            metrics.increment("minify_bytes_before", result.bytes_before_minify)
+            metrics.increment("minify_bytes_after", result.bytes_after_minify)
+    return result
+
+
+def flatten_sections(
+    config: Html2ManualConfig, sections: SectionMapping, metrics: Optional[RunMetrics] = None
+) -> Dict[str, List[Path]]:
+    processor = make_processor(config)
     flattened_root = config.output_dir / "flattened"
     flattened_root.mkdir(parents=True, exist_ok=True)
+    duplicates = (
+        DuplicateIndex.from_sources(sections) if config.dedupe_pages else DuplicateIndex({}, [])
+    )
+    shared: Dict[str, Path] = {}
     flattened: Dict[str, List[Path]] = {}
     for section, files in sections.items():
         section_dir = flattened_root / section
@@ -58,17 +195,94 @@ def flatten_sections(config: Html2ManualConfig, sections: SectionMapping) -> Dic
                 LOGGER.warning("flatten_missing_file", file=str(html_file))
                 continue
             destination = section_dir / html_file.name
-            result = processor.flatten_to_file(html_file, destination)
-            if result.warnings:
-                for warning in result.warnings:
-                    LOGGER.warning("flatten_warning", file=str(html_file), warning=warning)
+            key = duplicates.key(html_file) if duplicates.is_shared(html_file) else None
+            if key is not None and key in shared:
+                shutil.copyfile(shared[key], destination)
+                if metrics is not None:
+                    metrics.increment("dedupe_flattens_skipped")
+            else:
+                flatten_page(processor, html_file, destination, metrics)
+                if key is not None:
+                    shared[key] = destination
             flattened_paths.append(destination)
         flattened[section] = flattened_paths
     return flattened
 
 
-def render_sections(config: Html2ManualConfig, flattened: Dict[str, List[Path]]) -> Dict[str, Path]:
-    renderer = WkhtmlRenderer(
+def make_chunk_cache(config: Html2ManualConfig) -> Optional[ChunkCache]:
+    if not config.chunk_cache_enable:
+        return None
+    root = config.chunk_cache_dir or config.output_dir / ".cache" / "chunks"
+    return ChunkCache(root, config.chunk_cache_max_mb * 1024 * 1024)
+
+
+def make_governor(config: Html2ManualConfig) -> MemoryGovernor:
+    return MemoryGovernor(
+        config.memory_budget_mb,
+        high_water=config.memory_high_water,
+        low_water=config.memory_low_water,
+        interval=config.memory_sample_interval,
+    )
+
+
+def select_renderer(config: Html2ManualConfig) -> str:
+    """Return the engine for ``config.renderer``, resolving ``auto`` from the last calibration."""
+
+    if config.renderer != "auto":
+        return config.renderer
+    from .calibration import load_choice
+
+    chosen = load_choice(config)
+    if chosen is None:
+        LOGGER.warning("renderer_calibration_missing", fallback="wkhtmltopdf")
+        return "wkhtmltopdf"
+    return chosen
+
+
+def variant_configs(config: Html2ManualConfig) -> Dict[str, Html2ManualConfig]:
+    """Return :meth:`Html2ManualConfig.variant_configs` with ``renderer: auto`` resolved.
+
+    The calibration is stored under the top-level ``output_dir``, not under
+    each variant's, so ``auto`` is resolved once there.
+    """
+
+    variants = config.variant_configs()
+    if any(variant.renderer == "auto" for variant in variants.values()):
+        renderer = select_renderer(config.model_copy(update={"renderer": "auto"}))
+        for name, variant in variants.items():
+            if variant.renderer == "auto":
+                variants[name] = variant.model_copy(update={"renderer": renderer})
+    return variants
+
+
+def make_renderer(
+    config: Html2ManualConfig,
+    cache: Optional[ChunkCache] = None,
+    playwright: Optional[PlaywrightRenderer] = None,
+) -> ChunkRenderer:
+    """Create the configured engine; plugin engines are wrapped in a :class:`ChunkAdapter`.
+
+    ``playwright`` is a renderer with a warm browser to use when the engine is Playwright.
+    """
+
+    name = select_renderer(config)
+    if name == "wkhtmltopdf":
+        return make_wkhtml_renderer(config, cache)
+    if name == "playwright" and playwright is not None:
+        return ChunkAdapter(playwright, cache)
+    factories = renderer_factories()
+    if name not in factories:
+        raise ValueError(
+            f"Unknown renderer {name!r}; installed renderers: {', '.join(sorted(factories))}"
+        )
+    LOGGER.info("renderer_selected", renderer=name)
+    return ChunkAdapter(factories[name](config, None), cache)
+
+
+def make_wkhtml_renderer(
+    config: Html2ManualConfig, cache: Optional[ChunkCache] = None
+) -> WkhtmlRenderer:
+    return WkhtmlRenderer(
         executable=config.wkhtmltopdf_path,
         page_size=config.page_size,
         margin_top=config.margin_top,
@@ -77,48 +291,325 @@ def render_sections(config: Html2ManualConfig, flattened: Dict[str, List[Path]])
         margin_right=config.margin_right,
         zoom=config.zoom,
         chunk_size=config.chunk_size,
+        cache=cache,
+        timeout=config.render_timeout,
+        memory_limit_mb=config.render_memory_limit_mb,
+        address_space_limit_mb=config.render_address_space_limit_mb,
+        retries=config.render_retries,
+        retry_backoff=config.render_retry_backoff,
+        concat_pages=config.render_mode == "concat",
+    )
+
+
+def make_fallback_renderer(
+    config: Html2ManualConfig, cache: Optional[ChunkCache] = None, *, keep_browser: bool = False
+) -> PlaywrightRenderer:
+    return PlaywrightRenderer(
+        page_size=config.page_size,
+        margin_top=config.margin_top,
+        margin_bottom=config.margin_bottom,
+        margin_left=config.margin_left,
+        margin_right=config.margin_right,
+        zoom=config.zoom,
+        cache=cache,
+        keep_browser=keep_browser,
+        concat_pages=config.render_mode == "concat",
     )
+
+
+def finalize_section(
+    merger: PdfMerger,
+    section: str,
+    chunk_pdfs: List[Path],
+    manuals_dir: Path,
+    keep: Collection[Path] = (),
+) -> Path:
+    """Merge a section's chunk PDFs into ``manuals_dir/<section>.pdf``.
+
+    Chunk PDFs are removed afterwards unless listed in ``keep`` (PDFs of pages
+    shared with other sections).
+    """
+
+    merged_path = manuals_dir / f"{section}.pdf"
+    if len(chunk_pdfs) > 1:
+        merger.merge(chunk_pdfs, merged_path)
+        for extra in chunk_pdfs:
+            if extra not in keep:
+                extra.unlink(missing_ok=True)
+        return merged_path
+    if chunk_pdfs[0] in keep:
+        shutil.copyfile(chunk_pdfs[0], merged_path)
+    elif chunk_pdfs[0] != merged_path:
+        shutil.move(str(chunk_pdfs[0]), merged_path)
+    return merged_path
+
+
+def optimize_manual(
+    config: Html2ManualConfig, section: str, pdf: Path, metrics: Optional[RunMetrics] = None
+) -> None:
+    """Run the optional post-merge optimisation pass on a section manual."""
+
+    if not config.pdf_optimize:
+        return
+    result = PdfOptimizer(linearize=config.pdf_linearize).optimize(pdf)
+    LOGGER.info(
+        "pdf_optimized",
+        section=section,
+        pdf=str(pdf),
+        bytes_before=result.bytes_before,
+        bytes_after=result.bytes_after,
+        saved_ratio=round(result.saved_ratio, 4),
+        linearized=result.linearized,
+    )
+    if metrics is not None:
+        metrics.increment("pdf_bytes_before_optimize", result.bytes_before)
+        metrics.increment("pdf_bytes_after_optimize", result.bytes_after)
+
+
+def volume_limits(config: Html2ManualConfig) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """Return ``(max_pages, max_bytes)`` when manuals are split into volumes, else ``None``."""
+
+    if config.volume_max_pages is None and config.volume_max_mb is None:
+        return None
+    max_bytes = (
+        int(config.volume_max_mb * 1024 * 1024) if config.volume_max_mb is not None else None
+    )
+    return config.volume_max_pages, max_bytes
+
+
+def fallback_sources(files: Sequence[Path], chunk_pdfs: Sequence[Path]) -> Dict[Path, List[Path]]:
+    """Map fallback PDFs to their pages when the fallback rendered one PDF per page."""
+
+    if len(files) != len(chunk_pdfs):
+        return {}
+    return {pdf: [page] for pdf, page in zip(chunk_pdfs, files, strict=True)}
+
+
+def complete_section(
+    config: Html2ManualConfig,
+    merger: PdfMerger,
+    section: str,
+    chunk_pdfs: List[Path],
+    sources: Dict[Path, List[Path]],
+    manuals_dir: Path,
+    keep: Collection[Path] = (),
+    metrics: Optional[RunMetrics] = None,
+) -> Path:
+    """Merge and optimise a section's chunk PDFs into its manual, or into volumes when configured.
+
+    Returns the manual's PDF or, for a section split into several volumes, its
+    volume index.
+    """
+
+    limits = volume_limits(config)
+    if limits is None:
+        manual = finalize_section(merger, section, chunk_pdfs, manuals_dir, keep)
+        optimize_manual(config, section, manual, metrics)
+        return manual
+
+    def optimize(pdf: Path) -> None:
+        optimize_manual(config, section, pdf, metrics)
+
+    volumes = split_section(
+        merger, section, chunk_pdfs, sources, manuals_dir, *limits, keep, optimize
+    )
+    return manual_path(manuals_dir, section, volumes)
+
+
+def isolate_failed_page(
+    config: Html2ManualConfig,
+    section: str,
+    page: Path,
+    output: Path,
+    error: Exception,
+    report: FailedPageReport,
+    fallback: Optional[Renderer] = None,
+    metrics: Optional[RunMetrics] = None,
+    warn: Optional[Callable[..., Any]] = None,
+) -> Optional[Path]:
+    """Deal with a single page the primary renderer failed on, following ``failed_page_action``.
+
+    Returns ``output`` once the page was rendered with the fallback renderer,
+    or ``None`` when it is left out of the manual. Without
+    ``playwright_fallback`` the ``fallback`` action re-raises ``error``.
+    """
+
+    warn = warn or LOGGER.warning
+    warn("render_page_failed", section=section, page=str(page), error=str(error))
+    reason = str(error)
+    if config.failed_page_action == "fallback":
+        if not config.playwright_fallback:
+            raise error
+        try:
+            with tracing.span("fallback_page", "fallback", section=section, page=str(page)):
+                render_with_fallback(
+                    fallback or make_fallback_renderer(config), section, page, output
+                )
+        except Exception as exc:  # the page is skipped below instead
+            warn("fallback_page_failed", section=section, page=str(page), error=str(exc))
+            reason = f"{reason}; fallback: {exc}"
+        else:
+            report.add(section, page, reason, "fallback")
+            if metrics is not None:
+                metrics.increment("pages_fallback_rendered")
+            return output
+    report.add(section, page, reason, "skipped")
+    if metrics is not None:
+        metrics.increment("pages_skipped")
+    return None
+
+
+def render_sections(
+    config: Html2ManualConfig,
+    flattened: Dict[str, List[Path]],
+    metrics: Optional[RunMetrics] = None,
+) -> Dict[str, Path]:
+    cache = make_chunk_cache(config)
+    renderer = make_renderer(config, cache)
     merger = PdfMerger()
     output_manuals: Dict[str, Path] = {}
     manuals_dir = config.output_dir / "Manuals"
     manuals_dir.mkdir(parents=True, exist_ok=True)
+    shared_dir = manuals_dir / SHARED_DIR_NAME
+    duplicates = (
+        DuplicateIndex.from_flattened(flattened) if config.dedupe_pages else DuplicateIndex({}, [])
+    )
+    shared: Dict[str, Tuple[Path, float]] = {}
+    report = FailedPageReport()
+    fallback: Optional[PlaywrightRenderer] = None
+    rules = script_rules(config)
+    # Units are flushed as they are recorded, so an exception can simply leave the journal behind.
+    journal = BuildJournal.start(config)
 
     for section, files in flattened.items():
+        manual = journal.merged(section, files)
+        if manual is not None:
+            output_manuals[section] = manual
+            if metrics is not None:
+                metrics.increment("resumed_sections")
+            LOGGER.info("render_section_resumed", section=section, pdf=str(manual))
+            continue
         LOGGER.info("render_section_start", section=section, files=len(files))
-        chunk_pdfs: List[Path]
+        chunk_pdfs: List[Path] = []
+        sources: Dict[Path, List[Path]] = {}
+
+        def on_failed_page(
+            page: Path, output: Path, exc: subprocess.CalledProcessError, section: str = section
+        ) -> Optional[Path]:
+            nonlocal fallback
+            if (
+                config.failed_page_action == "fallback"
+                and config.playwright_fallback
+                and fallback is None
+            ):
+                fallback = make_fallback_renderer(config, cache)
+            return isolate_failed_page(
+                config, section, page, output, exc, report, fallback, metrics
+            )
+
         try:
-            chunk_pdfs = renderer.render(section, files, manuals_dir)
+            for chunk in plan_chunks(
+                section, duplicates.split(files, config.chunk_size), manuals_dir, shared_dir
+            ):
+                if chunk.shared_key in shared:
+                    if metrics is not None:
+                        metrics.increment("dedupe_pages_reused")
+                        metrics.increment("dedupe_seconds_saved", shared[chunk.shared_key][1])
+                    chunk_pdfs.append(chunk.output)
+                    sources[chunk.output] = list(chunk.inputs)
+                    continue
+                started = time.perf_counter()
+                flags = [
+                    classify_page(path, rules) == JS_NEEDED if config.js_classify else True
+                    for path in chunk.inputs
+                ]
+                runs = javascript_runs(chunk.inputs, flags, js_min_run(config))
+                for index, (inputs, javascript) in enumerate(runs, start=1):
+                    output = run_output(chunk.output, index, len(runs))
+                    if journal.rendered(inputs, output, javascript):
+                        if metrics is not None:
+                            metrics.increment("resumed_chunks")
+                        rendered = [(output, inputs)]
+                    else:
+                        rendered = bisect_render(
+                            renderer, inputs, output, on_failed_page, javascript=javascript
+                        )
+                        if rendered == [(output, inputs)]:
+                            journal.record_render(inputs, output, javascript)
+                    for pdf, pages in rendered:
+                        chunk_pdfs.append(pdf)
+                        sources[pdf] = pages
+                if chunk.shared_key is not None and chunk.output.exists():
+                    shared[chunk.shared_key] = (chunk.output, time.perf_counter() - started)
         except (FileNotFoundError, subprocess.CalledProcessError) as exc:
             LOGGER.warning("wkhtml_render_failed", section=section, error=str(exc))
             if not config.playwright_fallback:
                 raise
             LOGGER.info("playwright_fallback_start", section=section)
-            fallback = PlaywrightRenderer(
-                page_size=config.page_size,
-                margin_top=config.margin_top,
-                margin_bottom=config.margin_bottom,
-                margin_left=config.margin_left,
-                margin_right=config.margin_right,
-                zoom=config.zoom,
-            )
-            chunk_pdfs = fallback.render(section, files, manuals_dir)
-        if len(chunk_pdfs) > 1:
-            merged_path = manuals_dir / f"{section}.pdf"
-            merger.merge(chunk_pdfs, merged_path)
-            output_manuals[section] = merged_path
-            for extra in chunk_pdfs:
-                extra.unlink(missing_ok=True)
-        else:
-            output_manuals[section] = chunk_pdfs[0]
+            chunk_pdfs = make_fallback_renderer(config, cache).render(section, files, manuals_dir)
+            sources = fallback_sources(files, chunk_pdfs)
+        if not chunk_pdfs:
+            LOGGER.warning("render_section_empty", section=section)
+            continue
+        keep = {output for output, _ in shared.values()}
+        output_manuals[section] = complete_section(
+            config, merger, section, chunk_pdfs, sources, manuals_dir, keep, metrics
+        )
+        journal.record_merge(section, output_manuals[section], files)
         LOGGER.info("render_section_complete", section=section, pdf=str(output_manuals[section]))
+    journal.finish()
+    shutil.rmtree(shared_dir, ignore_errors=True)
+    report.write(config.output_dir / FAILED_PAGES_FILE, flattened if config.filtered else None)
+    if cache is not None:
+        LOGGER.info("chunk_cache_stats", hits=cache.hits, misses=cache.misses)
     return output_manuals
 
 
-def build_manuals(config: Html2ManualConfig) -> Dict[str, Path]:
+def build_manuals(
+    config: Html2ManualConfig, progress: Optional[ProgressTracker] = None
+) -> Dict[str, Path]:
+    from .streaming import stream_build, stream_variants
+
     sections = parse_sections(config)
-    flattened = flatten_sections(config, sections)
-    manuals = render_sections(config, flattened)
+    if config.variants:
+        variant_metrics: Dict[str, RunMetrics] = {}
+        built = asyncio.run(stream_variants(config, sections, variant_metrics, progress))
+        for name, variant in variant_configs(config).items():
+            variant_metrics[name].write(variant.output_dir / METRICS_FILE, variant.filtered)
+        return {
+            f"{name}/{section}": manual
+            for name, manuals in built.items()
+            for section, manual in manuals.items()
+        }
+    metrics = RunMetrics()
+    manuals = asyncio.run(stream_build(config, sections, metrics, progress))
+    metrics.write(config.output_dir / METRICS_FILE, config.filtered)
     return manuals
 
 
-__all__ = ["build_manuals", "parse_sections", "flatten_sections", "render_sections"]
+__all__ = [
+    "METRICS_FILE",
+    "SHARED_DIR_NAME",
+    "build_manuals",
+    "parse_sections",
+    "select_sections",
+    "load_flattened",
+    "flatten_sections",
+    "render_sections",
+    "flatten_page",
+    "complete_section",
+    "fallback_sources",
+    "finalize_section",
+    "make_chunk_cache",
+    "make_governor",
+    "make_processor",
+    "make_renderer",
+    "make_wkhtml_renderer",
+    "js_min_run",
+    "script_rules",
+    "select_renderer",
+    "variant_configs",
+    "make_fallback_renderer",
+    "optimize_manual",
+    "volume_limits",
+]
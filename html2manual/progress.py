@@ -0,0 +1,208 @@
+"""Progress, throughput and ETA reporting for long running builds."""
+
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Callable, Dict, List, Optional, Type
+
+import structlog
+from rich.console import Console
+from rich.live import Live
+from rich.table import Table
+
+LOGGER = structlog.get_logger(__name__)
+
+STAGES = ("flatten", "render", "merge")
+
+
+@dataclass(slots=True)
+class StageProgress:
+    """Point-in-time view of one pipeline stage."""
+
+    stage: str
+    done: int
+    total: int
+    bytes: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """Units completed per second since the stage's work was first announced."""
+
+        return self.done / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def byte_rate(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the stage finishes at the current rate, if known."""
+
+        if self.done >= self.total:
+            return 0.0
+        if not self.rate:
+            return None
+        return (self.total - self.done) / self.rate
+
+    def as_dict(self) -> Dict[str, object]:
+        eta = self.eta
+        return {
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "bytes": self.bytes,
+            "rate": round(self.rate, 3),
+            "bytes_per_sec": round(self.byte_rate),
+            "eta_seconds": None if eta is None else round(eta, 1),
+        }
+
+
+class ProgressTracker:
+    """Thread-safe counters for the flatten, render and merge stages.
+
+    Totals may grow while a build runs (sections are discovered as the
+    pipeline streams), so the ETA is recomputed from the latest totals each
+    time a snapshot is taken.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._done = dict.fromkeys(STAGES, 0)
+        self._total = dict.fromkeys(STAGES, 0)
+        self._bytes = dict.fromkeys(STAGES, 0)
+        self._started: Dict[str, float] = {}
+
+    def add_total(self, stage: str, count: int) -> None:
+        with self._lock:
+            self._started.setdefault(stage, self._clock())
+            self._total[stage] += count
+
+    def advance(self, stage: str, count: int = 1, nbytes: int = 0) -> None:
+        with self._lock:
+            self._started.setdefault(stage, self._clock())
+            self._done[stage] += count
+            self._bytes[stage] += nbytes
+
+    def snapshot(self) -> List[StageProgress]:
+        with self._lock:
+            now = self._clock()
+            return [
+                StageProgress(
+                    stage=stage,
+                    done=self._done[stage],
+                    total=self._total[stage],
+                    bytes=self._bytes[stage],
+                    elapsed=now - self._started[stage] if stage in self._started else 0.0,
+                )
+                for stage in STAGES
+            ]
+
+
+class LogProgressReporter:
+    """Emit ``build_progress`` events every ``interval`` seconds."""
+
+    def __init__(self, tracker: ProgressTracker, interval: float = 10.0) -> None:
+        self.tracker = tracker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="html2manual-progress", daemon=True)
+
+    def emit(self) -> None:
+        for stage in self.tracker.snapshot():
+            LOGGER.info("build_progress", **stage.as_dict())
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.emit()
+
+    def __enter__(self) -> "LogProgressReporter":
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.emit()
+
+
+def _format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "?"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{secs:02d}"
+
+
+def render_progress_table(stages: List[StageProgress]) -> Table:
+    table = Table(title="html2manual build")
+    table.add_column("Stage", style="cyan")
+    table.add_column("Done", justify="right")
+    table.add_column("MB", justify="right")
+    table.add_column("Rate/s", justify="right")
+    table.add_column("MB/s", justify="right")
+    table.add_column("ETA", justify="right", style="green")
+    for stage in stages:
+        table.add_row(
+            stage.stage,
+            f"{stage.done}/{stage.total}",
+            f"{stage.bytes / 1_048_576:.1f}",
+            f"{stage.rate:.2f}",
+            f"{stage.byte_rate / 1_048_576:.2f}",
+            _format_eta(stage.eta),
+        )
+    return table
+
+
+class RichProgressReporter:
+    """Live terminal table refreshed from a :class:`ProgressTracker`."""
+
+    def __init__(self, tracker: ProgressTracker, console: Optional[Console] = None) -> None:
+        self.tracker = tracker
+        self._live = Live(
+            console=console,
+            refresh_per_second=2,
+            get_renderable=lambda: render_progress_table(self.tracker.snapshot()),
+        )
+
+    def __enter__(self) -> "RichProgressReporter":
+        self._live.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self._live.stop()
+
+
+def progress_reporter(
+    tracker: ProgressTracker, *, interval: float = 10.0, console: Optional[Console] = None
+) -> LogProgressReporter | RichProgressReporter:
+    """Pick the live display on a terminal and periodic log events otherwise."""
+
+    console = console or Console(stderr=True)
+    if console.is_terminal:
+        return RichProgressReporter(tracker, console)
+    return LogProgressReporter(tracker, interval)
+
+
+__all__ = [
+    "ProgressTracker",
+    "StageProgress",
+    "LogProgressReporter",
+    "RichProgressReporter",
+    "progress_reporter",
+    "render_progress_table",
+]
@@ -3,5 +3,6 @@
 from .wkhtml import WkhtmlRenderer
 from .playwright import PlaywrightRenderer
 from .merge import PdfMerger
+from .optimize import PdfOptimizer
 
-__all__ = ["WkhtmlRenderer", "PlaywrightRenderer", "PdfMerger"]
+__all__ = ["WkhtmlRenderer", "PlaywrightRenderer", "PdfMerger", "PdfOptimizer"]
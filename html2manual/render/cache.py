@@ -0,0 +1,117 @@
+"""Persistent cache of rendered chunk PDFs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import List, Mapping, Optional, Sequence, Tuple
+
+from ..journal import atomic_output
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of ``path``."""
+
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChunkCache:
+    """Store chunk PDFs keyed by input content and renderer options.
+
+    Entries live under ``root`` as ``<key[:2]>/<key>.pdf``. An entry's mtime is
+    bumped on every hit so eviction can drop the least recently used files once
+    the total size exceeds ``max_bytes``. The total is kept as a running count
+    between scans, so a store only lists the cache when it goes over the cap.
+    """
+
+    def __init__(self, root: Path, max_bytes: int) -> None:
+        self.root = root
+        self.max_bytes = max(0, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Bytes under ``root``; ``None`` until the first store scans it.
+        self._size: Optional[int] = None
+
+    def key(self, identity: Mapping[str, str], inputs: Sequence[Path]) -> str:
+        digest = hashlib.sha256()
+        digest.update(json.dumps(dict(identity), sort_keys=True).encode("utf-8"))
+        for path in inputs:
+            digest.update(b"\0")
+            digest.update(file_digest(path).encode("ascii"))
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pdf"
+
+    def fetch(self, key: str, destination: Path) -> bool:
+        """Copy the cached PDF for ``key`` to ``destination`` if present."""
+
+        entry = self._entry(key)
+        with self._lock:
+            if not entry.exists():
+                self.misses += 1
+                return False
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_output(destination) as partial:
+                shutil.copyfile(entry, partial)
+            os.utime(entry)
+            self.hits += 1
+        return True
+
+    def store(self, key: str, source: Path) -> None:
+        """Add ``source`` to the cache under ``key`` and enforce the size cap."""
+
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        partial = entry.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(source, partial)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_locked()[1]
+            try:
+                self._size -= entry.stat().st_size
+            except OSError:
+                pass
+            self._size += partial.stat().st_size
+            os.replace(partial, entry)
+            if self._size > self.max_bytes:
+                self._evict_locked()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+
+        with self._lock:
+            return self._evict_locked()
+
+    def _scan_locked(self) -> Tuple[List[Tuple[Path, os.stat_result]], int]:
+        if not self.root.exists():
+            return [], 0
+        entries = [(path, path.stat()) for path in self.root.glob("*/*.pdf")]
+        return entries, sum(stat.st_size for _, stat in entries)
+
+    def _evict_locked(self) -> int:
+        # Other processes may share the cache, so eviction works from a fresh scan.
+        entries, total = self._scan_locked()
+        removed = 0
+        for path, stat in sorted(entries, key=lambda item: item[1].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+            removed += 1
+        self._size = total
+        return removed
+
+
+__all__ = ["ChunkCache", "file_digest"]
@@ -0,0 +1,121 @@
+"""Merge a section's flattened pages into one HTML document for rendering."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from dataclasses import dataclass
+from html import escape
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from bs4 import BeautifulSoup, Doctype, Tag
+
+from ..flatten.encoding import read_text
+
+PAGE_CLASS = "html2manual-page"
+PAGE_BREAK_CSS = (
+    f".{PAGE_CLASS} + .{PAGE_CLASS} {{ page-break-before: always; break-before: page; }}"
+)
+# Head elements that are hoisted into the combined document's head.
+HOISTED_TAGS = ["style", "link", "script"]
+
+
+@dataclass(slots=True)
+class ConcatResult:
+    """A combined document and how much repeated head content it dropped."""
+
+    path: Path
+    pages: int
+    bytes_before: int
+    bytes_after: int
+    head_blocks_deduplicated: int
+
+
+def _wrapper_attributes(body: Optional[Tag], page: Path) -> str:
+    classes = [PAGE_CLASS]
+    style: object = None
+    if body is not None:
+        body_class = body.get("class")
+        if isinstance(body_class, list):
+            classes.extend(body_class)
+        elif isinstance(body_class, str):
+            classes.append(body_class)
+        style = body.get("style")
+    attributes = [f'class="{escape(" ".join(classes))}"', f'data-source="{escape(page.name)}"']
+    if isinstance(style, str) and style:
+        attributes.append(f'style="{escape(style)}"')
+    return " ".join(attributes)
+
+
+def concat_path(directory: Path, stem: str) -> Path:
+    """Create an empty, uniquely named, hidden file in ``directory`` for a combined document.
+
+    Builds rendering the same pages at once, such as a run's variants, each
+    get their own file. ``directory`` should not be a flattened section
+    folder, or a file left by a killed build would be listed as a page.
+    """
+
+    directory.mkdir(parents=True, exist_ok=True)
+    handle, name = tempfile.mkstemp(prefix=f"._concat_{stem}.", suffix=".html", dir=directory)
+    os.close(handle)
+    return Path(name)
+
+
+def concatenate_pages(pages: Sequence[Path], output: Path) -> ConcatResult:
+    """Write ``pages`` to ``output`` as one document, one page-break separated block per page.
+
+    Stylesheets and head scripts are hoisted into a single head and repeated
+    copies are dropped, so shared CSS is parsed once instead of once per page.
+    Each page's body is wrapped in a ``div`` carrying the body's class and
+    style. Page-specific head styles apply to the whole document, so the mode
+    suits sections whose pages share one stylesheet.
+
+    The document's ``<base>`` is the first page's folder, so relative
+    references that were not inlined still resolve wherever ``output`` is.
+    """
+
+    hoisted: Dict[str, None] = {}
+    duplicates = 0
+    blocks: List[str] = []
+    bytes_before = 0
+    for page in pages:
+        html = read_text(page)
+        bytes_before += len(html.encode("utf-8"))
+        soup = BeautifulSoup(html, "html.parser")
+        if soup.head is not None:
+            for tag in soup.head.find_all(HOISTED_TAGS):
+                markup = str(tag)
+                if markup in hoisted:
+                    duplicates += 1
+                else:
+                    hoisted[markup] = None
+            soup.head.decompose()
+        container = soup.body or soup.html or soup
+        content = "".join(str(node) for node in container.contents if not isinstance(node, Doctype))
+        blocks.append(f"<div {_wrapper_attributes(soup.body, page)}>{content}</div>")
+
+    document = "\n".join(
+        [
+            "<!DOCTYPE html>",
+            "<html><head>",
+            '<meta charset="utf-8">',
+            f'<base href="{escape(pages[0].parent.as_uri())}/">',
+            f"<style>{PAGE_BREAK_CSS}</style>",
+            *hoisted,
+            "</head><body>",
+            *blocks,
+            "</body></html>",
+        ]
+    )
+    output.write_text(document, encoding="utf-8")
+    return ConcatResult(
+        path=output,
+        pages=len(pages),
+        bytes_before=bytes_before,
+        bytes_after=len(document.encode("utf-8")),
+        head_blocks_deduplicated=duplicates,
+    )
+
+
+__all__ = ["ConcatResult", "PAGE_CLASS", "concat_path", "concatenate_pages"]
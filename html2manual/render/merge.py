@@ -1,4 +1,5 @@
 """PDF merging utilities."""
+
 from __future__ import annotations
 
 from pathlib import Path
@@ -6,19 +7,25 @@ from typing import Iterable
 
 from pypdf import PdfReader, PdfWriter
 
+from .. import tracing
+from ..journal import atomic_output
+
 
 class PdfMerger:
     """Merge multiple PDF chunks into a single file."""
 
     def merge(self, pdf_paths: Iterable[Path], output_path: Path) -> Path:
-        writer = PdfWriter()
-        for pdf in pdf_paths:
-            reader = PdfReader(str(pdf))
-            for page in reader.pages:
-                writer.add_page(page)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with output_path.open("wb") as handle:
-            writer.write(handle)
+        with tracing.span("merge", "merge", output=output_path.name) as span:
+            writer = PdfWriter()
+            for pdf in pdf_paths:
+                reader = PdfReader(str(pdf))
+                for page in reader.pages:
+                    writer.add_page(page)
+            if span is not None:
+                span["pages"] = len(writer.pages)
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_output(output_path) as partial, partial.open("wb") as handle:
+                writer.write(handle)
         return output_path
 
 
@@ -0,0 +1,71 @@
+"""Post-merge PDF size optimisation."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+from pypdf import PdfReader, PdfWriter
+
+from ..journal import atomic_output
+
+LOGGER = structlog.get_logger(__name__)
+
+
+@dataclass(slots=True)
+class OptimizeResult:
+    """Sizes of a PDF before and after optimisation."""
+
+    path: Path
+    bytes_before: int
+    bytes_after: int
+    linearized: bool = False
+
+    @property
+    def saved_ratio(self) -> float:
+        return 1 - self.bytes_after / self.bytes_before if self.bytes_before else 0.0
+
+
+class PdfOptimizer:
+    """Shrink merged PDFs by sharing identical objects and compressing content streams."""
+
+    def __init__(
+        self, *, deduplicate: bool = True, compress_streams: bool = True, linearize: bool = False
+    ) -> None:
+        self.deduplicate = deduplicate
+        self.compress_streams = compress_streams
+        self.linearize = linearize
+
+    def optimize(self, path: Path) -> OptimizeResult:
+        before = path.stat().st_size
+        writer = PdfWriter(clone_from=PdfReader(str(path)))
+        if self.compress_streams:
+            for page in writer.pages:
+                page.compress_content_streams()
+        if self.deduplicate:
+            # Chunks rendered separately embed their own copies of fonts and
+            # repeated images; identical objects collapse to a single one.
+            writer.compress_identical_objects()
+        with atomic_output(path) as partial, partial.open("wb") as handle:
+            writer.write(handle)
+        linearized = self.linearize and self._linearize(path)
+        return OptimizeResult(
+            path=path, bytes_before=before, bytes_after=path.stat().st_size, linearized=linearized
+        )
+
+    def _linearize(self, path: Path) -> bool:
+        try:
+            import pikepdf  # type: ignore
+        except ImportError:
+            LOGGER.warning(
+                "pdf_linearize_unavailable", pdf=str(path), reason="pikepdf is not installed"
+            )
+            return False
+        # The source is closed before the linearized copy replaces it.
+        with atomic_output(path) as partial, pikepdf.open(path) as pdf:
+            pdf.save(partial, linearize=True)
+        return True
+
+
+__all__ = ["PdfOptimizer", "OptimizeResult"]
@@ -1,13 +1,23 @@
 """Playwright based rendering fallback."""
+
 from __future__ import annotations
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata
 from pathlib import Path
-from typing import List, Sequence
+from typing import Any, Dict, List, Optional, Sequence
+
+from .. import tracing
+from .cache import ChunkCache
+from .concat import concat_path, concatenate_pages
 
 
 class PlaywrightRenderer:
     """Render HTML files to PDF using Playwright's headless Chromium."""
 
+    name = "playwright-chromium"
+
     def __init__(
         self,
         *,
@@ -17,6 +27,9 @@ class PlaywrightRenderer:
         margin_left: str = "10mm",
         margin_right: str = "10mm",
         zoom: float = 1.0,
+        cache: ChunkCache | None = None,
+        keep_browser: bool = False,
+        concat_pages: bool = False,
     ) -> None:
         self.page_size = page_size
         self.margin_top = margin_top
@@ -24,37 +37,138 @@ class PlaywrightRenderer:
         self.margin_left = margin_left
         self.margin_right = margin_right
         self.zoom = zoom
+        self.cache = cache
+        self.keep_browser = keep_browser
+        self.concat_pages = concat_pages
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._playwright: Any = None
+        self._browser: Any = None
+
+    @property
+    def version(self) -> str:
+        try:
+            return metadata.version("playwright")
+        except metadata.PackageNotFoundError:
+            return "unknown"
+
+    def cache_identity(self) -> Dict[str, str]:
+        """Return the renderer settings that affect the produced PDF."""
+
+        return {
+            "renderer": self.name,
+            "version": self.version,
+            "page_size": self.page_size,
+            "margin_top": self.margin_top,
+            "margin_bottom": self.margin_bottom,
+            "margin_left": self.margin_left,
+            "margin_right": self.margin_right,
+            "zoom": str(self.zoom),
+        }
 
     def render(self, section_name: str, html_files: Sequence[Path], output_dir: Path) -> List[Path]:
-        from playwright.sync_api import sync_playwright  # type: ignore
+        with tracing.span("playwright", "fallback", section=section_name, pages=len(html_files)):
+            return self._render(section_name, html_files, output_dir)
 
+    def _render(
+        self, section_name: str, html_files: Sequence[Path], output_dir: Path
+    ) -> List[Path]:
         output_dir.mkdir(parents=True, exist_ok=True)
-        outputs: List[Path] = []
+        if self.keep_browser:
+            # The sync API is bound to the thread that started it, so the warm
+            # browser lives on a dedicated thread and renders are handed to it.
+            return (
+                self._browser_thread()
+                .submit(self._render_warm, section_name, html_files, output_dir)
+                .result()
+            )
+
+        from playwright.sync_api import sync_playwright  # type: ignore
+
         with sync_playwright() as p:
             browser = p.chromium.launch()
-            context = browser.new_context()
-            for index, html_file in enumerate(html_files, start=1):
-                page = context.new_page()
-                page.goto(html_file.as_uri(), wait_until="networkidle")
-                page.emulate_media(media="print")
-                output_file = output_dir / f"{section_name}_{index:02d}.pdf"
-                page.pdf(
-                    path=str(output_file),
-                    format=self.page_size,
-                    print_background=True,
-                    margin={
-                        "top": self.margin_top,
-                        "bottom": self.margin_bottom,
-                        "left": self.margin_left,
-                        "right": self.margin_right,
-                    },
-                    scale=self.zoom,
+            try:
+                return self._render_pages(browser, section_name, html_files, output_dir)
+            finally:
+                browser.close()
+
+    def _browser_thread(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="html2manual-playwright"
                 )
-                outputs.append(output_file)
-                page.close()
-            context.close()
-            browser.close()
+            return self._executor
+
+    def _render_warm(
+        self, section_name: str, html_files: Sequence[Path], output_dir: Path
+    ) -> List[Path]:
+        if self._browser is None:
+            from playwright.sync_api import sync_playwright  # type: ignore
+
+            self._playwright = sync_playwright().start()
+            self._browser = self._playwright.chromium.launch()
+        return self._render_pages(self._browser, section_name, html_files, output_dir)
+
+    def _render_pages(
+        self, browser: Any, section_name: str, html_files: Sequence[Path], output_dir: Path
+    ) -> List[Path]:
+        if self.concat_pages and len(html_files) > 1:
+            combined = concat_path(output_dir, section_name)
+            try:
+                concatenate_pages(html_files, combined)
+                return self._render_pages(browser, section_name, [combined], output_dir)
+            finally:
+                combined.unlink(missing_ok=True)
+        outputs: List[Path] = []
+        context = browser.new_context()
+        identity = self.cache_identity() if self.cache is not None else {}
+        for index, html_file in enumerate(html_files, start=1):
+            output_file = output_dir / f"{section_name}_{index:02d}.pdf"
+            key: Optional[str] = None
+            if self.cache is not None:
+                key = self.cache.key(identity, [html_file])
+                if self.cache.fetch(key, output_file):
+                    outputs.append(output_file)
+                    continue
+            page = context.new_page()
+            page.goto(html_file.as_uri(), wait_until="networkidle")
+            page.emulate_media(media="print")
+            page.pdf(
+                path=str(output_file),
+                format=self.page_size,
+                print_background=True,
+                margin={
+                    "top": self.margin_top,
+                    "bottom": self.margin_bottom,
+                    "left": self.margin_left,
+                    "right": self.margin_right,
+                },
+                scale=self.zoom,
+            )
+            if self.cache is not None and key is not None:
+                self.cache.store(key, output_file)
+            outputs.append(output_file)
+            page.close()
+        context.close()
         return outputs
 
+    def _shutdown(self) -> None:
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+    def close(self) -> None:
+        """Close a browser kept open by ``keep_browser``."""
+
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.submit(self._shutdown).result()
+            executor.shutdown()
+
 
 __all__ = ["PlaywrightRenderer"]
@@ -0,0 +1,173 @@
+"""Renderer plugins: a common protocol and the ``html2manual.renderers`` entry-point group."""
+
+from __future__ import annotations
+
+import tempfile
+import threading
+from importlib import metadata
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Protocol, Sequence, cast
+
+from .cache import ChunkCache
+from .merge import PdfMerger
+
+if TYPE_CHECKING:
+    from ..config import Html2ManualConfig
+
+RENDERER_GROUP = "html2manual.renderers"
+# Built-in engines, loaded like entry points so the factories stay lazy.
+BUILTIN_RENDERERS = {
+    "wkhtmltopdf": "html2manual.pipeline:make_wkhtml_renderer",
+    "playwright": "html2manual.pipeline:make_fallback_renderer",
+}
+
+
+class Renderer(Protocol):
+    """Protocol describing a rendering engine plugin."""
+
+    name: str
+
+    def cache_identity(self) -> Dict[str, str]:
+        """Return the engine settings that affect the produced PDF."""
+
+    def render(self, section_name: str, html_files: Sequence[Path], output_dir: Path) -> List[Path]:
+        """Render ``html_files`` in order into one or more PDFs inside ``output_dir``."""
+
+
+class ChunkRenderer(Protocol):
+    """The chunk level interface the build pipeline drives (see :class:`WkhtmlRenderer`)."""
+
+    name: str
+
+    def cache_identity(self) -> Dict[str, str]: ...
+
+    def render(
+        self, section_name: str, html_files: Sequence[Path], output_dir: Path
+    ) -> List[Path]: ...
+
+    def fetch_cached(
+        self, inputs: Sequence[Path], output: Path, javascript: bool = True
+    ) -> bool: ...
+
+    def render_chunk(
+        self,
+        inputs: Sequence[Path],
+        output: Path,
+        *,
+        timeout: Optional[float] = None,
+        attempts: Optional[int] = None,
+        check_cache: bool = True,
+        javascript: bool = True,
+    ) -> Path: ...
+
+    def cancel(self) -> None: ...
+
+    @property
+    def cancelled(self) -> bool: ...
+
+
+RendererFactory = Callable[["Html2ManualConfig", Optional[ChunkCache]], Renderer]
+
+
+def _load_renderer_entry_points() -> Iterable[EntryPoint]:
+    try:
+        return metadata.entry_points(group=RENDERER_GROUP)
+    except TypeError:  # pragma: no cover - older importlib.metadata versions
+        entries = metadata.entry_points()
+        if hasattr(entries, "get"):
+            legacy_raw: object = entries.get(RENDERER_GROUP, [])
+            return cast(Iterable[EntryPoint], legacy_raw)
+        return ()
+
+
+def renderer_factories() -> Dict[str, RendererFactory]:
+    """Return the built-in and installed renderer factories by engine name.
+
+    An entry point names a callable taking ``(config, cache)`` and returning a
+    :class:`Renderer`; a class with that constructor works too. Plugins cannot
+    replace the built-in engines.
+    """
+
+    entry_points = [
+        EntryPoint(name, value, RENDERER_GROUP) for name, value in BUILTIN_RENDERERS.items()
+    ]
+    entry_points.extend(
+        entry for entry in _load_renderer_entry_points() if entry.name not in BUILTIN_RENDERERS
+    )
+    return {entry.name: cast(RendererFactory, entry.load()) for entry in entry_points}
+
+
+class ChunkAdapter:
+    """Drive a plugin :class:`Renderer` through the chunk interface of the build.
+
+    Each chunk is rendered with :meth:`Renderer.render` into a scratch folder
+    and the resulting PDFs are merged into the chunk's output. Chunk PDFs are
+    cached like wkhtmltopdf's. The engine's own JavaScript handling and time
+    limits apply, so ``javascript`` and ``timeout`` are ignored.
+    """
+
+    def __init__(self, renderer: Renderer, cache: ChunkCache | None = None) -> None:
+        self.renderer = renderer
+        self.name = renderer.name
+        self.cache = cache
+        self.merger = PdfMerger()
+        self._cancelled = threading.Event()
+
+    def cache_identity(self) -> Dict[str, str]:
+        return self.renderer.cache_identity()
+
+    def render(self, section_name: str, html_files: Sequence[Path], output_dir: Path) -> List[Path]:
+        return self.renderer.render(section_name, html_files, output_dir)
+
+    def fetch_cached(self, inputs: Sequence[Path], output: Path, javascript: bool = True) -> bool:
+        if self.cache is None:
+            return False
+        output.parent.mkdir(parents=True, exist_ok=True)
+        return self.cache.fetch(self.cache.key(self.cache_identity(), inputs), output)
+
+    def render_chunk(
+        self,
+        inputs: Sequence[Path],
+        output: Path,
+        *,
+        timeout: Optional[float] = None,
+        attempts: Optional[int] = None,
+        check_cache: bool = True,
+        javascript: bool = True,
+    ) -> Path:
+        if check_cache and self.fetch_cached(inputs, output):
+            return output
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix=f"{output.stem}-", dir=output.parent) as scratch:
+            pdfs = self.renderer.render(output.stem, inputs, Path(scratch))
+            self.merger.merge(pdfs, output)
+        if self.cache is not None:
+            self.cache.store(self.cache.key(self.cache_identity(), inputs), output)
+        return output
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+        cancel = getattr(self.renderer, "cancel", None)
+        if callable(cancel):
+            cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def close(self) -> None:
+        close = getattr(self.renderer, "close", None)
+        if callable(close):
+            close()
+
+
+__all__ = [
+    "BUILTIN_RENDERERS",
+    "ChunkAdapter",
+    "ChunkRenderer",
+    "RENDERER_GROUP",
+    "Renderer",
+    "RendererFactory",
+    "renderer_factories",
+]
@@ -1,15 +1,54 @@
 """wkhtmltopdf rendering backend."""
+
 from __future__ import annotations
 
 import shutil
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import List, Sequence
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import structlog
+
+from .. import tracing
+from ..journal import atomic_output
+from ..memory import rss_bytes
+from .cache import ChunkCache
+from .concat import concat_path, concatenate_pages
+
+LOGGER = structlog.get_logger(__name__)
+POLL_INTERVAL = 0.25
+
+
+class RenderProcessKilled(subprocess.CalledProcessError):
+    """A renderer process was killed for exceeding its time or memory limit."""
+
+    def __init__(self, cmd: Sequence[str], reason: str) -> None:
+        super().__init__(returncode=-9, cmd=list(cmd))
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Renderer process killed ({self.reason})"
+
+
+def _limit_address_space(pid: int, limit_bytes: int) -> None:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return
+    if hasattr(resource, "prlimit"):
+        try:
+            resource.prlimit(pid, resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+        except (OSError, ValueError):
+            LOGGER.warning("render_address_space_limit_failed", pid=pid)
 
 
 class WkhtmlRenderer:
     """Render HTML files to PDF using wkhtmltopdf with chunking support."""
 
+    name = "wkhtmltopdf"
+
     def __init__(
         self,
         *,
@@ -21,6 +60,13 @@ class WkhtmlRenderer:
         margin_right: str = "10mm",
         zoom: float = 1.0,
         chunk_size: int = 50,
+        cache: ChunkCache | None = None,
+        timeout: float | None = None,
+        memory_limit_mb: int | None = None,
+        address_space_limit_mb: int | None = None,
+        retries: int = 0,
+        retry_backoff: float = 2.0,
+        concat_pages: bool = False,
     ) -> None:
         self.executable = executable
         self.page_size = page_size
@@ -30,6 +76,17 @@ class WkhtmlRenderer:
         self.margin_right = margin_right
         self.zoom = zoom
         self.chunk_size = max(1, chunk_size)
+        self.cache = cache
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.address_space_limit_mb = address_space_limit_mb
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self.concat_pages = concat_pages
+        self._version: Optional[str] = None
+        self._active: Set[subprocess.Popen[bytes]] = set()
+        self._active_lock = threading.Lock()
+        self._cancelled = threading.Event()
 
     @property
     def command(self) -> str:
@@ -40,11 +97,49 @@ class WkhtmlRenderer:
             raise FileNotFoundError("wkhtmltopdf executable not found on PATH")
         return resolved
 
-    def _build_args(self, inputs: Sequence[Path], output: Path) -> List[str]:
+    @property
+    def version(self) -> str:
+        if self._version is None:
+            try:
+                completed = subprocess.run(
+                    [self.command, "--version"], capture_output=True, text=True, check=True
+                )
+                self._version = completed.stdout.strip() or "unknown"
+            except (OSError, subprocess.CalledProcessError):
+                self._version = "unknown"
+        return self._version
+
+    def cache_identity(self) -> Dict[str, str]:
+        """Return the renderer settings that affect the produced PDF."""
+
+        identity = {
+            "renderer": self.name,
+            "version": self.version,
+            "page_size": self.page_size,
+            "margin_top": self.margin_top,
+            "margin_bottom": self.margin_bottom,
+            "margin_left": self.margin_left,
+            "margin_right": self.margin_right,
+            "zoom": str(self.zoom),
+        }
+        if self.concat_pages:
+            identity["concat_pages"] = "1"
+        return identity
+
+    def _chunk_identity(self, javascript: bool) -> Dict[str, str]:
+        identity = self.cache_identity()
+        if not javascript:
+            identity["javascript"] = "off"
+        return identity
+
+    def _build_args(
+        self, inputs: Sequence[Path], output: Path, javascript: bool = True
+    ) -> List[str]:
         args = [
             self.command,
             "--enable-local-file-access",
             "--print-media-type",
+            *(() if javascript else ("--disable-javascript", "--javascript-delay", "0")),
             "--page-size",
             self.page_size,
             "--margin-top",
@@ -62,8 +157,68 @@ class WkhtmlRenderer:
         args.append(str(output))
         return args
 
-    def _run(self, args: Sequence[str]) -> None:
-        subprocess.run(args, check=True)
+    def _run(self, args: Sequence[str], timeout: Optional[float] = None) -> None:
+        """Run wkhtmltopdf, killing it once it exceeds the wall-clock or memory limits.
+
+        ``timeout`` overrides the renderer's own ``timeout`` for this call.
+        """
+
+        timeout = self.timeout if timeout is None else timeout
+        with self._active_lock:
+            if self._cancelled.is_set():
+                raise RenderProcessKilled(args, "cancelled")
+            process = subprocess.Popen(args)
+            self._active.add(process)
+        tracing.annotate(subprocess_pid=process.pid)
+        try:
+            returncode = self._wait(process, args, timeout)
+        finally:
+            with self._active_lock:
+                self._active.discard(process)
+        if self._cancelled.is_set():
+            raise RenderProcessKilled(args, "cancelled")
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, list(args))
+
+    def _wait(
+        self, process: subprocess.Popen[bytes], args: Sequence[str], timeout: Optional[float]
+    ) -> int:
+        if timeout is None and self.memory_limit_mb is None and self.address_space_limit_mb is None:
+            return process.wait()
+        if self.address_space_limit_mb is not None:
+            _limit_address_space(process.pid, self.address_space_limit_mb * 1024 * 1024)
+        rss_limit = self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb is not None else None
+        started = time.monotonic()
+        while True:
+            try:
+                return process.wait(timeout=POLL_INTERVAL)
+            except subprocess.TimeoutExpired:
+                pass
+            reason: Optional[str] = None
+            if timeout is not None and time.monotonic() - started > timeout:
+                reason = f"timeout after {timeout:g}s"
+            elif rss_limit is not None and (rss_bytes(process.pid) or 0) > rss_limit:
+                reason = f"rss above {self.memory_limit_mb}MB"
+            if reason is not None:
+                process.kill()
+                process.wait()
+                raise RenderProcessKilled(args, reason)
+
+    def cancel(self) -> None:
+        """Kill running wkhtmltopdf processes and refuse to start new ones."""
+
+        with self._active_lock:
+            self._cancelled.set()
+            active = list(self._active)
+        for process in active:
+            if process.poll() is None:
+                process.kill()
+        if active:
+            LOGGER.info("render_processes_cancelled", count=len(active))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
 
     def _chunk(self, files: Sequence[Path]) -> List[List[Path]]:
         if len(files) <= self.chunk_size:
@@ -79,17 +234,115 @@ class WkhtmlRenderer:
             chunks.append(current)
         return chunks
 
-    def render(self, section_name: str, html_files: Sequence[Path], output_dir: Path) -> List[Path]:
-        output_dir.mkdir(parents=True, exist_ok=True)
+    def plan(
+        self, section_name: str, html_files: Sequence[Path], output_dir: Path
+    ) -> List[Tuple[List[Path], Path]]:
+        """Split ``html_files`` into chunks paired with their output PDF paths."""
+
         chunks = self._chunk(html_files)
-        outputs: List[Path] = []
+        planned: List[Tuple[List[Path], Path]] = []
         for index, chunk in enumerate(chunks, start=1):
             suffix = f"_{index:02d}" if len(chunks) > 1 else ""
-            output_file = output_dir / f"{section_name}{suffix}.pdf"
-            args = self._build_args(chunk, output_file)
-            self._run(args)
-            outputs.append(output_file)
-        return outputs
+            planned.append((chunk, output_dir / f"{section_name}{suffix}.pdf"))
+        return planned
+
+    def fetch_cached(self, inputs: Sequence[Path], output: Path, javascript: bool = True) -> bool:
+        """Copy a cached PDF for ``inputs`` to ``output`` if there is one."""
+
+        if self.cache is None:
+            return False
+        output.parent.mkdir(parents=True, exist_ok=True)
+        return self.cache.fetch(self.cache.key(self._chunk_identity(javascript), inputs), output)
+
+    def render_chunk(
+        self,
+        inputs: Sequence[Path],
+        output: Path,
+        *,
+        timeout: Optional[float] = None,
+        attempts: Optional[int] = None,
+        check_cache: bool = True,
+        javascript: bool = True,
+    ) -> Path:
+        """Render a single chunk, reusing a cached PDF when the inputs are unchanged.
+
+        Failed attempts are retried with exponential backoff up to ``attempts``
+        times (``retries + 1`` by default). Callers that already looked the chunk
+        up with :meth:`fetch_cached` pass ``check_cache=False``; the result is
+        still stored. ``javascript=False`` renders with JavaScript disabled and
+        without the JavaScript delay, for pages that do not need script.
+        """
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        key: Optional[str] = None
+        if self.cache is not None:
+            key = self.cache.key(self._chunk_identity(javascript), inputs)
+            if check_cache and self.cache.fetch(key, output):
+                return output
+        combined: Optional[Path] = None
+        try:
+            if self.concat_pages and len(inputs) > 1:
+                combined = concat_path(output.parent, output.stem)
+                result = concatenate_pages(inputs, combined)
+                LOGGER.info(
+                    "render_concat",
+                    output=str(output),
+                    pages=result.pages,
+                    bytes_before=result.bytes_before,
+                    bytes_after=result.bytes_after,
+                    head_blocks_deduplicated=result.head_blocks_deduplicated,
+                )
+            with atomic_output(output) as partial:
+                args = self._build_args(
+                    [combined] if combined is not None else inputs, partial, javascript
+                )
+                self._render_attempts(args, inputs, output, timeout, attempts)
+        finally:
+            if combined is not None:
+                combined.unlink(missing_ok=True)
+        if self.cache is not None and key is not None:
+            self.cache.store(key, output)
+        return output
+
+    def _render_attempts(
+        self,
+        args: Sequence[str],
+        inputs: Sequence[Path],
+        output: Path,
+        timeout: Optional[float],
+        attempts: Optional[int],
+    ) -> None:
+        attempts = self.retries + 1 if attempts is None else max(1, attempts)
+        for attempt in range(1, attempts + 1):
+            try:
+                with tracing.span(
+                    "wkhtmltopdf", "render", output=output.name, pages=len(inputs), attempt=attempt
+                ):
+                    self._run(args, timeout=timeout)
+                break
+            except subprocess.CalledProcessError as exc:
+                if self.cancelled:
+                    raise
+                if isinstance(exc, RenderProcessKilled):
+                    LOGGER.warning(
+                        "render_process_killed",
+                        reason=exc.reason,
+                        output=str(output),
+                        files=[str(path) for path in inputs],
+                        attempt=attempt,
+                    )
+                if attempt >= attempts:
+                    raise
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                LOGGER.info("render_chunk_retry", output=str(output), attempt=attempt, delay=delay)
+                time.sleep(delay)
+
+    def render(self, section_name: str, html_files: Sequence[Path], output_dir: Path) -> List[Path]:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return [
+            self.render_chunk(chunk, output)
+            for chunk, output in self.plan(section_name, html_files, output_dir)
+        ]
 
 
-__all__ = ["WkhtmlRenderer"]
+__all__ = ["WkhtmlRenderer", "RenderProcessKilled"]
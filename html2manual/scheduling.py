@@ -0,0 +1,190 @@
+"""Cost-balanced chunk planning from historical render timings."""
+
+from __future__ import annotations
+
+import heapq
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import structlog
+
+from .journal import atomic_output
+from .perf_audit import MB, CostModel
+
+LOGGER = structlog.get_logger(__name__)
+HISTORY_FILE = "render_history.json"
+
+
+class RenderHistory:
+    """Per-page render seconds from previous builds, keyed by ``section/page``.
+
+    New observations are blended into the stored value with an exponentially
+    weighted moving average so one noisy build does not dominate. The chunk
+    boundaries chosen for each run of pages are kept as well, so a later build
+    can cut the same chunks (and hit the same cached chunk PDFs).
+    """
+
+    def __init__(self, path: Path, alpha: float = 0.5) -> None:
+        self.path = path
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._seconds: Dict[str, float] = {}
+        self._plans: Dict[str, List[List[str]]] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                self._seconds = {
+                    str(key): float(value) for key, value in data.get("pages", {}).items()
+                }
+                self._plans = {
+                    str(key): [[str(name) for name in chunk] for chunk in chunks]
+                    for key, chunks in data.get("plans", {}).items()
+                }
+            except (OSError, ValueError, AttributeError, TypeError) as exc:
+                LOGGER.warning("render_history_unreadable", path=str(path), error=str(exc))
+
+    @staticmethod
+    def key(section: str, page: Path) -> str:
+        return f"{section}/{page.name}"
+
+    def get(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._seconds.get(key)
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._seconds.get(key)
+            self._seconds[key] = (
+                seconds if previous is None else previous + self.alpha * (seconds - previous)
+            )
+
+    def plan(self, key: str) -> Optional[List[List[str]]]:
+        """Page names of the chunks last cut for the run ``key``."""
+
+        with self._lock:
+            return self._plans.get(key)
+
+    def record_plan(self, key: str, chunks: Sequence[Sequence[Path]]) -> None:
+        with self._lock:
+            self._plans[key] = [[page.name for page in chunk] for chunk in chunks]
+
+    def save(self) -> None:
+        with self._lock:
+            payload = {
+                "pages": dict(sorted(self._seconds.items())),
+                "plans": dict(sorted(self._plans.items())),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_output(self.path) as partial:
+            partial.write_text(json.dumps(payload), encoding="utf-8")
+
+
+class PageCostEstimator:
+    """Predict a page's render seconds from history, falling back to its file size."""
+
+    def __init__(self, history: Optional[RenderHistory], model: Optional[CostModel] = None) -> None:
+        self.history = history
+        self.model = model or CostModel()
+
+    def known(self, section: str, page: Path) -> bool:
+        """Whether ``page`` has a timing from a previous build."""
+
+        return (
+            self.history is not None
+            and self.history.get(RenderHistory.key(section, page)) is not None
+        )
+
+    def seconds(self, section: str, page: Path) -> float:
+        if self.history is not None:
+            known = self.history.get(RenderHistory.key(section, page))
+            if known is not None:
+                return known
+        try:
+            size = page.stat().st_size
+        except OSError:
+            size = 0
+        return self.model.render_base_seconds + self.model.render_seconds_per_mb * size / MB
+
+
+def balanced_chunks(
+    pages: Sequence[Path], costs: Mapping[Path, float], chunk_size: int, target_seconds: float
+) -> List[List[Path]]:
+    """Split ``pages`` into contiguous chunks of roughly ``target_seconds`` each.
+
+    Chunks stay contiguous so the merged PDF keeps menu order, and never exceed
+    ``chunk_size`` pages (the command-line length limit).
+    """
+
+    chunk_size = max(1, chunk_size)
+    chunks: List[List[Path]] = []
+    current: List[Path] = []
+    current_cost = 0.0
+    for page in pages:
+        cost = costs.get(page, 0.0)
+        if current and (len(current) >= chunk_size or current_cost + cost > target_seconds):
+            chunks.append(current)
+            current, current_cost = [], 0.0
+        current.append(page)
+        current_cost += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def stable_chunks(
+    section: str,
+    pages: Sequence[Path],
+    costs: Mapping[Path, float],
+    chunk_size: int,
+    target_seconds: float,
+    history: RenderHistory,
+    drift: float = 0.25,
+) -> Tuple[List[List[Path]], bool]:
+    """Cut ``pages`` like :func:`balanced_chunks`, keeping the previous build's boundaries.
+
+    The chunks recorded for the same run of pages are reused unless their slowest
+    chunk is now predicted to take more than ``drift`` longer than the slowest
+    freshly balanced one, so timing noise does not move boundaries (and change
+    chunk cache keys) on every build. Returns the chunks and whether they were reused.
+    """
+
+    chunks = balanced_chunks(pages, costs, chunk_size, target_seconds)
+    key = RenderHistory.key(section, pages[0]) if pages else section
+    previous = history.plan(key) or []
+    names = [page.name for page in pages]
+    reused = False
+    if previous and [name for chunk in previous for name in chunk] == names:
+        kept: List[List[Path]] = []
+        for chunk_names in previous:
+            start = sum(len(done) for done in kept)
+            kept.append(list(pages[start : start + len(chunk_names)]))
+
+        def slowest(candidate: Sequence[Sequence[Path]]) -> float:
+            return max(sum(costs.get(page, 0.0) for page in chunk) for chunk in candidate)
+
+        fits = all(0 < len(chunk) <= max(1, chunk_size) for chunk in kept)
+        if fits and slowest(kept) <= slowest(chunks) * (1 + drift):
+            chunks, reused = kept, True
+    history.record_plan(key, chunks)
+    return chunks, reused
+
+
+def lpt_makespan(costs: Sequence[float], workers: int) -> float:
+    """Makespan of dispatching ``costs`` longest-first onto ``workers`` workers."""
+
+    loads = [0.0] * max(1, workers)
+    for cost in sorted(costs, reverse=True):
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+
+__all__ = [
+    "HISTORY_FILE",
+    "PageCostEstimator",
+    "RenderHistory",
+    "balanced_chunks",
+    "lpt_makespan",
+    "stable_chunks",
+]
@@ -0,0 +1,360 @@
+"""Local HTTP render server that keeps build state warm between jobs."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import re
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, suppress
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+import structlog
+
+from .config import Html2ManualConfig
+from .events import BuildEvent, EventEmitter
+from .menu_parser import SectionMapping
+from .metrics import RunMetrics
+from .pipeline import (
+    make_chunk_cache,
+    make_fallback_renderer,
+    make_governor,
+    make_processor,
+    parse_sections,
+    select_renderer,
+)
+from .scheduling import HISTORY_FILE, RenderHistory
+from .streaming import BuildResources, stream_build
+from .volumes import INDEX_SUFFIX
+
+LOGGER = structlog.get_logger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+VOLUME_NAME = re.compile(r"(?P<section>.+)_vol\d+\.pdf")
+
+
+class HttpError(Exception):
+    """A request the server answers with an error status instead of running a job."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@dataclass(slots=True)
+class _Request:
+    method: str
+    path: str
+    body: bytes
+
+
+async def _read_request(reader: asyncio.StreamReader) -> _Request:
+    parts = (await reader.readline()).decode("latin-1").split()
+    if len(parts) != 3:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "invalid Content-Length") from None
+    if length > MAX_BODY_BYTES:
+        raise HttpError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+    body = await reader.readexactly(length) if length > 0 else b""
+    return _Request(method=parts[0].upper(), path=unquote(urlsplit(parts[1]).path), body=body)
+
+
+def _head(status: HTTPStatus, content_type: str, length: Optional[int] = None) -> bytes:
+    lines = [
+        f"HTTP/1.1 {status.value} {status.phrase}",
+        f"Content-Type: {content_type}",
+        "Connection: close",
+    ]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def _send_json(
+    writer: asyncio.StreamWriter, status: HTTPStatus, payload: Mapping[str, Any]
+) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(_head(status, "application/json", len(body)) + body)
+    await writer.drain()
+
+
+async def _send_line(writer: asyncio.StreamWriter, payload: Mapping[str, Any]) -> None:
+    writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+class RenderServer:
+    """Accept build and single-section jobs over HTTP and stream their events back.
+
+    The parsed menu, the flatten processor (and with it the encoded asset
+    cache), the chunk PDF cache, the render history and the Playwright browser
+    stay alive between jobs. At most ``serve_max_concurrent`` jobs run at once;
+    up to ``serve_max_queued`` more wait for a slot and the rest are rejected.
+
+    Endpoints:
+
+    - ``POST /jobs`` with ``{"section": "NAME"}`` (or ``{}`` for every
+      section) streams newline-delimited JSON events until the job finishes.
+    - ``GET /manuals/NAME.pdf`` returns a merged manual; with volume splitting
+      ``NAME_volNN.pdf`` returns a volume and ``NAME.volumes.json`` its index.
+    - ``GET /health`` reports running and queued jobs.
+    """
+
+    def __init__(self, config: Html2ManualConfig) -> None:
+        # Jobs build in private scratch space so concurrent jobs never share
+        # chunk or flattened directories; only the merged manuals are shared.
+        self.config = config.model_copy(update={"in_memory": True, "build_journal": False})
+        cache = make_chunk_cache(config)
+        self.resources = BuildResources(
+            processor=make_processor(config),
+            cache=cache,
+            history=(
+                RenderHistory(config.output_dir / ".cache" / HISTORY_FILE)
+                if config.history_scheduling
+                else None
+            ),
+            fallback=(
+                make_fallback_renderer(config, cache, keep_browser=True)
+                if config.playwright_fallback
+                else None
+            ),
+            playwright=(
+                make_fallback_renderer(config, keep_browser=True)
+                if select_renderer(config) == "playwright"
+                else None
+            ),
+            governor=make_governor(config),
+        )
+        self.max_queued = config.serve_max_queued
+        self.running = 0
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(config.serve_max_concurrent)
+        self._section_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._menu_lock = asyncio.Lock()
+        self._menu_key: Optional[Tuple[Any, ...]] = None
+        self._sections: SectionMapping = {}
+        self._jobs = itertools.count(1)
+        self._server: Optional[asyncio.Server] = None
+
+    @property
+    def manuals_dir(self) -> Path:
+        return self.config.output_dir / "Manuals"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """Parse the menu and start listening; return the bound address."""
+
+        await self.sections()
+        self._server = await asyncio.start_server(self._handle, host, port)
+        bound_host, bound_port = self._server.sockets[0].getsockname()[:2]
+        LOGGER.info("serve_started", host=bound_host, port=bound_port)
+        return bound_host, bound_port
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for renderer in (self.resources.fallback, self.resources.playwright):
+            if renderer is not None:
+                await asyncio.to_thread(renderer.close)
+        LOGGER.info("serve_stopped")
+
+    def _menu_state(self) -> Tuple[Any, ...]:
+        menu = self.config.input_dir / self.config.menu_file
+        try:
+            stat = menu.stat()
+            menu_state: Tuple[int, int] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            menu_state = (0, 0)
+        return menu_state, self.config.input_dir.stat().st_mtime_ns
+
+    async def sections(self) -> SectionMapping:
+        """Return the parsed menu, re-parsing only when the menu file or input folder changed."""
+
+        async with self._menu_lock:
+            key = await asyncio.to_thread(self._menu_state)
+            if key != self._menu_key:
+                self._sections = await asyncio.to_thread(parse_sections, self.config)
+                self._menu_key = key
+                LOGGER.info("serve_menu_parsed", sections=len(self._sections))
+            return self._sections
+
+    def status(self) -> Dict[str, Any]:
+        cache = self.resources.cache
+        return {
+            "status": "ok",
+            "running": self.running,
+            "queued": self.waiting,
+            "sections": len(self._sections),
+            "chunk_cache_hits": cache.hits if cache is not None else 0,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await _read_request(reader)
+            if request.method == "GET" and request.path == "/health":
+                await _send_json(writer, HTTPStatus.OK, self.status())
+            elif request.method == "GET" and request.path.startswith("/manuals/"):
+                await self._send_manual(writer, request.path.removeprefix("/manuals/"))
+            elif request.method == "POST" and request.path == "/jobs":
+                await self._run_job(request, writer)
+            else:
+                raise HttpError(
+                    HTTPStatus.NOT_FOUND, f"no route for {request.method} {request.path}"
+                )
+        except HttpError as exc:
+            with suppress(ConnectionError):
+                await _send_json(writer, exc.status, {"error": exc.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            LOGGER.info("serve_client_disconnected")
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def _manual_section(self, name: str) -> Optional[str]:
+        """Return the section a manual, volume or volume index file name belongs to."""
+
+        volume = VOLUME_NAME.fullmatch(name)
+        candidates = [name.removesuffix(INDEX_SUFFIX)] if name.endswith(INDEX_SUFFIX) else []
+        if name.endswith(".pdf"):
+            candidates.append(name.removesuffix(".pdf"))
+        if volume is not None:
+            candidates.append(volume.group("section"))
+        return next((section for section in candidates if section in self._sections), None)
+
+    async def _send_manual(self, writer: asyncio.StreamWriter, name: str) -> None:
+        section = self._manual_section(name)
+        # Only files of known sections are served, which also rules out path traversal.
+        if section is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"unknown manual {name!r}")
+        path = self.manuals_dir / name
+        async with self._section_locks[section]:
+            try:
+                data = await asyncio.to_thread(path.read_bytes)
+            except FileNotFoundError:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"{name} has not been built") from None
+        content_type = "application/json" if name.endswith(INDEX_SUFFIX) else "application/pdf"
+        writer.write(_head(HTTPStatus.OK, content_type, len(data)) + data)
+        await writer.drain()
+
+    async def _run_job(self, request: _Request, writer: asyncio.StreamWriter) -> None:
+        try:
+            payload = json.loads(request.body or b"{}")
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "request body must be JSON") from None
+        if not isinstance(payload, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "request body must be a JSON object")
+        sections = await self.sections()
+        section = payload.get("section")
+        if section is not None:
+            if section not in sections:
+                raise HttpError(HTTPStatus.NOT_FOUND, f"unknown section {section!r}")
+            sections = {section: sections[section]}
+        if self.waiting >= self.max_queued and self._slots.locked():
+            raise HttpError(HTTPStatus.SERVICE_UNAVAILABLE, "render queue is full")
+
+        job = next(self._jobs)
+        writer.write(_head(HTTPStatus.OK, "application/x-ndjson"))
+        self.waiting += 1
+        try:
+            await _send_line(
+                writer, {"type": "JobQueued", "job": job, "ahead": self.running + self.waiting - 1}
+            )
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+        try:
+            async with AsyncExitStack() as stack:
+                # Sorted acquisition keeps overlapping jobs from deadlocking.
+                for name in sorted(sections):
+                    await stack.enter_async_context(self._section_locks[name])
+                await _send_line(
+                    writer, {"type": "JobStarted", "job": job, "sections": list(sections)}
+                )
+                await self._stream_job(job, sections, writer)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    async def _stream_job(
+        self, job: int, sections: SectionMapping, writer: asyncio.StreamWriter
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        pending: asyncio.Queue[Optional[BuildEvent]] = asyncio.Queue()
+
+        def deliver(event: BuildEvent) -> None:
+            loop.call_soon_threadsafe(pending.put_nowait, event)
+
+        emitter = EventEmitter(deliver)
+        metrics = RunMetrics()
+        started = time.perf_counter()
+        LOGGER.info("serve_job_start", job=job, sections=list(sections))
+        build = asyncio.create_task(
+            stream_build(self.config, sections, metrics, events=emitter, resources=self.resources)
+        )
+        build.add_done_callback(lambda _: pending.put_nowait(None))
+        try:
+            while (event := await pending.get()) is not None:
+                await _send_line(writer, event.as_dict())
+        except BaseException:
+            build.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await build
+            LOGGER.info("serve_job_cancelled", job=job)
+            raise
+        seconds = round(time.perf_counter() - started, 3)
+        error = build.exception()
+        if error is not None:
+            LOGGER.warning("serve_job_failed", job=job, error=str(error))
+            await _send_line(
+                writer, {"type": "JobFailed", "job": job, "error": str(error), "seconds": seconds}
+            )
+            return
+        manuals = {name: f"/manuals/{pdf.name}" for name, pdf in build.result().items()}
+        LOGGER.info("serve_job_complete", job=job, seconds=seconds)
+        await _send_line(
+            writer,
+            {
+                "type": "JobFinished",
+                "job": job,
+                "manuals": manuals,
+                "seconds": seconds,
+                "metrics": metrics.snapshot(),
+            },
+        )
+
+
+async def serve(config: Html2ManualConfig, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """Run a :class:`RenderServer` until cancelled."""
+
+    server = RenderServer(config)
+    await server.start(host, port)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+__all__ = ["HttpError", "RenderServer", "serve"]
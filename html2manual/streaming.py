@@ -0,0 +1,1060 @@
+"""Streaming flatten → render → merge execution for full builds."""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import math
+import os
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import AbstractAsyncContextManager, ExitStack, nullcontext
+from dataclasses import dataclass, field, replace
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar, Union
+
+import structlog
+
+from . import tracing
+from .config import Html2ManualConfig
+from .dedupe import DuplicateIndex, PlannedChunk, plan_chunks
+from .events import (
+    BuildEvent,
+    BuildWarning,
+    ChunkRendered,
+    EventEmitter,
+    PageFlattened,
+    SectionMerged,
+    VolumeWritten,
+)
+from .flatten.html_processor import HtmlProcessor
+from .flatten.js_classifier import JS_NEEDED, javascript_runs, run_output
+from .isolation import FAILED_PAGES_FILE, FailedPageReport, half_outputs
+from .journal import BuildJournal
+from .memory import MemoryGovernor
+from .menu_parser import SectionMapping
+from .metrics import RunMetrics
+from .pipeline import (
+    SHARED_DIR_NAME,
+    complete_section,
+    fallback_sources,
+    flatten_page,
+    isolate_failed_page,
+    js_min_run,
+    make_chunk_cache,
+    make_fallback_renderer,
+    make_governor,
+    make_processor,
+    make_renderer,
+    optimize_manual,
+    variant_configs,
+    volume_limits,
+)
+from .progress import ProgressTracker
+from .render.cache import ChunkCache
+from .render.merge import PdfMerger
+from .render.playwright import PlaywrightRenderer
+from .render.wkhtml import RenderProcessKilled
+from .scheduling import (
+    HISTORY_FILE,
+    PageCostEstimator,
+    RenderHistory,
+    lpt_makespan,
+    stable_chunks,
+)
+from .volumes import Volume, VolumeSplitter, manual_path, measure_part, write_index, write_volume
+
+LOGGER = structlog.get_logger(__name__)
+T = TypeVar("T")
+
+
+def scratch_root(config: Html2ManualConfig) -> Optional[Path]:
+    """Return the parent directory for in-memory build scratch space."""
+
+    if config.scratch_dir is not None:
+        config.scratch_dir.mkdir(parents=True, exist_ok=True)
+        return config.scratch_dir
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+
+class FlattenShare:
+    """Flattened pages written once for several builds that render them, such as a run's variants.
+
+    The first build to ask for a destination does the work in a worker thread;
+    the others wait for it and get the same result.
+    """
+
+    def __init__(self) -> None:
+        self._pages: Dict[Path, asyncio.Future[Any]] = {}
+
+    async def run(self, destination: Path, work: Callable[[], T]) -> Tuple[T, bool]:
+        """Return ``work()``'s result for ``destination`` and whether another build produced it."""
+
+        pending = self._pages.get(destination)
+        if pending is not None:
+            # Shielded so a waiting build that is cancelled leaves the owner's future alone.
+            result: T = await asyncio.shield(pending)
+            return result, True
+        pending = self._pages[destination] = asyncio.get_running_loop().create_future()
+        try:
+            result = await asyncio.to_thread(work)
+        except BaseException as exc:
+            pending.set_exception(exc)
+            # The owner raises the error itself, so it is never left unretrieved.
+            pending.exception()
+            raise
+        pending.set_result(result)
+        return result, False
+
+
+@dataclass
+class BuildResources:
+    """Long-lived objects a build reuses instead of creating its own.
+
+    A long running process (``html2manual serve``) keeps these warm across
+    builds, and the variants of one run share them; anything left as ``None``
+    is created per build from the config. ``playwright`` is the main engine
+    when the config renders with Playwright, kept warm like ``fallback``.
+    ``render_slots`` caps the renders running at once across every build that
+    shares it, and ``governor`` keeps all of them within one memory budget.
+    """
+
+    processor: Optional[HtmlProcessor] = None
+    cache: Optional[ChunkCache] = None
+    history: Optional[RenderHistory] = None
+    fallback: Optional[PlaywrightRenderer] = None
+    playwright: Optional[PlaywrightRenderer] = None
+    flattens: Optional[FlattenShare] = None
+    render_slots: Optional[asyncio.Semaphore] = None
+    governor: Optional[MemoryGovernor] = None
+
+
+@dataclass
+class _SectionState:
+    name: str
+    pending: int
+    flattened: List[Path] = field(default_factory=list)
+    chunk_pdfs: List[Path] = field(default_factory=list)
+    failed: bool = False
+    # Page files behind each chunk PDF, and volume progress when splitting.
+    sources: Dict[Path, List[Path]] = field(default_factory=dict)
+    rendered: Set[Path] = field(default_factory=set)
+    frontier: int = 0
+    splitter: Optional[VolumeSplitter] = None
+
+
+@dataclass
+class _SharedPage:
+    flattened: Path
+    output: Path
+    flatten_seconds: float
+    js_class: str
+    render_seconds: float = 0.0
+    failed: bool = False
+    skipped: bool = False
+    done: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+@dataclass
+class _ChunkJob:
+    section: _SectionState
+    inputs: List[Path]
+    output: Path
+    shared: Optional[_SharedPage] = None
+    owner: bool = False
+    attempt: int = 0
+    costs: List[float] = field(default_factory=list)
+    known: bool = False
+    javascript: bool = True
+
+    @property
+    def predicted_seconds(self) -> float:
+        return sum(self.costs)
+
+
+@dataclass
+class _ChunkDone:
+    """Tells the merge stage a chunk finished so it can close volumes early."""
+
+    section: _SectionState
+    output: Path
+
+
+_QueueItem = Tuple[float, int, Optional[_ChunkJob]]
+_MergeItem = Union[_SectionState, _ChunkDone]
+
+
+def _plan_pages(plan: Sequence[PlannedChunk]) -> List[Path]:
+    """The source pages of a section's chunks, which its journal merge unit is checked against."""
+
+    return [path for chunk in plan for path in chunk.inputs]
+
+
+async def stream_build(
+    config: Html2ManualConfig,
+    sections: SectionMapping,
+    metrics: Optional[RunMetrics] = None,
+    progress: Optional[ProgressTracker] = None,
+    events: Optional[EventEmitter] = None,
+    resources: Optional[BuildResources] = None,
+) -> Dict[str, Path]:
+    """Flatten, render and merge ``sections`` as a pipeline of bounded queues.
+
+    Pages are flattened in section order. Each chunk is queued for rendering as
+    soon as its pages are flattened, and a section is queued for merging as soon
+    as its last chunk has rendered, so the stages overlap instead of running as
+    strict phases.
+
+    With ``config.in_memory`` the flattened pages and chunk PDFs live in a
+    temporary scratch directory (tmpfs when available) that is removed once the
+    build finishes; only the merged manuals are written to ``output_dir``.
+
+    ``events`` receives a typed event for every flattened page, rendered chunk,
+    merged section and warning. Cancelling the coroutine kills running
+    wkhtmltopdf processes.
+    """
+
+    with ExitStack() as stack:
+        flattened_root, scratch = _workspace(config, stack)
+        manuals_dir = config.output_dir / "Manuals"
+        chunk_dir = scratch / "chunks" if scratch is not None else manuals_dir
+        build = StreamingBuild(
+            config,
+            sections,
+            metrics=metrics or RunMetrics(),
+            progress=progress or ProgressTracker(),
+            flattened_root=flattened_root,
+            chunk_dir=chunk_dir,
+            manuals_dir=manuals_dir,
+            events=events,
+            resources=resources,
+        )
+        return await build.run()
+
+
+def _workspace(config: Html2ManualConfig, stack: ExitStack) -> Tuple[Path, Optional[Path]]:
+    """Return where flattened pages go and, for in-memory builds, the scratch directory.
+
+    The scratch directory is removed when ``stack`` closes.
+    """
+
+    flattened_root = config.output_dir / "flattened"
+    if not config.in_memory:
+        return flattened_root, None
+    workspace = tempfile.TemporaryDirectory(prefix="html2manual-", dir=scratch_root(config))
+    scratch = Path(stack.enter_context(workspace))
+    LOGGER.info("in_memory_build", scratch=str(scratch), keep_flattened=config.keep_flattened)
+    if not config.keep_flattened:
+        flattened_root = scratch / "flattened"
+    return flattened_root, scratch
+
+
+async def stream_variants(
+    config: Html2ManualConfig,
+    sections: SectionMapping,
+    metrics: Dict[str, RunMetrics],
+    progress: Optional[ProgressTracker] = None,
+    events: Optional[EventEmitter] = None,
+    resources: Optional[BuildResources] = None,
+) -> Dict[str, Dict[str, Path]]:
+    """Build every render variant of ``config`` from a single flatten pass.
+
+    The variants' builds run side by side: each page is flattened once into
+    the shared flattened folder, the chunk cache is shared, and together they
+    run at most ``render_workers`` renders at a time. Each variant writes its
+    manuals, journal and reports to ``output_dir/variants/<name>``. Returns
+    the manuals of each variant, keyed by variant name.
+    """
+
+    variants = variant_configs(config)
+    resources = resources or BuildResources()
+    shared = replace(
+        resources,
+        processor=resources.processor or make_processor(config),
+        cache=resources.cache if resources.cache is not None else make_chunk_cache(config),
+        flattens=resources.flattens or FlattenShare(),
+        render_slots=resources.render_slots or asyncio.Semaphore(max(1, config.render_workers)),
+        governor=resources.governor or make_governor(config),
+        # Variants override page settings, so each launches its own engine.
+        playwright=None,
+    )
+    progress = progress or ProgressTracker()
+    with ExitStack() as stack:
+        flattened_root, scratch = _workspace(config, stack)
+        builds: Dict[str, StreamingBuild] = {}
+        for name, variant in variants.items():
+            manuals_dir = variant.output_dir / "Manuals"
+            chunk_dir = scratch / name / "chunks" if scratch is not None else manuals_dir
+            builds[name] = StreamingBuild(
+                variant,
+                sections,
+                metrics=metrics.setdefault(name, RunMetrics()),
+                progress=progress,
+                flattened_root=flattened_root,
+                chunk_dir=chunk_dir,
+                manuals_dir=manuals_dir,
+                events=events,
+                resources=shared,
+            )
+        LOGGER.info("variant_build_start", variants=list(builds))
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = {name: group.create_task(build.run()) for name, build in builds.items()}
+        except BaseExceptionGroup as grouped:
+            raise grouped.exceptions[0] from None
+    return {name: task.result() for name, task in tasks.items()}
+
+
+class StreamingBuild:
+    """State shared by the flatten, render and merge stages of one build."""
+
+    def __init__(
+        self,
+        config: Html2ManualConfig,
+        sections: SectionMapping,
+        *,
+        metrics: RunMetrics,
+        progress: ProgressTracker,
+        flattened_root: Path,
+        chunk_dir: Path,
+        manuals_dir: Path,
+        events: Optional[EventEmitter] = None,
+        resources: Optional[BuildResources] = None,
+    ) -> None:
+        resources = resources or BuildResources()
+        self.config = config
+        self.sections = sections
+        self.metrics = metrics
+        self.progress = progress
+        self.flattened_root = flattened_root
+        self.chunk_dir = chunk_dir
+        self.manuals_dir = manuals_dir
+        self.events = events
+        self.shared_dir = chunk_dir / SHARED_DIR_NAME
+        self.processor = resources.processor or make_processor(config)
+        self.cache = resources.cache if resources.cache is not None else make_chunk_cache(config)
+        self.fallback = resources.fallback
+        self.flattens = resources.flattens
+        self.render_slots: AbstractAsyncContextManager[Any] = (
+            resources.render_slots or nullcontext()
+        )
+        self.report = FailedPageReport()
+        self.journal = BuildJournal.start(config)
+        self.renderer = make_renderer(config, self.cache, resources.playwright)
+        self.merger = PdfMerger()
+        self.governor = resources.governor or make_governor(config)
+        self.workers = max(1, config.render_workers)
+        # Ordered by predicted cost so the longest queued chunk is rendered first;
+        # the sequence number keeps equal costs in flatten order.
+        self.render_queue: asyncio.PriorityQueue[_QueueItem] = asyncio.PriorityQueue(
+            maxsize=config.pipeline_queue_size
+        )
+        self._sequence = itertools.count()
+        self.merge_queue: asyncio.Queue[Optional[_MergeItem]] = asyncio.Queue(
+            maxsize=config.pipeline_queue_size
+        )
+        self.volume_limits = volume_limits(config)
+        # Hashed off the event loop when the build starts.
+        self.duplicates = DuplicateIndex({}, [])
+        self.history = resources.history
+        if self.history is None and config.history_scheduling:
+            self.history = RenderHistory(config.output_dir / ".cache" / HISTORY_FILE)
+        self.estimator = PageCostEstimator(self.history)
+        self.plans: Dict[str, List[PlannedChunk]] = {}
+        self.page_costs: Dict[Path, float] = {}
+        self.known_pages: Set[Path] = set()
+        # Render seconds of chunks whose pages all have a timing from a previous
+        # build, next to what that history predicted for them.
+        self.compared_actual = 0.0
+        self.compared_predicted = 0.0
+        self.render_window: List[float] = []
+        self.shared: Dict[str, _SharedPage] = {}
+        self.manuals: Dict[str, Path] = {}
+        self.page_seconds: List[float] = []
+        self.outstanding = 0
+        self.flatten_finished = False
+        self.drained = asyncio.Event()
+        self._group: Optional[asyncio.TaskGroup] = None
+
+    async def run(self) -> Dict[str, Path]:
+        self.manuals_dir.mkdir(parents=True, exist_ok=True)
+        if self.config.dedupe_pages:
+            self.duplicates = await asyncio.to_thread(DuplicateIndex.from_sources, self.sections)
+        if self.duplicates.shared_pages:
+            LOGGER.info(
+                "dedupe_pages_detected",
+                shared=self.duplicates.shared_pages,
+                duplicates=self.duplicates.duplicate_occurrences,
+            )
+        self.metrics.set("dedupe_shared_pages", self.duplicates.shared_pages)
+        pages = sum(1 for files in self.sections.values() for path in files if path.exists())
+        self.progress.add_total("flatten", pages)
+        self.progress.add_total("render", pages)
+        non_empty = sum(
+            1 for files in self.sections.values() if any(path.exists() for path in files)
+        )
+        self.progress.add_total("merge", non_empty)
+        predicted = self._plan()
+
+        try:
+            with self.governor.monitor(self.metrics):
+                async with asyncio.TaskGroup() as group:
+                    self._group = group
+                    group.create_task(self._flatten_stage())
+                    group.create_task(self._render_stage())
+                    group.create_task(self._merge_stage())
+        except BaseExceptionGroup as grouped:
+            raise grouped.exceptions[0] from None
+        except asyncio.CancelledError:
+            # Worker threads outlive their cancelled tasks; killing the
+            # processes they wait on lets them return promptly.
+            self.renderer.cancel()
+            LOGGER.info("build_cancelled")
+            raise
+        finally:
+            shutil.rmtree(self.shared_dir, ignore_errors=True)
+            self.journal.close()
+            if self.history is not None:
+                self.history.save()
+        self.journal.finish()
+        self.report.write(
+            self.config.output_dir / FAILED_PAGES_FILE,
+            self.sections if self.config.filtered else None,
+        )
+
+        if self.cache is not None:
+            LOGGER.info("chunk_cache_stats", hits=self.cache.hits, misses=self.cache.misses)
+        actual = max(self.render_window) - min(self.render_window) if self.render_window else 0.0
+        LOGGER.info(
+            "render_makespan",
+            predicted_seconds=round(predicted, 3),
+            actual_seconds=round(actual, 3),
+            workers=self.workers,
+            history=self.history is not None,
+        )
+        self.metrics.set("render_makespan_predicted_seconds", round(predicted, 3))
+        self.metrics.set("render_makespan_actual_seconds", round(actual, 3))
+        if self.compared_actual > 0 and self.compared_predicted > 0:
+            speedup = self.compared_predicted / self.compared_actual
+            LOGGER.info(
+                "render_speedup",
+                mode=self.config.render_mode,
+                minify_html=self.config.minify_html,
+                previous_seconds=round(self.compared_predicted, 3),
+                actual_seconds=round(self.compared_actual, 3),
+                speedup=round(speedup, 2),
+            )
+            self.metrics.set("render_speedup_vs_history", round(speedup, 3))
+        return {
+            section: self.manuals[section] for section in self.sections if section in self.manuals
+        }
+
+    def _emit(self, event_type: type[BuildEvent], **fields: Any) -> None:
+        if self.events is not None:
+            self.events.emit(event_type, **fields)
+
+    def _warn(self, event: str, **fields: Any) -> None:
+        LOGGER.warning(event, **fields)
+        self._emit(BuildWarning, event=event, details=fields)
+
+    def _plan(self) -> float:
+        """Chunk every section and return the predicted render makespan.
+
+        Page costs come from the render history of previous builds, falling back
+        to a size-based estimate. With ``history_scheduling`` the unshared runs
+        are cut into chunks of roughly equal predicted time instead of equal
+        page counts, keeping the previous build's boundaries unless the
+        timings drifted past ``history_rebalance_drift``.
+        """
+
+        config = self.config
+        sources: Dict[str, List[Path]] = {}
+        for section, files in self.sections.items():
+            sources[section] = [path for path in files if path.exists()]
+            for path in sources[section]:
+                self.page_costs[path] = self.estimator.seconds(section, path)
+                if self.estimator.known(section, path):
+                    self.known_pages.add(path)
+        pages = sum(len(files) for files in sources.values())
+        target = sum(self.page_costs[path] for files in sources.values() for path in files) / max(
+            1, pages
+        )
+        target *= config.chunk_size
+
+        def chunker(run: Sequence[Path], section: str, history: RenderHistory) -> List[List[Path]]:
+            chunks, reused = stable_chunks(
+                section,
+                run,
+                self.page_costs,
+                config.chunk_size,
+                target,
+                history,
+                config.history_rebalance_drift,
+            )
+            if reused:
+                self.metrics.increment("chunk_plans_reused")
+            return chunks
+
+        costs: List[float] = []
+        seen_shared = set()
+        for section, files in sources.items():
+            if not files:
+                continue
+            split = None
+            if self.history is not None:
+                split = partial(chunker, section=section, history=self.history)
+            segments = self.duplicates.split(files, config.chunk_size, split)
+            plan = plan_chunks(section, segments, self.chunk_dir, self.shared_dir)
+            self.plans[section] = plan
+            for chunk in plan:
+                if chunk.shared_key is not None:
+                    if chunk.shared_key in seen_shared:
+                        continue
+                    seen_shared.add(chunk.shared_key)
+                costs.append(sum(self.page_costs[path] for path in chunk.inputs))
+        return lpt_makespan(costs, self.workers)
+
+    async def _enqueue(self, job: _ChunkJob) -> None:
+        # Jobs that only wait for a shared page cost nothing to render.
+        priority = 0.0 if job.shared is not None and not job.owner else -job.predicted_seconds
+        await self.render_queue.put((priority, next(self._sequence), job))
+
+    async def _flatten_stage(self) -> None:
+        for section, files in self.sections.items():
+            for html_file in files:
+                if not html_file.exists():
+                    self._warn("flatten_missing_file", file=str(html_file))
+            plan = self.plans.get(section)
+            if not plan:
+                self._warn("render_section_empty", section=section)
+                continue
+            if self._resume_section(section, plan):
+                continue
+            section_dir = self.flattened_root / section
+            section_dir.mkdir(parents=True, exist_ok=True)
+            state = _SectionState(name=section, pending=len(plan))
+            if self.volume_limits is not None:
+                state.splitter = VolumeSplitter(section, self.manuals_dir, *self.volume_limits)
+            sources = [path for chunk in plan for path in chunk.inputs]
+            LOGGER.info("render_section_start", section=section, files=len(sources))
+            for chunk in plan:
+                inputs: List[Path] = []
+                js_classes: List[str] = []
+                entry = self.shared.get(chunk.shared_key) if chunk.shared_key else None
+                owner = chunk.shared_key is not None and entry is None
+                for html_file in chunk.inputs:
+                    destination = section_dir / html_file.name
+                    started = time.perf_counter()
+                    reused = entry is not None
+                    if entry is not None:
+                        await self._flatten_once(
+                            destination, partial(shutil.copyfile, entry.flattened, destination)
+                        )
+                        self.metrics.increment("dedupe_flattens_skipped")
+                        js_classes.append(entry.js_class)
+                    else:
+                        async with self.governor.stage("flatten", self.metrics):
+                            js_class = await self._flatten_once(
+                                destination, partial(self._flatten, html_file, destination)
+                            )
+                        js_classes.append(js_class)
+                        if chunk.shared_key is not None:
+                            entry = _SharedPage(
+                                flattened=destination,
+                                output=chunk.output,
+                                flatten_seconds=time.perf_counter() - started,
+                                js_class=js_class,
+                            )
+                            self.shared[chunk.shared_key] = entry
+                    self.progress.advance("flatten", nbytes=html_file.stat().st_size)
+                    self._emit(
+                        PageFlattened,
+                        section=section,
+                        source=html_file,
+                        output=destination,
+                        seconds=time.perf_counter() - started,
+                        reused=reused,
+                    )
+                    inputs.append(destination)
+                state.flattened.extend(inputs)
+                job = _ChunkJob(
+                    section=state,
+                    inputs=inputs,
+                    output=chunk.output,
+                    shared=entry,
+                    owner=owner,
+                    costs=[self.page_costs[path] for path in chunk.inputs],
+                    known=all(path in self.known_pages for path in chunk.inputs),
+                )
+                for run in self._javascript_runs(job, js_classes):
+                    state.chunk_pdfs.append(run.output)
+                    state.sources[run.output] = run.inputs
+                    self.outstanding += 1
+                    await self._enqueue(run)
+        self.flatten_finished = True
+        if self.outstanding == 0:
+            self.drained.set()
+
+    def _resume_section(self, section: str, plan: Sequence[PlannedChunk]) -> bool:
+        """Reuse the manual of a section the interrupted build already completed."""
+
+        manual = self.journal.merged(section, _plan_pages(plan))
+        if manual is None:
+            return False
+        pages = sum(len(chunk.inputs) for chunk in plan)
+        self.progress.advance("flatten", pages)
+        self.progress.advance("render", pages)
+        self.progress.advance("merge", nbytes=manual.stat().st_size)
+        self.manuals[section] = manual
+        self.metrics.increment("resumed_sections")
+        LOGGER.info("render_section_resumed", section=section, pdf=str(manual))
+        return True
+
+    async def _flatten_once(self, destination: Path, work: Callable[[], T]) -> T:
+        """Run ``work`` in a worker thread, unless another build already wrote ``destination``.
+
+        Only builds sharing the flattened folder, such as a run's variants, share pages.
+        """
+
+        if self.flattens is None:
+            return await asyncio.to_thread(work)
+        result, shared = await self.flattens.run(destination, work)
+        if shared:
+            self.metrics.increment("variant_flattens_shared")
+        return result
+
+    def _flatten(self, html_file: Path, destination: Path) -> str:
+        """Flatten a page in a worker thread, or reuse the interrupted build's copy.
+
+        Returns the page's JavaScript class.
+        """
+
+        js_class = self.journal.flattened(html_file, destination)
+        if js_class is not None:
+            self.metrics.increment("resumed_flattens")
+            return js_class
+        result = flatten_page(self.processor, html_file, destination, self.metrics, self._warn)
+        self.journal.record_flatten(html_file, destination, result.js_class)
+        return result.js_class
+
+    def _javascript_runs(self, job: _ChunkJob, js_classes: Sequence[str]) -> List[_ChunkJob]:
+        """Split ``job`` into runs of pages that need, or do without, JavaScript.
+
+        Runs that do without are rendered with JavaScript disabled; a chunk
+        whose pages all share one class stays whole, and runs without script
+        shorter than :func:`js_min_run` render with JavaScript.
+        """
+
+        if not self.config.js_classify:
+            return [job]
+        flags = [js_class == JS_NEEDED for js_class in js_classes]
+        runs = javascript_runs(job.inputs, flags, js_min_run(self.config))
+        jobs: List[_ChunkJob] = []
+        start = 0
+        for index, (inputs, javascript) in enumerate(runs, start=1):
+            end = start + len(inputs)
+            jobs.append(
+                replace(
+                    job,
+                    inputs=inputs,
+                    output=run_output(job.output, index, len(runs)),
+                    costs=job.costs[start:end],
+                    javascript=javascript,
+                )
+            )
+            start = end
+            if not javascript:
+                self.metrics.increment("render_chunks_without_js")
+        if len(jobs) > 1:
+            job.section.pending += len(jobs) - 1
+        return jobs
+
+    async def _await_shared(self, job: _ChunkJob) -> None:
+        """Finish a duplicate page's job once the owning section has rendered it."""
+
+        assert job.shared is not None
+        await job.shared.done.wait()
+        if job.shared.failed:
+            job.section.failed = True
+        elif job.shared.skipped:
+            self._drop_chunk(job)
+        else:
+            saved = job.shared.flatten_seconds + job.shared.render_seconds
+            self.metrics.increment("dedupe_pages_reused")
+            self.metrics.increment("dedupe_seconds_saved", saved)
+            self._emit(
+                ChunkRendered,
+                section=job.section.name,
+                output=job.output,
+                pages=len(job.inputs),
+                seconds=0.0,
+                reused=True,
+            )
+        await self._complete(job)
+
+    def _render_job(self, job: _ChunkJob, deadline: Optional[float], worker: int) -> bool:
+        """Render ``job`` in a worker thread; return False when the journal or cache had it."""
+
+        if self.journal.rendered(job.inputs, job.output, job.javascript):
+            self.metrics.increment("resumed_chunks")
+            return False
+        span = tracing.span(
+            "render_chunk",
+            "chunk",
+            worker=worker,
+            section=job.section.name,
+            output=job.output.name,
+            pages=len(job.inputs),
+            attempt=job.attempt,
+        )
+        with span as args:
+            rendered = not self.renderer.fetch_cached(job.inputs, job.output, job.javascript)
+            if args is not None:
+                args["cached"] = not rendered
+            if rendered:
+                self.renderer.render_chunk(
+                    job.inputs,
+                    job.output,
+                    timeout=deadline,
+                    attempts=1,
+                    check_cache=False,
+                    javascript=job.javascript,
+                )
+        self.journal.record_render(job.inputs, job.output, job.javascript)
+        return rendered
+
+    async def _render_worker(self, worker: int) -> None:
+        while True:
+            _, _, job = await self.render_queue.get()
+            if job is None:
+                return
+            state = job.section
+            if job.shared is not None and not job.owner:
+                # Waiting here would tie up a worker the owner's retry may need.
+                assert self._group is not None
+                self._group.create_task(self._await_shared(job))
+                continue
+            if job.owner or not state.failed:
+                deadline = self._straggler_deadline(job)
+                started = time.perf_counter()
+                try:
+                    async with self.render_slots, self.governor.stage("render", self.metrics):
+                        rendered = await asyncio.to_thread(self._render_job, job, deadline, worker)
+                    finished = time.perf_counter()
+                    self.render_window.extend((started, finished))
+                    if rendered:
+                        self._record_render_time(job, finished - started)
+                    self._emit(
+                        ChunkRendered,
+                        section=state.name,
+                        output=job.output,
+                        pages=len(job.inputs),
+                        seconds=finished - started,
+                        reused=not rendered,
+                    )
+                except subprocess.CalledProcessError as exc:
+                    if job.attempt < self.config.render_retries:
+                        straggler = (
+                            isinstance(exc, RenderProcessKilled)
+                            and deadline is not None
+                            and (
+                                self.config.render_timeout is None
+                                or deadline < self.config.render_timeout
+                            )
+                        )
+                        self._reschedule(job, exc, straggler)
+                        continue
+                    if len(job.inputs) > 1 and job.shared is None and not self.renderer.cancelled:
+                        self._bisect(job, exc)
+                        continue
+                    await self._isolate_page(job, exc)
+                except FileNotFoundError as exc:
+                    self._render_failed(job, exc)
+                if job.shared is not None:
+                    job.shared.render_seconds = time.perf_counter() - started
+                    job.shared.done.set()
+            await self._complete(job)
+
+    async def _complete(self, job: _ChunkJob) -> None:
+        state = job.section
+        rendered_bytes = job.output.stat().st_size if job.output.exists() else 0
+        self.progress.advance("render", len(job.inputs), rendered_bytes)
+        if state.splitter is not None:
+            await self.merge_queue.put(_ChunkDone(state, job.output))
+        state.pending -= 1
+        if state.pending == 0:
+            await self.merge_queue.put(state)
+        self._job_finished()
+
+    def _bisect(self, job: _ChunkJob, exc: subprocess.CalledProcessError) -> None:
+        """Render the halves of a chunk that failed its last attempt to find the failing pages."""
+
+        halves = self._split(job, job.attempt)
+        self._warn(
+            "render_chunk_bisected",
+            section=job.section.name,
+            files=[str(path) for path in job.inputs],
+            error=str(exc),
+        )
+        self.metrics.increment("render_chunks_bisected")
+        assert self._group is not None
+        self._group.create_task(self._requeue(halves, 0.0))
+
+    async def _isolate_page(self, job: _ChunkJob, exc: subprocess.CalledProcessError) -> None:
+        """Render a single failing page with the fallback renderer, or leave it out."""
+
+        config = self.config
+        if config.failed_page_action == "fallback" and not config.playwright_fallback:
+            self._render_failed(job, exc)
+            return
+        if config.failed_page_action == "fallback" and self.fallback is None:
+            self.fallback = make_fallback_renderer(config, self.cache)
+        rendered = await asyncio.to_thread(
+            isolate_failed_page,
+            config,
+            job.section.name,
+            job.inputs[0],
+            job.output,
+            exc,
+            self.report,
+            self.fallback,
+            self.metrics,
+            self._warn,
+        )
+        if rendered is None:
+            job.output.unlink(missing_ok=True)
+            self._drop_chunk(job)
+            if job.shared is not None:
+                job.shared.skipped = True
+
+    def _drop_chunk(self, job: _ChunkJob) -> None:
+        state = job.section
+        state.chunk_pdfs.remove(job.output)
+        state.sources.pop(job.output, None)
+
+    def _render_failed(self, job: _ChunkJob, exc: Exception) -> None:
+        self._warn("wkhtml_render_failed", section=job.section.name, error=str(exc))
+        if job.shared is not None:
+            job.shared.failed = True
+            job.shared.done.set()
+        if not self.config.playwright_fallback:
+            raise exc
+        job.section.failed = True
+
+    def _straggler_deadline(self, job: _ChunkJob) -> Optional[float]:
+        """Return the wall-clock limit for ``job``, tightened for suspected stragglers.
+
+        The final attempt only gets the configured ``render_timeout`` so a slow
+        but healthy chunk still completes.
+        """
+
+        config = self.config
+        if (
+            not config.straggler_factor
+            or job.attempt >= config.render_retries
+            or len(self.page_seconds) < 3
+        ):
+            return config.render_timeout
+        expected = statistics.median(self.page_seconds) * len(job.inputs)
+        deadline = max(config.straggler_min_seconds, expected * config.straggler_factor)
+        if config.render_timeout is not None:
+            deadline = min(deadline, config.render_timeout)
+        return deadline
+
+    def _record_render_time(self, job: _ChunkJob, seconds: float) -> None:
+        if not job.inputs:
+            return
+        if job.known:
+            self.compared_actual += seconds
+            self.compared_predicted += job.predicted_seconds
+        self.page_seconds.append(seconds / len(job.inputs))
+        if self.history is not None:
+            # A chunk's time is shared out in proportion to each page's predicted cost.
+            total = job.predicted_seconds
+            for path, cost in zip(job.inputs, job.costs, strict=True):
+                share = cost / total if total > 0 else 1 / len(job.inputs)
+                self.history.record(RenderHistory.key(job.section.name, path), seconds * share)
+
+    def _reschedule(
+        self, job: _ChunkJob, exc: subprocess.CalledProcessError, straggler: bool
+    ) -> None:
+        """Put a failed or straggling chunk back on the queue instead of blocking a worker on it.
+
+        Chunks killed for exceeding a limit are split in half so the offending
+        pages end up in smaller retries; other failures are retried as-is after
+        an exponential backoff.
+        """
+
+        state = job.section
+        if isinstance(exc, RenderProcessKilled) and len(job.inputs) > 1:
+            retries = self._split(job, job.attempt + 1)
+        else:
+            retries = [replace(job, attempt=job.attempt + 1)]
+        delay = 0.0 if straggler else self.config.render_retry_backoff * 2**job.attempt
+        self._warn(
+            "render_chunk_rescheduled",
+            section=state.name,
+            files=[str(path) for path in job.inputs],
+            reason="straggler" if straggler else str(exc),
+            attempt=job.attempt + 1,
+            split=len(retries) > 1,
+            delay=delay,
+        )
+        self.metrics.increment("render_chunks_rescheduled")
+        assert self._group is not None
+        self._group.create_task(self._requeue(retries, delay))
+
+    def _split(self, job: _ChunkJob, attempt: int) -> List[_ChunkJob]:
+        """Replace ``job`` in its section by two half-size jobs, keeping page order."""
+
+        state = job.section
+        middle = len(job.inputs) // 2
+        slices = (slice(None, middle), slice(middle, None))
+        halves = [
+            replace(
+                job, inputs=job.inputs[half], output=output, attempt=attempt, costs=job.costs[half]
+            )
+            for half, output in zip(slices, half_outputs(job.output), strict=True)
+        ]
+        position = state.chunk_pdfs.index(job.output)
+        state.chunk_pdfs[position : position + 1] = [half.output for half in halves]
+        state.sources.pop(job.output, None)
+        state.sources.update((half.output, half.inputs) for half in halves)
+        state.pending += 1
+        self.outstanding += 1
+        return halves
+
+    async def _requeue(self, jobs: List[_ChunkJob], delay: float) -> None:
+        if delay:
+            await asyncio.sleep(delay)
+        for job in jobs:
+            await self._enqueue(job)
+
+    def _job_finished(self) -> None:
+        self.outstanding -= 1
+        if self.flatten_finished and self.outstanding == 0:
+            self.drained.set()
+
+    async def _render_stage(self) -> None:
+        assert self._group is not None
+        workers = [
+            self._group.create_task(self._render_worker(worker)) for worker in range(self.workers)
+        ]
+        await self.drained.wait()
+        for _ in workers:
+            await self.render_queue.put((math.inf, next(self._sequence), None))
+        await asyncio.gather(*workers)
+        await self.merge_queue.put(None)
+
+    async def _merge_stage(self) -> None:
+        while True:
+            item = await self.merge_queue.get()
+            if item is None:
+                return
+            if isinstance(item, _ChunkDone):
+                await self._advance_volumes(item.section, item.output)
+                continue
+            state = item
+            if not state.failed and not state.chunk_pdfs:
+                self._warn("render_section_empty", section=state.name)
+                self.progress.advance("merge")
+                continue
+            started = time.perf_counter()
+            keep = {entry.output for entry in self.shared.values()}
+            with self.governor.track("merge"):
+                if state.failed:
+                    for partial in state.chunk_pdfs:
+                        if partial.parent != self.shared_dir:
+                            partial.unlink(missing_ok=True)
+                    LOGGER.info("playwright_fallback_start", section=state.name)
+                    fallback = self.fallback or make_fallback_renderer(self.config, self.cache)
+                    chunk_pdfs = await asyncio.to_thread(
+                        fallback.render, state.name, state.flattened, self.chunk_dir
+                    )
+                    sources = fallback_sources(state.flattened, chunk_pdfs)
+                    manual = await asyncio.to_thread(
+                        complete_section,
+                        self.config,
+                        self.merger,
+                        state.name,
+                        chunk_pdfs,
+                        sources,
+                        self.manuals_dir,
+                        keep,
+                        self.metrics,
+                    )
+                elif state.splitter is not None:
+                    manual = await self._finish_volumes(state)
+                else:
+                    manual = await asyncio.to_thread(
+                        complete_section,
+                        self.config,
+                        self.merger,
+                        state.name,
+                        state.chunk_pdfs,
+                        state.sources,
+                        self.manuals_dir,
+                        keep,
+                        self.metrics,
+                    )
+            self.manuals[state.name] = manual
+            pages = _plan_pages(self.plans[state.name])
+            await asyncio.to_thread(self.journal.record_merge, state.name, manual, pages)
+            self.progress.advance("merge", nbytes=manual.stat().st_size)
+            LOGGER.info("render_section_complete", section=state.name, pdf=str(manual))
+            self._emit(
+                SectionMerged, section=state.name, pdf=manual, seconds=time.perf_counter() - started
+            )
+
+    async def _advance_volumes(self, state: _SectionState, output: Path) -> None:
+        """Add finished chunks to the section's volumes in menu order, writing each full volume."""
+
+        if state.failed or state.splitter is None:
+            return
+        state.rendered.add(output)
+        while (
+            state.frontier < len(state.chunk_pdfs)
+            and state.chunk_pdfs[state.frontier] in state.rendered
+        ):
+            pdf = state.chunk_pdfs[state.frontier]
+            part = await asyncio.to_thread(measure_part, pdf, state.sources.get(pdf, []))
+            state.frontier += 1
+            closed = state.splitter.add(part)
+            if closed is not None:
+                await asyncio.to_thread(self._write_volume, state, closed)
+
+    def _write_volume(self, state: _SectionState, volume: Volume) -> None:
+        with self.governor.track("merge"):
+            write_volume(self.merger, volume, {entry.output for entry in self.shared.values()})
+            optimize_manual(self.config, state.name, volume.path, self.metrics)
+        self.metrics.increment("volumes_written")
+        pages = sum(part.pages for part in volume.parts)
+        self._emit(VolumeWritten, section=state.name, pdf=volume.path, pages=pages)
+
+    async def _finish_volumes(self, state: _SectionState) -> Path:
+        # Every chunk has been reported through _ChunkDone, so only the open volume is left.
+        assert state.splitter is not None
+        last = state.splitter.finish()
+        if last is not None:
+            await asyncio.to_thread(self._write_volume, state, last)
+        volumes = state.splitter.volumes
+        index = await asyncio.to_thread(write_index, state.name, self.manuals_dir, volumes)
+        LOGGER.info("volumes_indexed", section=state.name, volumes=len(volumes), index=str(index))
+        return manual_path(self.manuals_dir, state.name, volumes)
+
+
+__all__ = [
+    "BuildResources",
+    "FlattenShare",
+    "StreamingBuild",
+    "stream_build",
+    "stream_variants",
+    "scratch_root",
+]
@@ -0,0 +1,143 @@
+"""Record a timeline of a run as a Chrome trace-event file (Perfetto, chrome://tracing)."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import structlog
+
+LOGGER = structlog.get_logger(__name__)
+
+_tracer: Optional[Tracer] = None
+
+
+class Tracer:
+    """Collect complete ("X") trace events from any thread.
+
+    Each event carries the process ID and the native ID of the worker thread
+    that ran it; the thread names are written as metadata so viewers label
+    the worker lanes.
+    """
+
+    def __init__(self) -> None:
+        self.pid = os.getpid()
+        self.events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origin = time.perf_counter_ns()
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        stack: Optional[List[Dict[str, Any]]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _now(self) -> float:
+        return (time.perf_counter_ns() - self._origin) / 1000
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Dict[str, Any]]:
+        stack = self._stack()
+        stack.append(args)
+        started = self._now()
+        try:
+            yield args
+        except BaseException as exc:
+            args["error"] = type(exc).__name__
+            raise
+        finally:
+            finished = self._now()
+            stack.pop()
+            thread = threading.current_thread()
+            tid = thread.native_id or 0
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": started,
+                "dur": finished - started,
+                "pid": self.pid,
+                "tid": tid,
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+                self._threads.setdefault(tid, thread.name)
+
+    def annotate(self, **args: Any) -> None:
+        """Add ``args`` to the innermost span open on the calling thread."""
+
+        stack = self._stack()
+        if stack:
+            stack[-1].update(args)
+
+    def write(self, path: Path) -> None:
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event["ts"])
+            threads = dict(self._threads)
+        metadata: List[Dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": 0,
+                "args": {"name": "html2manual"},
+            }
+        ]
+        metadata.extend(
+            {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+            for tid, name in sorted(threads.items())
+        )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        trace = {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(trace, default=str), encoding="utf-8")
+        LOGGER.info("trace_written", trace=str(path), events=len(events))
+
+
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """Time the block as a trace event while a trace is being recorded; otherwise do nothing."""
+
+    tracer = _tracer
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, category, **args) as span_args:
+        yield span_args
+
+
+def annotate(**args: Any) -> None:
+    tracer = _tracer
+    if tracer is not None:
+        tracer.annotate(**args)
+
+
+@contextmanager
+def recording(path: Optional[Path]) -> Iterator[Optional[Tracer]]:
+    """Record spans from every thread while the block runs and write them to ``path``.
+
+    The trace is written even when the block fails, so an aborted run can be
+    inspected too. With no ``path`` nothing is recorded.
+    """
+
+    global _tracer
+    if path is None:
+        yield None
+        return
+    tracer = Tracer()
+    _tracer = tracer
+    try:
+        yield tracer
+    finally:
+        _tracer = None
+        tracer.write(path)
+
+
+__all__ = ["Tracer", "annotate", "recording", "span"]
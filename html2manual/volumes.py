@@ -0,0 +1,206 @@
+"""Split section manuals into volumes bounded by page count or file size."""
+
+from __future__ import annotations
+
+import json
+import re
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence
+
+import structlog
+from pypdf import PdfReader
+
+from .render.merge import PdfMerger
+
+LOGGER = structlog.get_logger(__name__)
+INDEX_SUFFIX = ".volumes.json"
+
+
+@dataclass(slots=True)
+class VolumePart:
+    """A rendered chunk PDF and the page files it was rendered from."""
+
+    pdf: Path
+    sources: List[Path]
+    pages: int
+    bytes: int
+
+
+def measure_part(pdf: Path, sources: Sequence[Path]) -> VolumePart:
+    pages = len(PdfReader(str(pdf)).pages)
+    return VolumePart(pdf=pdf, sources=list(sources), pages=pages, bytes=pdf.stat().st_size)
+
+
+@dataclass(slots=True)
+class Volume:
+    path: Path
+    parts: List[VolumePart] = field(default_factory=list)
+
+    @property
+    def sources(self) -> List[Path]:
+        return [source for part in self.parts for source in part.sources]
+
+    def as_dict(self) -> Dict[str, Any]:
+        sources = self.sources
+        return {
+            "file": self.path.name,
+            "pages": sum(part.pages for part in self.parts),
+            "bytes": self.path.stat().st_size if self.path.exists() else 0,
+            "first_page_file": sources[0].name if sources else None,
+            "last_page_file": sources[-1].name if sources else None,
+        }
+
+
+def volume_path(manuals_dir: Path, section: str, number: int) -> Path:
+    return manuals_dir / f"{section}_vol{number:02d}.pdf"
+
+
+def index_path(manuals_dir: Path, section: str) -> Path:
+    return manuals_dir / f"{section}{INDEX_SUFFIX}"
+
+
+class VolumeSplitter:
+    """Pack a section's chunk PDFs, in menu order, into bounded volumes.
+
+    Parts are added as soon as every earlier chunk has rendered. A volume is
+    closed once the next part would push it over ``max_pages`` or
+    ``max_bytes``; a single part above a limit becomes a volume of its own,
+    since volumes only break between chunks (and so between page files).
+    """
+
+    def __init__(
+        self,
+        section: str,
+        manuals_dir: Path,
+        max_pages: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.section = section
+        self.manuals_dir = manuals_dir
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.volumes: List[Volume] = []
+        self._open: List[VolumePart] = []
+
+    def _fits(self, part: VolumePart) -> bool:
+        pages = part.pages + sum(item.pages for item in self._open)
+        size = part.bytes + sum(item.bytes for item in self._open)
+        return (self.max_pages is None or pages <= self.max_pages) and (
+            self.max_bytes is None or size <= self.max_bytes
+        )
+
+    def add(self, part: VolumePart) -> Optional[Volume]:
+        """Add the next part; return the volume it closed, if any."""
+
+        closed: Optional[Volume] = None
+        if self._open and not self._fits(part):
+            closed = Volume(
+                volume_path(self.manuals_dir, self.section, len(self.volumes) + 1), self._open
+            )
+            self.volumes.append(closed)
+            self._open = []
+        self._open.append(part)
+        return closed
+
+    def finish(self) -> Optional[Volume]:
+        """Close the last volume; a section that fits in one keeps the ``<section>.pdf`` name."""
+
+        if not self._open:
+            return None
+        if self.volumes:
+            path = volume_path(self.manuals_dir, self.section, len(self.volumes) + 1)
+        else:
+            path = self.manuals_dir / f"{self.section}.pdf"
+        last = Volume(path, self._open)
+        self.volumes.append(last)
+        self._open = []
+        return last
+
+
+def write_volume(merger: PdfMerger, volume: Volume, keep: Collection[Path] = ()) -> Path:
+    """Merge a volume's parts into its PDF and remove the parts not listed in ``keep``."""
+
+    pdfs = [part.pdf for part in volume.parts]
+    if len(pdfs) > 1:
+        merger.merge(pdfs, volume.path)
+        for pdf in pdfs:
+            if pdf not in keep:
+                pdf.unlink(missing_ok=True)
+    elif pdfs[0] in keep:
+        shutil.copyfile(pdfs[0], volume.path)
+    elif pdfs[0] != volume.path:
+        shutil.move(str(pdfs[0]), volume.path)
+    LOGGER.info(
+        "volume_written",
+        pdf=str(volume.path),
+        chunks=len(pdfs),
+        pages=sum(part.pages for part in volume.parts),
+    )
+    return volume.path
+
+
+def write_index(section: str, manuals_dir: Path, volumes: Sequence[Volume]) -> Path:
+    """Write ``<section>.volumes.json`` and remove volumes left over from earlier builds."""
+
+    current = {volume.path for volume in volumes}
+    pattern = re.compile(rf"{re.escape(section)}_vol\d+\.pdf")
+    stale = [path for path in manuals_dir.glob("*.pdf") if pattern.fullmatch(path.name)]
+    stale.append(manuals_dir / f"{section}.pdf")
+    for path in stale:
+        if path not in current:
+            path.unlink(missing_ok=True)
+    index = index_path(manuals_dir, section)
+    payload = {"section": section, "volumes": [volume.as_dict() for volume in volumes]}
+    index.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    return index
+
+
+def split_section(
+    merger: PdfMerger,
+    section: str,
+    chunk_pdfs: Sequence[Path],
+    sources: Dict[Path, List[Path]],
+    manuals_dir: Path,
+    max_pages: Optional[int],
+    max_bytes: Optional[int],
+    keep: Collection[Path] = (),
+    written: Optional[Callable[[Path], None]] = None,
+) -> List[Volume]:
+    """Pack already rendered ``chunk_pdfs`` into volumes and write them with their index.
+
+    ``written`` is called with each volume's path before the index is written.
+    """
+
+    splitter = VolumeSplitter(section, manuals_dir, max_pages, max_bytes)
+    volumes = [splitter.add(measure_part(pdf, sources.get(pdf, []))) for pdf in chunk_pdfs]
+    volumes.append(splitter.finish())
+    for volume in volumes:
+        if volume is not None:
+            write_volume(merger, volume, keep)
+            if written is not None:
+                written(volume.path)
+    write_index(section, manuals_dir, splitter.volumes)
+    return splitter.volumes
+
+
+def manual_path(manuals_dir: Path, section: str, volumes: Sequence[Volume]) -> Path:
+    """The file that stands for a section's manual: its only volume, or the volume index."""
+
+    return volumes[0].path if len(volumes) == 1 else index_path(manuals_dir, section)
+
+
+__all__ = [
+    "INDEX_SUFFIX",
+    "Volume",
+    "VolumePart",
+    "VolumeSplitter",
+    "index_path",
+    "manual_path",
+    "measure_part",
+    "split_section",
+    "volume_path",
+    "write_index",
+    "write_volume",
+]
@@ -2,6 +2,9 @@ from __future__ import annotations
 
 from pathlib import Path
 import pytest
+from pypdf import PdfWriter
+
+from html2manual.render.wkhtml import WkhtmlRenderer
 
 
 @pytest.fixture()
@@ -37,3 +40,36 @@ def sample_html(tmp_path: Path, assets_dir: Path) -> Path:
         encoding="utf-8",
     )
     return html
+
+
+@pytest.fixture()
+def manual_project(tmp_path: Path) -> Path:
+    project = tmp_path / "manual"
+    contents = project / "Contents"
+    contents.mkdir(parents=True)
+    entries = []
+    for section in ("SECTION1", "SECTION2"):
+        for index in range(3):
+            name = f"{section.lower()}_page{index}.html"
+            (contents / name).write_text(
+                f"<html><body><p style='overflow:auto'>{section} {index}</p></body></html>",
+                encoding="utf-8",
+            )
+            entries.append(f"display('Contents/{name}','{name}','/{section}/Topic');")
+    (project / "menu.html").write_text("\n".join(entries), encoding="utf-8")
+    return project
+
+
+def _fake_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+    writer = PdfWriter()
+    for _ in args[args.index(str(self.zoom)) + 1 : -1]:
+        writer.add_blank_page(width=10, height=10)
+    with Path(args[-1]).open("wb") as handle:
+        writer.write(handle)
+
+
+@pytest.fixture()
+def fake_wkhtml(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(WkhtmlRenderer, "command", property(lambda self: "wkhtmltopdf"))
+    monkeypatch.setattr(WkhtmlRenderer, "version", property(lambda self: "fake"))
+    monkeypatch.setattr(WkhtmlRenderer, "_run", _fake_run)
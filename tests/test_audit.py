@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Dict, List, Optional
 
+import pytest
+
+from html2manual import audit
 from html2manual.audit import audit_html, audit_manual
+from html2manual.perf_audit import PerfThresholds, estimate_sections, measure_page, perf_issues
 
 
 def test_audit_flags_scrollable_container(sample_html: Path) -> None:
@@ -31,9 +36,96 @@ def test_audit_flags_missing_assets(tmp_path: Path) -> None:
 
 def test_audit_manual_collects_all(tmp_path: Path) -> None:
     html1 = tmp_path / "a.html"
-    html1.write_text("<html><body><div style='overflow:auto'></div></body></html>", encoding="utf-8")
+    html1.write_text(
+        "<html><body><div style='overflow:auto'></div></body></html>", encoding="utf-8"
+    )
     html2 = tmp_path / "b.html"
     html2.write_text("<html><body><img src='missing.png'/></body></html>", encoding="utf-8")
     issues = audit_manual(tmp_path, "*.html")
     assert len(issues) >= 2
     assert {issue.file for issue in issues} == {html1, html2}
+
+
+def test_perf_rules_flag_heavy_pages(tmp_path: Path) -> None:
+    (tmp_path / "big.png").write_bytes(b"\x89PNG" + b"\x00" * 4096)
+    (tmp_path / "app.js").write_text("var x = 1;" * 200, encoding="utf-8")
+    html = tmp_path / "heavy.html"
+    html.write_text(
+        """
+        <html><body>
+            <img src="big.png" />
+            <script src="app.js"></script>
+            <table><tr><td><table><tr><td><table><tr><td>deep</td></tr></table></td></tr></table></td></tr></table>
+        </body></html>
+        """,
+        encoding="utf-8",
+    )
+    cost = measure_page(html)
+    assert cost.largest_image_bytes == 4100
+    assert cost.max_table_depth == 3
+    assert cost.inlined_bytes > cost.source_bytes + cost.script_bytes
+    thresholds = PerfThresholds(
+        image_bytes=1024, inline_script_bytes=1024, table_depth=2, page_weight_bytes=2048
+    )
+    issues = {issue.issue.split(" (")[0] for issue in perf_issues(cost, thresholds)}
+    assert issues == {
+        "Oversized image",
+        "Huge inlined script",
+        "Deeply nested tables",
+        "Heavy page after inlining",
+    }
+    assert perf_issues(cost) == []
+
+
+def test_estimate_sections_totals_pages(tmp_path: Path) -> None:
+    small = tmp_path / "small.html"
+    small.write_text("<html><body>hi</body></html>", encoding="utf-8")
+    large = tmp_path / "large.html"
+    large.write_text("<html><body>" + "text " * 20000 + "</body></html>", encoding="utf-8")
+    estimates = estimate_sections({"A": [small], "B": [small, large, tmp_path / "missing.html"]})
+    a, b = estimates
+    assert len(b.pages) == 2
+    assert b.estimated_render_seconds > 2 * a.estimated_render_seconds
+    assert b.as_dict()["estimated_pdf_bytes"] > a.as_dict()["estimated_pdf_bytes"]
+
+
+def test_audit_cache_reparses_only_changed_pages(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    contents = tmp_path / "manual"
+    contents.mkdir()
+    (contents / "a.html").write_text(
+        "<html><body><div style='overflow:auto'></div></body></html>", encoding="utf-8"
+    )
+    (contents / "b.html").write_text(
+        "<html><body><img src='late.png'/></body></html>", encoding="utf-8"
+    )
+    (contents / "c.html").write_text(
+        "<html><body><a href='a.html'>A</a></body></html>", encoding="utf-8"
+    )
+    parsed: List[str] = []
+    original = audit.audit_html
+
+    def counting_audit(
+        path: Path, checked: Optional[Dict[Path, bool]] = None
+    ) -> List[audit.AuditIssue]:
+        parsed.append(path.name)
+        return original(path, checked)
+
+    monkeypatch.setattr(audit, "audit_html", counting_audit)
+    cache_file = tmp_path / ".cache" / audit.AUDIT_CACHE_FILE
+
+    def cached_audit() -> List[audit.AuditIssue]:
+        return audit_manual(contents, "*.html", audit.AuditCache(cache_file, contents))
+
+    first = cached_audit()
+    assert parsed == ["a.html", "b.html", "c.html"]
+    parsed.clear()
+    assert cached_audit() == first
+    assert parsed == []
+
+    (contents / "a.html").write_text("<html><body>fixed</body></html>", encoding="utf-8")
+    (contents / "late.png").write_bytes(b"\x89PNG")
+    issues = cached_audit()
+    assert parsed == ["a.html", "b.html"]
+    assert issues == audit_manual(contents, "*.html") == []
@@ -1,11 +1,21 @@
 from __future__ import annotations
 
 from pathlib import Path
-from html2manual.flatten.css_inliner import embed_css_urls, inline_css
+from html2manual.flatten.css_inliner import AssetCache, embed_css_urls, inline_css
 from html2manual.flatten.image_inliner import inline_images
 from html2manual.flatten.js_inliner import inline_js
+from html2manual.flatten.js_classifier import (
+    JS_NEEDED,
+    JS_NONE,
+    JS_STRIP_SAFE,
+    ScriptRules,
+    classify_page,
+    classify_scripts,
+    javascript_runs,
+)
+from html2manual.flatten.minify import minify_html
 from html2manual.flatten.overflow_fix import apply_overflow_fix
-from html2manual.flatten.html_processor import HtmlProcessor
+from html2manual.flatten.html_processor import HtmlProcessor, prescan
 
 
 def test_css_inliner_inlines_link_styles(sample_html: Path) -> None:
@@ -25,7 +35,7 @@ def test_js_inliner_inlines_external_scripts(sample_html: Path) -> None:
 def test_image_inliner_replaces_img_sources(sample_html: Path) -> None:
     html = sample_html.read_text(encoding="utf-8")
     inlined = inline_images(html, sample_html)
-    assert "src=\"data:" in inlined
+    assert 'src="data:' in inlined
 
 
 def test_background_image_embedding(assets_dir: Path, sample_html: Path) -> None:
@@ -34,6 +44,25 @@ def test_background_image_embedding(assets_dir: Path, sample_html: Path) -> None
     assert "data:image/png;base64" in embedded
 
 
+def test_asset_cache_is_bounded_by_bytes(tmp_path: Path) -> None:
+    # Each icon encodes to 182 bytes, so the fifth pushes out the first.
+    cache = AssetCache(max_bytes=800)
+    assets = []
+    for index in range(5):
+        asset = tmp_path / f"icon{index}.png"
+        asset.write_bytes(bytes([index]) * 120)
+        assets.append(asset)
+    large = tmp_path / "photo.png"
+    large.write_bytes(b"x" * 200)
+
+    uris = [cache.data_uri(asset, 1, 120) for asset in assets]
+    assert cache.bytes == sum(len(uri) for uri in uris[1:]) <= 800
+    assert cache.data_uri(large, 1, 200).startswith("data:image/png;base64,")
+    assert cache.bytes == sum(len(uri) for uri in uris[1:])
+    assets[4].write_bytes(b"changed")
+    assert cache.data_uri(assets[4], 1, 120) == uris[4]
+
+
 def test_overflow_fix_inline_and_style_block(sample_html: Path) -> None:
     html = sample_html.read_text(encoding="utf-8")
     fixed = apply_overflow_fix(html, [".box"])
@@ -58,3 +87,145 @@ def test_html_processor_runs_full_pipeline(sample_html: Path) -> None:
     result = processor.flatten(sample_html)
     assert "data:image/png" in result.html
     assert "console.log('hi');" in result.html
+
+
+def test_prescan_detects_applicable_transforms() -> None:
+    assert prescan(b"<html><body><p>Plain</p></body></html>") == frozenset()
+    assert prescan(b"<IMG SRC='a.png'>") == {"images"}
+    assert prescan(b"<div style='color:red'></div>") == {"images", "overflow"}
+    assert prescan(b"<link rel='stylesheet' href='a.css'><script src='a.js'></script>") == {
+        "css",
+        "js",
+    }
+    assert prescan("<p>x</p>".encode("utf-16")) == {"css", "js", "images", "overflow"}
+
+
+def test_html_processor_fixes_overflow_from_linked_stylesheets(tmp_path: Path) -> None:
+    (tmp_path / "layout.css").write_text(".box { overflow: auto; }", encoding="utf-8")
+    page = tmp_path / "linked.html"
+    page.write_text(
+        '<html><head><link rel="stylesheet" href="layout.css"></head>'
+        '<body><div class="box">Text</div></body></html>',
+        encoding="utf-8",
+    )
+    result = HtmlProcessor().flatten(page)
+    assert result.transforms == ["css", "overflow"]
+    assert "overflow: visible" in result.html
+    assert "overflow: auto" not in result.html
+
+
+def test_html_processor_copies_plain_pages_through(tmp_path: Path) -> None:
+    page = tmp_path / "plain.html"
+    page.write_text("<html><body><p>Plain <br> text</p></body></html>", encoding="utf-8")
+    result = HtmlProcessor().flatten(page)
+    assert result.skipped
+    assert result.html == page.read_text(encoding="utf-8")
+
+
+def test_classify_scripts_applies_keep_and_strip_rules() -> None:
+    rules = ScriptRules(keep=(r"chart",), strip=(r"menu\.js$", r"chart"))
+    menu_only = (
+        "<body><script src='js/menu.js'></script>"
+        "<script type='application/ld+json'>{}</script></body>"
+    )
+    html, js_class, stripped = classify_scripts(menu_only, rules)
+    assert (js_class, stripped) == (JS_STRIP_SAFE, 1)
+    assert "menu.js" not in html and "ld+json" in html
+    assert classify_scripts("<body><script src='chart.js'></script></body>", rules)[1:] == (
+        JS_NEEDED,
+        0,
+    )
+    assert classify_scripts("<body onload='init()'><p>x</p></body>", rules)[1] == JS_NEEDED
+    assert classify_scripts("<script type='text/template'><p></p></script>", rules)[1] == JS_NONE
+
+
+def test_classify_page_ignores_inert_scripts(tmp_path: Path) -> None:
+    page = tmp_path / "page.html"
+    page.write_text("<script type='application/json'>{}</script><p>x</p>", encoding="utf-8")
+    assert classify_page(page) == JS_NONE
+    page.write_text("<script src='menu.js'></script>", encoding="utf-8")
+    assert classify_page(page) == JS_NEEDED
+    assert classify_page(page, ScriptRules(strip=(r"menu\.js$",))) == JS_STRIP_SAFE
+    assert classify_page(tmp_path / "missing.html") == JS_NEEDED
+
+
+def test_javascript_runs_keep_short_runs_with_javascript() -> None:
+    pages = [Path(f"p{index}.html") for index in range(6)]
+    flags = [True, False, True, False, False, False]
+    assert javascript_runs(pages, flags, min_run=2) == [
+        (pages[:3], True),
+        (pages[3:], False),
+    ]
+    assert javascript_runs(pages, flags, min_run=4) == [(pages, True)]
+    assert javascript_runs(pages[3:], flags[3:], min_run=4) == [(pages[3:], False)]
+
+
+def test_html_processor_classifies_scripts_when_js_inline_is_off(sample_html: Path) -> None:
+    result = HtmlProcessor(js_inline=False).flatten(sample_html)
+    assert result.js_class == JS_NEEDED
+    assert "script.js" in result.html
+
+
+def test_html_processor_classifies_pages_with_only_render_handlers(tmp_path: Path) -> None:
+    page = tmp_path / "page.html"
+    page.write_text("<html><body onload='init()'><p>x</p></body></html>", encoding="utf-8")
+    result = HtmlProcessor().flatten(page)
+    assert result.js_class == JS_NEEDED
+    page.write_text(
+        "<html><body><img src='a.png' ONERROR='retry(this)'></body></html>", encoding="utf-8"
+    )
+    assert HtmlProcessor(images_inline=False).flatten(page).js_class == JS_NEEDED
+    page.write_text(
+        "<html><body><button onclick='go()'>Go</button></body></html>", encoding="utf-8"
+    )
+    assert HtmlProcessor().flatten(page).js_class == JS_NONE
+
+
+def test_minify_keeps_preformatted_text_and_strings() -> None:
+    page = """<html>
+  <head>
+    <!-- generated -->
+    <!--[if IE]><p>legacy</p><![endif]-->
+    <style>
+      /* layout */
+      .a  >  .b , a :hover { color:  red ; content: "  x  /* y */ "; }
+    </style>
+    <script>
+      // setup
+      var total = 1;
+
+      total += 2;
+    </script>
+    <script type="text/template">  {{ name }}  </script>
+  </head>
+  <body>
+    <p title="a   b">Hello,
+       world</p>
+    <p>Hello <!-- c -->World, one<!-- c -->word</p>
+    <pre>
+  keep   this
+    </pre>
+    <textarea>  and\n   this </textarea>
+  </body>
+</html>"""
+    assert minify_html(page) == (
+        "<html> <head> <!--[if IE]><p>legacy</p><![endif]--> "
+        '<style>.a>.b,a :hover{color:red;content:"  x  /* y */ "}</style> '
+        "<script>var total = 1;\ntotal += 2;</script> "
+        '<script type="text/template">  {{ name }}  </script> </head> '
+        '<body> <p title="a   b">Hello, world</p> <p>Hello World, oneword</p> '
+        "<pre>\n  keep   this\n    </pre> "
+        "<textarea>  and\n   this </textarea> </body> </html>"
+    )
+
+
+def test_html_processor_minifies_plain_pages_last(tmp_path: Path) -> None:
+    page = tmp_path / "plain.html"
+    page.write_text(
+        "<html>\n  <body>\n    <p>Plain   text</p>\n  </body>\n</html>\n", encoding="utf-8"
+    )
+    result = HtmlProcessor(minify=True).flatten(page)
+    assert result.transforms == ["minify"]
+    assert result.html == "<html> <body> <p>Plain text</p> </body> </html>"
+    assert result.bytes_before_minify == len(page.read_bytes())
+    assert result.bytes_after_minify == len(result.html)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Set
+
+import structlog
+
+from html2manual.logging_setup import QueuedLogWriter, WarningRateLimiter
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: List[logging.LogRecord] = []
+        self.threads: Set[str] = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+        self.threads.add(threading.current_thread().name)
+
+
+def test_rate_limiter_drops_repeated_warnings_per_window() -> None:
+    now = [0.0]
+    limiter = WarningRateLimiter(burst=2, interval=10.0, clock=lambda: now[0])
+
+    def passed(method: str, event: str) -> bool:
+        try:
+            limiter(None, method, {"event": event})
+        except structlog.DropEvent:
+            return False
+        return True
+
+    assert [passed("warning", "flatten_warning") for _ in range(5)] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert passed("warning", "render_page_failed")
+    assert passed("error", "flatten_warning")
+    assert limiter.drain() == {"flatten_warning": 3}
+    assert limiter.drain() == {}
+    now[0] = 10.0
+    assert passed("warning", "flatten_warning")
+
+
+def test_queued_writer_writes_records_on_its_own_thread() -> None:
+    target = _ListHandler()
+    writer = QueuedLogWriter([target], None, interval=60.0)
+    writer.start()
+    logger = logging.getLogger("html2manual.test_queued")
+    logger.addHandler(writer.handler)
+    logger.propagate = False
+    try:
+        for index in range(3):
+            logger.warning("page %d", index)
+    finally:
+        logger.removeHandler(writer.handler)
+        writer.stop()
+    assert [record.getMessage() for record in target.records] == ["page 0", "page 1", "page 2"]
+    assert target.threads == {"html2manual-log-writer"}
@@ -0,0 +1,715 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from itertools import pairwise
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import pytest
+from pypdf import PdfReader
+
+from html2manual import tracing
+from html2manual.calibration import calibration_path
+from html2manual.config import Html2ManualConfig
+from html2manual.events import (
+    BuildFinished,
+    ChunkRendered,
+    PageFlattened,
+    SectionMerged,
+    SectionParsed,
+    VolumeWritten,
+    iter_build,
+)
+from html2manual.isolation import FAILED_PAGES_FILE
+from html2manual.journal import BuildJournal, ConfigChangedError, atomic_output, journal_path
+from html2manual.memory import MB, MemoryGovernor, descendant_pids
+from html2manual.pipeline import (
+    METRICS_FILE,
+    build_manuals,
+    flatten_sections,
+    load_flattened,
+    parse_sections,
+    render_sections,
+    variant_configs,
+)
+from html2manual.render.wkhtml import RenderProcessKilled, WkhtmlRenderer
+from html2manual.scheduling import HISTORY_FILE
+
+
+def _config(manual_project: Path, tmp_path: Path, **overrides: Any) -> Html2ManualConfig:
+    return Html2ManualConfig(input_dir=manual_project, output_dir=tmp_path / "build", **overrides)
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_build_manuals_streams_sections(manual_project: Path, tmp_path: Path) -> None:
+    config = _config(
+        manual_project, tmp_path, chunk_size=2, render_workers=2, pipeline_queue_size=1
+    )
+    manuals = build_manuals(config)
+    assert list(manuals) == ["SECTION1", "SECTION2"]
+    for section, pdf in manuals.items():
+        assert pdf == config.output_dir / "Manuals" / f"{section}.pdf"
+        assert len(PdfReader(str(pdf)).pages) == 3
+    leftovers = sorted(p.name for p in (config.output_dir / "Manuals").iterdir())
+    assert leftovers == ["SECTION1.pdf", "SECTION2.pdf"]
+    assert len(list((config.output_dir / "flattened" / "SECTION1").glob("*.html"))) == 3
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["pages_flattened"] == 6
+    assert metrics["prescan_skip_rate"] == 0
+
+
+def test_build_manuals_propagates_render_failure(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(WkhtmlRenderer, "command", property(lambda self: "wkhtmltopdf"))
+
+    def failing_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        raise FileNotFoundError("wkhtmltopdf executable not found on PATH")
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", failing_run)
+    config = _config(manual_project, tmp_path, playwright_fallback=False, chunk_cache_enable=False)
+    with pytest.raises(FileNotFoundError):
+        build_manuals(config)
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_in_memory_build_leaves_no_intermediates(manual_project: Path, tmp_path: Path) -> None:
+    scratch = tmp_path / "scratch"
+    config = _config(manual_project, tmp_path, chunk_size=2, in_memory=True, scratch_dir=scratch)
+    manuals = build_manuals(config)
+    assert sorted(p.name for p in config.output_dir.iterdir()) == [
+        ".cache",
+        "Manuals",
+        METRICS_FILE,
+    ]
+    assert sorted(p.name for p in (config.output_dir / "Manuals").iterdir()) == [
+        "SECTION1.pdf",
+        "SECTION2.pdf",
+    ]
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert list(scratch.iterdir()) == []
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_duplicate_pages_render_once(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    notice = manual_project / "Contents" / "notice.html"
+    notice.write_text("<html><body>Legal notice</body></html>", encoding="utf-8")
+    menu = manual_project / "menu.html"
+    menu.write_text(
+        menu.read_text(encoding="utf-8")
+        + "\ndisplay('Contents/notice.html','Notice','/SECTION1/Legal');"
+        + "\ndisplay('Contents/notice.html','Notice','/SECTION2/Legal');",
+        encoding="utf-8",
+    )
+    rendered: list[list[str]] = []
+    fake_run = WkhtmlRenderer._run
+
+    def recording_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        rendered.append(args)
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", recording_run)
+    config = _config(manual_project, tmp_path, chunk_size=10, chunk_cache_enable=False)
+    manuals = build_manuals(config)
+    notice_renders = [args for args in rendered if any(arg.endswith("notice.html") for arg in args)]
+    assert len(notice_renders) == 1
+    assert all(len(PdfReader(str(pdf)).pages) == 4 for pdf in manuals.values())
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["dedupe_pages_reused"] == 1
+    assert metrics["dedupe_flattens_skipped"] == 1
+    assert not (config.output_dir / "Manuals" / "_shared").exists()
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_killed_chunks_are_split_and_rescheduled(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fake_run = WkhtmlRenderer._run
+
+    def killing_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        if len(args) - args.index(str(self.zoom)) - 2 == 3:
+            raise RenderProcessKilled(args, "timeout after 1s")
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", killing_run)
+    config = _config(manual_project, tmp_path, render_retry_backoff=0, chunk_cache_enable=False)
+    manuals = build_manuals(config)
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert sorted(p.name for p in (config.output_dir / "Manuals").iterdir()) == [
+        "SECTION1.pdf",
+        "SECTION2.pdf",
+    ]
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["render_chunks_rescheduled"] == 2
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_build_records_render_history_and_makespan(manual_project: Path, tmp_path: Path) -> None:
+    config = _config(manual_project, tmp_path, chunk_size=2, chunk_cache_enable=False)
+    build_manuals(config)
+    history = json.loads((config.output_dir / ".cache" / HISTORY_FILE).read_text(encoding="utf-8"))
+    assert sorted(history["pages"]) == [
+        f"SECTION{s}/section{s}_page{p}.html" for s in (1, 2) for p in range(3)
+    ]
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["render_makespan_predicted_seconds"] > 0
+    assert "render_makespan_actual_seconds" in metrics
+    assert sorted(history["plans"]) == [
+        "SECTION1/section1_page0.html",
+        "SECTION2/section2_page0.html",
+    ]
+    # The fake renderer's timings are pure noise; only the reuse itself is checked here.
+    build_manuals(config.model_copy(update={"history_rebalance_drift": 100.0}))
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["chunk_plans_reused"] == 2
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_iter_build_yields_typed_events(manual_project: Path, tmp_path: Path) -> None:
+    config = _config(manual_project, tmp_path, chunk_size=2)
+    events = list(iter_build(config))
+    assert [type(event) for event in events[:2]] == [SectionParsed, SectionParsed]
+    assert sum(isinstance(event, PageFlattened) for event in events) == 6
+    assert sum(event.pages for event in events if isinstance(event, ChunkRendered)) == 6
+    merged = [event.section for event in events if isinstance(event, SectionMerged)]
+    assert merged == ["SECTION1", "SECTION2"]
+    assert isinstance(events[-1], BuildFinished)
+    assert events[-1].manuals == {
+        section: config.output_dir / "Manuals" / f"{section}.pdf" for section in merged
+    }
+    assert all(later.elapsed >= earlier.elapsed for earlier, later in pairwise(events))
+
+
+def test_closing_iter_build_kills_running_renderer(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    monkeypatch.setattr(WkhtmlRenderer, "command", property(lambda self: "sleep"))
+    monkeypatch.setattr(WkhtmlRenderer, "version", property(lambda self: "fake"))
+    monkeypatch.setattr(
+        WkhtmlRenderer, "_build_args", lambda self, inputs, output, javascript=True: ["sleep", "30"]
+    )
+    config = _config(manual_project, tmp_path, chunk_cache_enable=False)
+    started = time.monotonic()
+    events = iter_build(config)
+    flattened = 0
+    for event in events:
+        flattened += isinstance(event, PageFlattened)
+        if flattened == 3:
+            time.sleep(0.5)
+            break
+    events.close()
+    assert time.monotonic() - started < 10
+    assert not (config.output_dir / "Manuals" / "SECTION1.pdf").exists()
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_section_filter_leaves_other_manuals_untouched(
+    manual_project: Path, tmp_path: Path
+) -> None:
+    build_manuals(_config(manual_project, tmp_path))
+    section1 = tmp_path / "build" / "Manuals" / "SECTION1.pdf"
+    before = section1.stat().st_mtime_ns
+    (manual_project / "Contents" / "section1_page0.html").unlink()
+
+    manuals = build_manuals(
+        _config(manual_project, tmp_path, sections=["SECTION2"], pages=["*page[01].html"])
+    )
+
+    assert list(manuals) == ["SECTION2"]
+    assert len(PdfReader(str(manuals["SECTION2"])).pages) == 2
+    assert section1.stat().st_mtime_ns == before
+
+
+def test_load_flattened_only_lists_selected_sections(manual_project: Path, tmp_path: Path) -> None:
+    root = tmp_path / "build" / "flattened"
+    for section in ("SECTION1", "SECTION2"):
+        (root / section).mkdir(parents=True)
+        for index in range(3):
+            (root / section / f"page{index}.html").write_text("<p>x</p>", encoding="utf-8")
+    config = _config(
+        manual_project, tmp_path, sections=["SECTION2", "MISSING"], pages=["page2.html"]
+    )
+    assert load_flattened(config) == {"SECTION2": [root / "SECTION2" / "page2.html"]}
+    # Partial writes left behind by a killed build are never listed as pages.
+    with atomic_output(root / "SECTION2" / "page2.html") as partial:
+        partial.write_text("<p>half</p>", encoding="utf-8")
+        (root / "SECTION2" / ".page2.html.1.1.tmp.html").write_text("<p>x</p>", encoding="utf-8")
+        assert load_flattened(config) == {"SECTION2": [root / "SECTION2" / "page2.html"]}
+
+
+def test_page_filter_matches_file_names_before_and_after_flattening(
+    manual_project: Path, tmp_path: Path
+) -> None:
+    flatten_sections(
+        _config(manual_project, tmp_path), parse_sections(_config(manual_project, tmp_path))
+    )
+
+    def selected(*patterns: str) -> Tuple[List[str], List[str]]:
+        config = _config(manual_project, tmp_path, pages=list(patterns))
+        parsed = [path.name for files in parse_sections(config).values() for path in files]
+        flattened = [path.name for files in load_flattened(config).values() for path in files]
+        return parsed, flattened
+
+    names = ["section1_page2.html", "section2_page2.html"]
+    assert selected("*_page2.html") == (names, names)
+    assert selected("Contents/*.html") == ([], [])
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_concat_mode_reports_speedup_against_history(manual_project: Path, tmp_path: Path) -> None:
+    build_manuals(_config(manual_project, tmp_path, chunk_cache_enable=False))
+    config = _config(manual_project, tmp_path, chunk_cache_enable=False, render_mode="concat")
+    manuals = build_manuals(config)
+    assert all(
+        len(PdfReader(str(pdf)).pages) == 1 for pdf in manuals.values()
+    )  # one fake page per document
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["render_speedup_vs_history"] > 0
+    assert not list((config.output_dir / "flattened").rglob("*_concat_*"))
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_minified_build_reports_bytes_saved_and_speedup(
+    manual_project: Path, tmp_path: Path
+) -> None:
+    page = manual_project / "Contents" / "section1_page0.html"
+    page.write_text(
+        "<html>\n  <!-- draft -->\n  <body>\n    <p>SECTION1   0</p>\n  </body>\n</html>\n",
+        encoding="utf-8",
+    )
+    build_manuals(_config(manual_project, tmp_path, chunk_cache_enable=False))
+    config = _config(manual_project, tmp_path, chunk_cache_enable=False, minify_html=True)
+    build_manuals(config)
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert 0 < metrics["minify_bytes_saved"] < metrics["minify_bytes_before"]
+    assert 0 < metrics["minify_reduction"] < 1
+    assert metrics["render_speedup_vs_history"] > 0
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_chunks_without_scripts_render_with_javascript_disabled(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    contents = manual_project / "Contents"
+    (contents / "menu.js").write_text("toggleMenu();", encoding="utf-8")
+    (contents / "section1_page1.html").write_text(
+        "<html><body><p>1</p><script src='menu.js'></script></body></html>", encoding="utf-8"
+    )
+    (contents / "section1_page2.html").write_text(
+        "<html><body><div id='chart'></div><script>drawChart();</script></body></html>",
+        encoding="utf-8",
+    )
+    rendered: list[list[str]] = []
+    fake_run = WkhtmlRenderer._run
+
+    def recording_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        rendered.append(args)
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", recording_run)
+    config = _config(
+        manual_project,
+        tmp_path,
+        chunk_size=4,
+        chunk_cache_enable=False,
+        js_strip_scripts=[r"menu\.js$"],
+    )
+    manuals = build_manuals(config)
+
+    pages = {Path(args[-2]).name: "--disable-javascript" not in args for args in rendered}
+    assert pages == {
+        "section1_page1.html": False,
+        "section1_page2.html": True,
+        "section2_page2.html": False,
+    }
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert (
+        "menu.js"
+        not in (config.output_dir / "flattened" / "SECTION1" / "section1_page1.html").read_text()
+    )
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["pages_js_strip_safe"] == 1
+    assert metrics["pages_js_needs_js"] == 1
+    assert metrics["render_chunks_without_js"] == 2
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_sections_split_into_indexed_volumes(manual_project: Path, tmp_path: Path) -> None:
+    build_manuals(_config(manual_project, tmp_path))
+    config = _config(
+        manual_project, tmp_path, chunk_size=1, chunk_cache_enable=False, volume_max_pages=2
+    )
+    events = list(iter_build(config))
+
+    manuals_dir = config.output_dir / "Manuals"
+    written = [
+        event
+        for event in events
+        if isinstance(event, VolumeWritten) and event.section == "SECTION1"
+    ]
+    assert [(event.pdf.name, event.pages) for event in written] == [
+        ("SECTION1_vol01.pdf", 2),
+        ("SECTION1_vol02.pdf", 1),
+    ]
+    finished = events[-1]
+    assert isinstance(finished, BuildFinished)
+    assert finished.manuals["SECTION1"] == manuals_dir / "SECTION1.volumes.json"
+    index = json.loads((manuals_dir / "SECTION1.volumes.json").read_text(encoding="utf-8"))
+    assert index["volumes"][0]["first_page_file"] == "section1_page0.html"
+    assert [volume["last_page_file"] for volume in index["volumes"]] == [
+        "section1_page1.html",
+        "section1_page2.html",
+    ]
+    assert sorted(path.name for path in manuals_dir.glob("SECTION1*")) == [
+        "SECTION1.volumes.json",
+        "SECTION1_vol01.pdf",
+        "SECTION1_vol02.pdf",
+    ]
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_render_splits_oversized_chunks_into_own_volumes(
+    manual_project: Path, tmp_path: Path
+) -> None:
+    config = _config(
+        manual_project, tmp_path, chunk_size=2, chunk_cache_enable=False, volume_max_mb=0.0001
+    )
+    flatten_sections(config, parse_sections(config))
+    manuals = render_sections(config, load_flattened(config))
+    index = json.loads(manuals["SECTION2"].read_text(encoding="utf-8"))
+    assert [(volume["file"], volume["pages"]) for volume in index["volumes"]] == [
+        ("SECTION2_vol01.pdf", 2),
+        ("SECTION2_vol02.pdf", 1),
+    ]
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_failing_page_is_isolated_and_skipped(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fake_run = WkhtmlRenderer._run
+
+    def failing_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        if any(arg.endswith("section1_page1.html") for arg in args):
+            raise subprocess.CalledProcessError(1, args)
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", failing_run)
+    overrides: dict[str, Any] = {"failed_page_action": "skip", "render_retry_backoff": 0}
+    config = _config(
+        manual_project, tmp_path, chunk_cache_enable=False, volume_max_pages=1, **overrides
+    )
+    manuals = build_manuals(config)
+
+    index = json.loads(manuals["SECTION1"].read_text(encoding="utf-8"))
+    first_pages = [volume["first_page_file"] for volume in index["volumes"]]
+    assert first_pages == ["section1_page0.html", "section1_page2.html"]
+    assert len(PdfReader(str(manuals["SECTION2"])).pages) == 3
+    report = json.loads((config.output_dir / FAILED_PAGES_FILE).read_text(encoding="utf-8"))
+    assert [
+        (page["section"], Path(page["page"]).name, page["action"]) for page in report["pages"]
+    ] == [("SECTION1", "section1_page1.html", "skipped")]
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["render_chunks_bisected"] == 2
+    assert metrics["pages_skipped"] == 1
+
+    phased = config.model_copy(update={"volume_max_pages": None})
+    manuals = render_sections(phased, load_flattened(phased))
+    assert len(PdfReader(str(manuals["SECTION1"])).pages) == 2
+    assert len(PdfReader(str(manuals["SECTION2"])).pages) == 3
+    assert (config.output_dir / FAILED_PAGES_FILE).exists()
+
+    # A build of other pages keeps the report's entries and the metrics it does not report.
+    build_manuals(phased.model_copy(update={"sections": ["SECTION2"]}))
+    report = json.loads((config.output_dir / FAILED_PAGES_FILE).read_text(encoding="utf-8"))
+    assert [Path(page["page"]).name for page in report["pages"]] == ["section1_page1.html"]
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["pages_skipped"] == 1
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", fake_run)
+    build_manuals(phased.model_copy(update={"sections": ["SECTION1"], "pages": ["*page1.html"]}))
+    assert not (config.output_dir / FAILED_PAGES_FILE).exists()
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_interrupted_build_resumes_from_journal(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fake_run = WkhtmlRenderer._run
+    record_merge = BuildJournal.record_merge
+    section1_merged = threading.Event()
+
+    def recording_merge(self: BuildJournal, section: str, manual: Path, inputs: list[Path]) -> None:
+        record_merge(self, section, manual, inputs)
+        section1_merged.set()
+
+    def interrupted_run(
+        self: WkhtmlRenderer, args: list[str], timeout: float | None = None
+    ) -> None:
+        if any("SECTION2" in arg for arg in args):
+            section1_merged.wait(10)
+            raise RuntimeError("node pre-empted")
+        fake_run(self, args)
+
+    monkeypatch.setattr(BuildJournal, "record_merge", recording_merge)
+    monkeypatch.setattr(WkhtmlRenderer, "_run", interrupted_run)
+    config = _config(manual_project, tmp_path, chunk_cache_enable=False)
+    with pytest.raises(RuntimeError):
+        build_manuals(config)
+    assert journal_path(config).exists()
+    assert not list((config.output_dir / "Manuals").glob(".*.tmp"))
+
+    resumed = config.model_copy(update={"resume": True})
+    with pytest.raises(ConfigChangedError):
+        build_manuals(resumed.model_copy(update={"zoom": 1.5}))
+
+    rendered: list[list[str]] = []
+
+    def recording_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        rendered.append(args)
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", recording_run)
+    # Limits only govern how this run renders, so changing them keeps the journal.
+    manuals = build_manuals(resumed.model_copy(update={"render_timeout": 60, "render_retries": 0}))
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert len(rendered) == 1 and all("SECTION1" not in arg for arg in rendered[0])
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["resumed_sections"] == 1
+    assert metrics["resumed_flattens"] == 3
+    assert not journal_path(config).exists()
+
+
+def test_journal_merge_unit_checks_pages_and_manual(manual_project: Path, tmp_path: Path) -> None:
+    config = _config(manual_project, tmp_path)
+    pages = sorted((manual_project / "Contents").glob("section1_*.html"))
+    manual = tmp_path / "SECTION1.pdf"
+    manual.write_bytes(b"%PDF-1.4")
+    journal = BuildJournal.start(config)
+    journal.record_merge("SECTION1", manual, pages)
+    journal.close()
+
+    resumed = BuildJournal.start(config.model_copy(update={"resume": True}))
+    assert resumed.merged("SECTION1", pages) == manual
+    assert resumed.merged("SECTION1", pages[:2]) is None
+    pages[0].write_text("<p>changed</p>", encoding="utf-8")
+    assert resumed.merged("SECTION1", pages) is None
+    resumed.finish()
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_journal_batches_disk_syncs(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fsync = os.fsync
+    synced: list[int] = []
+    units: list[str] = []
+    record = BuildJournal._record
+
+    def counting_fsync(fd: int) -> None:
+        synced.append(fd)
+        fsync(fd)
+
+    def counting_record(
+        self: BuildJournal, kind: str, key: str, sync: bool = False, **fields: Any
+    ) -> None:
+        units.append(kind)
+        record(self, kind, key, sync, **fields)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    monkeypatch.setattr(BuildJournal, "_record", counting_record)
+    build_manuals(_config(manual_project, tmp_path, chunk_cache_enable=False))
+    assert units.count("merge") == 2
+    assert units.count("merge") <= len(synced) < len(units)
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_trace_records_build_timeline(manual_project: Path, tmp_path: Path) -> None:
+    config = _config(
+        manual_project, tmp_path, chunk_cache_enable=False, chunk_size=2, render_workers=2
+    )
+    trace_path = tmp_path / "trace.json"
+    with tracing.recording(trace_path):
+        build_manuals(config)
+
+    events = json.loads(trace_path.read_text(encoding="utf-8"))["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = {
+        event["tid"]: event["args"]["name"] for event in events if event["name"] == "thread_name"
+    }
+    assert all(event["pid"] == os.getpid() and event["tid"] in names for event in spans)
+    counts = Counter((event["cat"], event["name"]) for event in spans)
+    assert counts[("menu", "parse_menu")] == 1
+    assert counts[("flatten", "flatten")] == counts[("transform", "overflow")] == 6
+    assert counts[("chunk", "render_chunk")] == counts[("render", "wkhtmltopdf")] == 4
+    assert counts[("merge", "merge")] == 2
+    chunks = [event for event in spans if event["name"] == "render_chunk"]
+    assert {event["args"]["worker"] for event in chunks} <= {0, 1}
+    subprocesses = [event for event in spans if event["name"] == "wkhtmltopdf"]
+    assert all(
+        any(chunk["tid"] == run["tid"] and chunk["ts"] <= run["ts"] for chunk in chunks)
+        for run in subprocesses
+    )
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_memory_budget_throttles_render_dispatch(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fake_run = WkhtmlRenderer._run
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def counting_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        try:
+            time.sleep(0.05)
+            fake_run(self, args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", counting_run)
+    monkeypatch.setattr(
+        MemoryGovernor, "usage", lambda self: (300 if self.running("render") else 50) * MB
+    )
+    overrides: dict[str, Any] = {"memory_budget_mb": 256, "memory_sample_interval": 0.01}
+    config = _config(
+        manual_project,
+        tmp_path,
+        chunk_cache_enable=False,
+        chunk_size=1,
+        render_workers=3,
+        **overrides,
+    )
+    manuals = build_manuals(config)
+
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert most[0] == 1
+    metrics = json.loads((config.output_dir / METRICS_FILE).read_text(encoding="utf-8"))
+    assert metrics["memory_throttled_render"] >= 1
+    assert metrics["peak_rss_mb"] == metrics["peak_rss_mb_render"] == 300
+    assert metrics["peak_rss_mb_flatten"] >= 50
+    assert metrics["peak_rss_mb_merge"] >= 50
+
+
+def test_memory_governor_counts_grandchild_processes() -> None:
+    script = (
+        "import subprocess, sys, time; "
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']); "
+        "time.sleep(30)"
+    )
+    child = subprocess.Popen([sys.executable, "-c", script])
+    try:
+        deadline = time.monotonic() + 10
+        while not descendant_pids(child.pid) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        grandchildren = descendant_pids(child.pid)
+        assert len(grandchildren) == 1
+        assert {child.pid, *grandchildren} <= set(descendant_pids())
+    finally:
+        for pid in descendant_pids(child.pid):
+            os.kill(pid, 9)
+        child.kill()
+        child.wait()
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_variants_share_one_memory_governor(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    monitor = MemoryGovernor.monitor
+    governors: set[int] = set()
+
+    def recording_monitor(self: MemoryGovernor, metrics: Any) -> Any:
+        governors.add(id(self))
+        return monitor(self, metrics)
+
+    monkeypatch.setattr(MemoryGovernor, "monitor", recording_monitor)
+    variants = [{"name": "a4"}, {"name": "letter", "page_size": "Letter"}]
+    config = _config(manual_project, tmp_path, memory_budget_mb=4096, variants=variants)
+    build_manuals(config)
+
+    assert len(governors) == 1
+    for name in ("a4", "letter"):
+        metrics = json.loads(
+            (config.output_dir / "variants" / name / METRICS_FILE).read_text(encoding="utf-8")
+        )
+        assert metrics["peak_rss_mb"] > 0
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_variants_render_from_one_flatten_pass(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    fake_run = WkhtmlRenderer._run
+    lock = threading.Lock()
+    rendered: list[list[str]] = []
+    running = [0]
+    most = [0]
+
+    def recording_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        with lock:
+            rendered.append(args)
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        try:
+            time.sleep(0.02)
+            fake_run(self, args)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", recording_run)
+    variants = [{"name": "a4"}, {"name": "letter", "page_size": "Letter", "zoom": 1.5}]
+    config = _config(manual_project, tmp_path, chunk_size=1, render_workers=2, variants=variants)
+    manuals = build_manuals(config)
+
+    assert sorted(manuals) == ["a4/SECTION1", "a4/SECTION2", "letter/SECTION1", "letter/SECTION2"]
+    for name in ("a4", "letter"):
+        assert (
+            manuals[f"{name}/SECTION1"]
+            == config.output_dir / "variants" / name / "Manuals" / "SECTION1.pdf"
+        )
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
+    assert len(rendered) == 12 and most[0] <= 2
+    assert sum("Letter" in args and "1.5" in args for args in rendered) == 6
+    assert len(list((config.output_dir / "flattened").rglob("*.html"))) == 6
+    metrics = [
+        json.loads(
+            (config.output_dir / "variants" / name / METRICS_FILE).read_text(encoding="utf-8")
+        )
+        for name in ("a4", "letter")
+    ]
+    assert sum(values.get("pages_flattened", 0) for values in metrics) == 6
+    assert sum(values.get("variant_flattens_shared", 0) for values in metrics) == 6
+
+    with pytest.raises(ValueError):
+        _config(manual_project, tmp_path, variants=[{"name": "a4"}, {"name": "a4", "zoom": 2}])
+
+
+def test_variants_resolve_auto_renderer_from_top_level_calibration(
+    manual_project: Path, tmp_path: Path
+) -> None:
+    variants = [
+        {"name": "a4"},
+        {"name": "letter", "renderer": "wkhtmltopdf"},
+        {"name": "a5", "renderer": "auto"},
+    ]
+    config = _config(manual_project, tmp_path, renderer="auto", variants=variants)
+    calibration = calibration_path(config)
+    calibration.parent.mkdir(parents=True)
+    calibration.write_text(json.dumps({"chosen": "playwright"}), encoding="utf-8")
+    renderers = {name: variant.renderer for name, variant in variant_configs(config).items()}
+    assert renderers == {"a4": "playwright", "letter": "wkhtmltopdf", "a5": "playwright"}
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from html2manual.progress import LogProgressReporter, ProgressTracker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_tracker_reports_rate_and_eta() -> None:
+    clock = FakeClock()
+    tracker = ProgressTracker(clock=clock)
+    tracker.add_total("render", 100)
+    clock.now = 10.0
+    tracker.advance("render", 25, nbytes=2_000)
+    render = {stage.stage: stage for stage in tracker.snapshot()}["render"]
+    assert render.done == 25
+    assert render.rate == 2.5
+    assert render.byte_rate == 200
+    assert render.eta == 30.0
+
+
+def test_tracker_is_consistent_under_concurrency() -> None:
+    tracker = ProgressTracker()
+    tracker.add_total("flatten", 8_000)
+
+    def work() -> None:
+        for _ in range(1_000):
+            tracker.advance("flatten", nbytes=3)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    flatten = tracker.snapshot()[0]
+    assert (flatten.done, flatten.bytes, flatten.eta) == (8_000, 24_000, 0.0)
+
+
+def test_log_reporter_emits_final_snapshot(monkeypatch: pytest.MonkeyPatch) -> None:
+    events: list[dict[str, object]] = []
+    monkeypatch.setattr(
+        "html2manual.progress.LOGGER.info",
+        lambda event, **fields: events.append({"event": event, **fields}),
+    )
+    tracker = ProgressTracker()
+    tracker.add_total("merge", 2)
+    with LogProgressReporter(tracker, interval=60):
+        tracker.advance("merge", nbytes=10)
+    merge = [event for event in events if event["stage"] == "merge"]
+    assert merge and merge[-1]["done"] == 1 and merge[-1]["total"] == 2
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import time
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from pypdf import PdfReader
+
+from html2manual.calibration import calibrate, calibration_path
+from html2manual.config import Html2ManualConfig
+from html2manual.pipeline import build_manuals, parse_sections
+from html2manual.render import registry
+from html2manual.render.wkhtml import WkhtmlRenderer
+
+ENGINES = """
+from pathlib import Path
+
+from pypdf import PdfWriter
+
+RENDERED = []
+
+
+class FastEngine:
+    name = "fast"
+
+    def __init__(self, config, cache):
+        self.pages = 1
+
+    def cache_identity(self):
+        return {"renderer": self.name}
+
+    def render(self, section_name, html_files, output_dir):
+        RENDERED.extend(html_files)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        writer = PdfWriter()
+        for _ in range(len(html_files) if self.pages else 1):
+            writer.add_blank_page(width=10, height=10)
+        output = output_dir / f"{section_name}.pdf"
+        with output.open("wb") as handle:
+            writer.write(handle)
+        return [output]
+
+
+class LossyEngine(FastEngine):
+    name = "lossy"
+
+    def __init__(self, config, cache):
+        self.pages = 0
+"""
+
+
+@pytest.fixture()
+def plugin_engines(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> List[Path]:
+    plugins = tmp_path / "plugins"
+    plugins.mkdir()
+    (plugins / "fake_engines.py").write_text(ENGINES, encoding="utf-8")
+    monkeypatch.syspath_prepend(str(plugins))
+    entry_points = [
+        EntryPoint("fast", "fake_engines:FastEngine", registry.RENDERER_GROUP),
+        EntryPoint("lossy", "fake_engines:LossyEngine", registry.RENDERER_GROUP),
+        EntryPoint("wkhtmltopdf", "fake_engines:LossyEngine", registry.RENDERER_GROUP),
+    ]
+    monkeypatch.setattr(registry, "_load_renderer_entry_points", lambda: entry_points)
+    import fake_engines  # type: ignore[import-not-found]
+
+    rendered: List[Path] = fake_engines.RENDERED
+    return rendered
+
+
+def test_plugins_register_without_replacing_builtins(plugin_engines: List[Path]) -> None:
+    factories = registry.renderer_factories()
+    assert list(factories) == ["wkhtmltopdf", "playwright", "fast", "lossy"]
+    assert factories["wkhtmltopdf"].__name__ == "make_wkhtml_renderer"
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_calibration_picks_fastest_correct_engine_for_auto_builds(
+    monkeypatch: pytest.MonkeyPatch,
+    manual_project: Path,
+    tmp_path: Path,
+    plugin_engines: List[Path],
+) -> None:
+    fake_run = WkhtmlRenderer._run
+
+    def slow_run(self: WkhtmlRenderer, args: list[str], timeout: float | None = None) -> None:
+        time.sleep(0.2)
+        fake_run(self, args)
+
+    monkeypatch.setattr(WkhtmlRenderer, "_run", slow_run)
+    overrides: dict[str, Any] = {"renderer": "auto", "calibration_pages": 4}
+    config = Html2ManualConfig(input_dir=manual_project, output_dir=tmp_path / "build", **overrides)
+    result = calibrate(config, parse_sections(config))
+
+    outcomes = {engine.name: engine.passed for engine in result.engines}
+    assert outcomes == {"wkhtmltopdf": True, "playwright": False, "fast": True, "lossy": False}
+    assert result.chosen == "fast"
+    assert len(result.sample) == 4
+    assert json.loads(calibration_path(config).read_text(encoding="utf-8"))["chosen"] == "fast"
+
+    plugin_engines.clear()
+    manuals = build_manuals(config.model_copy(update={"chunk_cache_enable": False}))
+    assert len(plugin_engines) == 6
+    assert all(len(PdfReader(str(pdf)).pages) == 3 for pdf in manuals.values())
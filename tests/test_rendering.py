@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import os
+import sys
+import threading
 from pathlib import Path
+from typing import Any
 
 import pytest
-from pypdf import PdfWriter
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, NameObject
 
+from html2manual.render.cache import ChunkCache
+from html2manual.render.concat import PAGE_CLASS, concatenate_pages
 from html2manual.render.merge import PdfMerger
-from html2manual.render.wkhtml import WkhtmlRenderer
+from html2manual.render.optimize import PdfOptimizer
+from html2manual.render.wkhtml import RenderProcessKilled, WkhtmlRenderer
 
 
 def _write_dummy_pdf(path: Path) -> None:
@@ -25,7 +33,7 @@ def test_wkhtml_renderer_chunks(monkeypatch: pytest.MonkeyPatch, tmp_path: Path)
         html.write_text("<html></html>", encoding="utf-8")
         html_files.append(html)
 
-    def fake_run(args: list[str]) -> None:
+    def fake_run(args: list[str], timeout: float | None = None) -> None:
         _write_dummy_pdf(Path(args[-1]))
 
     monkeypatch.setattr(renderer, "_run", fake_run)
@@ -44,3 +52,215 @@ def test_pdf_merger(tmp_path: Path) -> None:
     merged = merger.merge([pdf1, pdf2], tmp_path / "merged.pdf")
     assert merged.exists()
     assert merged.read_bytes().startswith(b"%PDF")
+
+
+def test_wkhtml_renderer_reuses_cached_chunks(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    cache = ChunkCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    renderer = WkhtmlRenderer(chunk_size=2, cache=cache)
+    renderer.executable = Path("/usr/bin/wkhtmltopdf")
+    monkeypatch.setattr(renderer, "cache_identity", lambda: {"renderer": "fake"})
+    html_files = []
+    for idx in range(3):
+        html = tmp_path / f"file{idx}.html"
+        html.write_text(f"<html>{idx}</html>", encoding="utf-8")
+        html_files.append(html)
+    calls: list[list[str]] = []
+
+    def fake_run(args: list[str], timeout: float | None = None) -> None:
+        calls.append(args)
+        _write_dummy_pdf(Path(args[-1]))
+
+    monkeypatch.setattr(renderer, "_run", fake_run)
+    renderer.render("section", html_files, tmp_path / "out")
+    assert len(calls) == 2
+
+    html_files[2].write_text("<html>changed</html>", encoding="utf-8")
+    outputs = renderer.render("section", html_files, tmp_path / "again")
+    assert len(calls) == 3
+    assert cache.hits == 1
+    assert all(pdf.exists() for pdf in outputs)
+
+
+def test_chunk_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    source = tmp_path / "chunk.pdf"
+    _write_dummy_pdf(source)
+    size = source.stat().st_size
+    cache = ChunkCache(tmp_path / "cache", max_bytes=size * 2)
+    for index, key in enumerate(["aa01", "bb02", "cc03"]):
+        cache.store(key, source)
+        entry = tmp_path / "cache" / key[:2] / f"{key}.pdf"
+        if entry.exists():
+            os.utime(entry, (index, index))
+    assert not cache.fetch("aa01", tmp_path / "miss.pdf")
+    assert cache.fetch("cc03", tmp_path / "hit.pdf")
+
+
+def test_chunk_cache_only_scans_when_over_its_cap(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    source = tmp_path / "chunk.pdf"
+    _write_dummy_pdf(source)
+    cache = ChunkCache(tmp_path / "cache", max_bytes=source.stat().st_size * 2)
+    scan = ChunkCache._scan_locked
+    scans: list[int] = []
+
+    def counting_scan(self: ChunkCache) -> Any:
+        scans.append(1)
+        return scan(self)
+
+    monkeypatch.setattr(ChunkCache, "_scan_locked", counting_scan)
+    for key in ("aa01", "bb02", "aa01"):
+        cache.store(key, source)
+    assert len(scans) == 1
+    cache.store("cc03", source)
+    assert len(scans) == 2
+    assert len(list((tmp_path / "cache").glob("*/*.pdf"))) == 2
+
+
+def test_pdf_optimizer_deduplicates_merged_chunks(tmp_path: Path) -> None:
+    chunks = []
+    for index in range(3):
+        chunk = tmp_path / f"chunk{index}.pdf"
+        writer = PdfWriter()
+        page = writer.add_blank_page(width=100, height=100)
+        font = DecodedStreamObject()
+        font.set_data(b"FONTDATA" * 2000)
+        page[NameObject("/Font")] = writer._add_object(font)
+        with chunk.open("wb") as handle:
+            writer.write(handle)
+        chunks.append(chunk)
+    merged = PdfMerger().merge(chunks, tmp_path / "merged.pdf")
+    result = PdfOptimizer().optimize(merged)
+    assert result.bytes_after < result.bytes_before
+    assert len(PdfReader(str(merged)).pages) == 3
+
+
+def test_pdf_optimizer_keeps_original_when_writing_fails(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    merged = tmp_path / "merged.pdf"
+    _write_dummy_pdf(merged)
+    original = merged.read_bytes()
+
+    def fail(self: PdfWriter, stream: object) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(PdfWriter, "write", fail)
+    with pytest.raises(OSError):
+        PdfOptimizer().optimize(merged)
+    assert merged.read_bytes() == original
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["merged.pdf"]
+
+
+def test_wkhtml_run_kills_process_after_timeout() -> None:
+    renderer = WkhtmlRenderer(timeout=0.5)
+    with pytest.raises(RenderProcessKilled) as excinfo:
+        renderer._run([sys.executable, "-c", "import time; time.sleep(30)"])
+    assert "timeout" in excinfo.value.reason
+
+
+def test_wkhtml_render_chunk_retries_failures(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    renderer = WkhtmlRenderer(retries=2, retry_backoff=0)
+    renderer.executable = Path("/usr/bin/wkhtmltopdf")
+    html = tmp_path / "page.html"
+    html.write_text("<html></html>", encoding="utf-8")
+    attempts: list[int] = []
+
+    def flaky_run(args: list[str], timeout: float | None = None) -> None:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RenderProcessKilled(args, "rss above 1MB")
+        _write_dummy_pdf(Path(args[-1]))
+
+    monkeypatch.setattr(renderer, "_run", flaky_run)
+    assert renderer.render_chunk([html], tmp_path / "out.pdf").exists()
+    assert len(attempts) == 3
+
+
+def test_concatenate_pages_hoists_shared_styles(tmp_path: Path) -> None:
+    pages = []
+    shared_css = "p { color: red; }" + " .x { margin: 0; }" * 50
+    for idx in range(3):
+        page = tmp_path / f"page{idx}.html"
+        page.write_text(
+            f"<html><head><style>{shared_css}</style></head>"
+            f"<body class='topic' style='margin:0'><p>Page {idx}</p></body></html>",
+            encoding="utf-8",
+        )
+        pages.append(page)
+
+    result = concatenate_pages(pages, tmp_path / "combined.html")
+
+    html = result.path.read_text(encoding="utf-8")
+    assert html.count(shared_css) == 1
+    assert result.head_blocks_deduplicated == 2
+    assert html.count(f'class="{PAGE_CLASS} topic"') == 3
+    assert html.index("Page 0") < html.index("Page 1") < html.index("Page 2")
+    assert "page-break-before: always" in html
+    assert result.bytes_after < result.bytes_before
+
+
+def test_wkhtml_concat_mode_renders_one_document(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    renderer = WkhtmlRenderer(concat_pages=True)
+    renderer.executable = Path("/usr/bin/wkhtmltopdf")
+    html_files = []
+    for idx in range(3):
+        html = tmp_path / f"file{idx}.html"
+        html.write_text(f"<html><body>{idx}</body></html>", encoding="utf-8")
+        html_files.append(html)
+    documents: list[str] = []
+
+    def fake_run(args: list[str], timeout: float | None = None) -> None:
+        documents.append(Path(args[-2]).read_text(encoding="utf-8"))
+        _write_dummy_pdf(Path(args[-1]))
+
+    monkeypatch.setattr(renderer, "_run", fake_run)
+    assert renderer.render_chunk(html_files, tmp_path / "out" / "section.pdf").exists()
+    assert len(documents) == 1
+    assert documents[0].count("data-source=") == 3
+    assert f'<base href="{tmp_path.as_uri()}/">' in documents[0]
+    assert sorted(path.name for path in tmp_path.glob("*.html")) == [
+        "file0.html",
+        "file1.html",
+        "file2.html",
+    ]
+    assert [path.name for path in (tmp_path / "out").iterdir()] == ["section.pdf"]
+
+
+def test_wkhtml_concat_documents_are_unique_per_render(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    html_files = []
+    for idx in range(2):
+        html = tmp_path / f"file{idx}.html"
+        html.write_text(f"<html><body>{idx}</body></html>", encoding="utf-8")
+        html_files.append(html)
+    both_running = threading.Barrier(2, timeout=10)
+    documents: list[str] = []
+
+    def fake_run(args: list[str], timeout: float | None = None) -> None:
+        documents.append(args[-2])
+        both_running.wait()
+        _write_dummy_pdf(Path(args[-1]))
+
+    # Variants render the same flattened pages to outputs with the same name.
+    renders = []
+    for variant in ("a4", "letter"):
+        renderer = WkhtmlRenderer(concat_pages=True)
+        renderer.executable = Path("/usr/bin/wkhtmltopdf")
+        monkeypatch.setattr(renderer, "_run", fake_run)
+        output = tmp_path / variant / "section.pdf"
+        renders.append(threading.Thread(target=renderer.render_chunk, args=(html_files, output)))
+    for thread in renders:
+        thread.start()
+    for thread in renders:
+        thread.join()
+    assert len(set(documents)) == 2
+    assert all((tmp_path / variant / "section.pdf").exists() for variant in ("a4", "letter"))
+    assert sorted(path.name for path in tmp_path.glob("*.html")) == ["file0.html", "file1.html"]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from html2manual.dedupe import DuplicateIndex
+from html2manual.scheduling import (
+    HISTORY_FILE,
+    PageCostEstimator,
+    RenderHistory,
+    balanced_chunks,
+    lpt_makespan,
+    stable_chunks,
+)
+
+
+def test_balanced_chunks_keep_order_and_split_expensive_pages() -> None:
+    pages = [Path(f"p{index}.html") for index in range(6)]
+    costs = {page: 1.0 for page in pages}
+    costs[pages[1]] = 5.0
+    chunks = balanced_chunks(pages, costs, chunk_size=3, target_seconds=3.0)
+    assert [page for chunk in chunks for page in chunk] == pages
+    assert chunks == [[pages[0]], [pages[1]], pages[2:5], [pages[5]]]
+
+
+def test_lpt_makespan_balances_longest_first() -> None:
+    assert lpt_makespan([4, 3, 3, 2], workers=2) == 6
+    assert lpt_makespan([2, 2], workers=4) == 2
+
+
+def test_history_overrides_size_estimate(tmp_path: Path) -> None:
+    page = tmp_path / "page.html"
+    page.write_text("<p>x</p>", encoding="utf-8")
+    history = RenderHistory(tmp_path / HISTORY_FILE)
+    estimator = PageCostEstimator(history)
+    assert estimator.seconds("A", page) == pytest.approx(
+        estimator.model.render_base_seconds, rel=0.01
+    )
+    history.record(RenderHistory.key("A", page), 4.0)
+    history.record(RenderHistory.key("A", page), 2.0)
+    history.save()
+    assert PageCostEstimator(RenderHistory(tmp_path / HISTORY_FILE)).seconds("A", page) == 3.0
+
+
+def test_stable_chunks_keep_boundaries_until_timings_drift(tmp_path: Path) -> None:
+    pages = [Path(f"p{index}.html") for index in range(4)]
+    history = RenderHistory(tmp_path / HISTORY_FILE)
+    costs = {page: 1.0 for page in pages}
+    first, reused = stable_chunks("A", pages, costs, 3, 2.0, history)
+    assert (first, reused) == ([pages[:2], pages[2:]], False)
+
+    costs[pages[1]] = 1.2
+    assert stable_chunks("A", pages, costs, 3, 2.0, history) == (first, True)
+
+    costs[pages[0]] = 3.0
+    costs[pages[1]] = 1.0
+    chunks, reused = stable_chunks("A", pages, costs, 3, 2.0, history)
+    assert (chunks, reused) == ([[pages[0]], pages[1:3], [pages[3]]], False)
+    history.save()
+    plan = RenderHistory(tmp_path / HISTORY_FILE).plan("A/p0.html")
+    assert plan == [["p0.html"], ["p1.html", "p2.html"], ["p3.html"]]
+
+
+def test_duplicate_index_only_splits_shared_pages_off_chunk_edges() -> None:
+    pages = [Path(f"p{index}.html") for index in range(6)]
+    keys = {page: page.name for page in pages}
+    # p0 and p2 also occur in another section.
+    index = DuplicateIndex(keys, [*pages, pages[0], pages[2]])
+    assert index.split(pages, 3) == [
+        ([pages[0]], "p0.html"),
+        ([pages[1]], None),
+        ([pages[2]], "p2.html"),
+        (pages[3:], None),
+    ]
+    assert index.split(pages, 6) == [([pages[0]], "p0.html"), (pages[1:], None)]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import urllib.error
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from html2manual.config import Html2ManualConfig
+from html2manual.render.playwright import PlaywrightRenderer
+from html2manual.server import RenderServer
+
+
+def _request(url: str, payload: Dict[str, Any] | None = None) -> bytes:
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    with urllib.request.urlopen(url, data=data, timeout=30) as response:
+        return response.read()
+
+
+def _post_job(url: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [json.loads(line) for line in _request(url, payload).splitlines()]
+
+
+def _status(url: str, payload: Dict[str, Any] | None = None) -> int:
+    try:
+        _request(url, payload)
+    except urllib.error.HTTPError as exc:
+        return exc.code
+    return 200
+
+
+def _config(manual_project: Path, tmp_path: Path, **overrides: Any) -> Html2ManualConfig:
+    return Html2ManualConfig(
+        input_dir=manual_project,
+        output_dir=tmp_path / "build",
+        playwright_fallback=False,
+        **overrides,
+    )
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_section_job_streams_events_and_serves_pdf(manual_project: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        server = RenderServer(_config(manual_project, tmp_path))
+        host, port = await server.start()
+        base = f"http://{host}:{port}"
+        try:
+            events = await asyncio.to_thread(_post_job, f"{base}/jobs", {"section": "SECTION2"})
+            types = [event["type"] for event in events]
+            assert types[:2] == ["JobQueued", "JobStarted"]
+            assert types.count("PageFlattened") == 3
+            assert "SectionMerged" in types
+            finished = events[-1]
+            assert finished["type"] == "JobFinished"
+            assert finished["manuals"] == {"SECTION2": "/manuals/SECTION2.pdf"}
+            pdf = await asyncio.to_thread(_request, base + finished["manuals"]["SECTION2"])
+            assert len(PdfReader(BytesIO(pdf)).pages) == 3
+
+            # The second job reuses the warm chunk cache.
+            again = await asyncio.to_thread(_post_job, f"{base}/jobs", {"section": "SECTION2"})
+            assert again[-1]["type"] == "JobFinished"
+            health = json.loads(await asyncio.to_thread(_request, f"{base}/health"))
+            assert health["chunk_cache_hits"] >= 1
+            assert health["running"] == 0
+        finally:
+            await server.close()
+        assert not (tmp_path / "build" / "Manuals" / "SECTION1.pdf").exists()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.usefixtures("fake_wkhtml")
+def test_server_rejects_unknown_routes_and_full_queue(manual_project: Path, tmp_path: Path) -> None:
+    async def scenario() -> None:
+        server = RenderServer(_config(manual_project, tmp_path, serve_max_queued=0))
+        host, port = await server.start()
+        base = f"http://{host}:{port}"
+        try:
+            assert await asyncio.to_thread(_status, f"{base}/jobs", {"section": "NOPE"}) == 404
+            assert await asyncio.to_thread(_status, f"{base}/manuals/../../secret.pdf") == 404
+            assert await asyncio.to_thread(_status, f"{base}/manuals/SECTION1.pdf") == 404
+            async with server._slots:
+                assert await asyncio.to_thread(_status, f"{base}/jobs", {}) == 503
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_playwright_engine_stays_warm_between_jobs(
+    monkeypatch: pytest.MonkeyPatch, manual_project: Path, tmp_path: Path
+) -> None:
+    engines: List[PlaywrightRenderer] = []
+    closed: List[PlaywrightRenderer] = []
+
+    def fake_render(
+        self: PlaywrightRenderer, section_name: str, html_files: List[Path], output_dir: Path
+    ) -> List[Path]:
+        engines.append(self)
+        output = output_dir / f"{section_name}.pdf"
+        writer = PdfWriter()
+        for _ in html_files:
+            writer.add_blank_page(width=10, height=10)
+        with output.open("wb") as handle:
+            writer.write(handle)
+        return [output]
+
+    monkeypatch.setattr(PlaywrightRenderer, "render", fake_render)
+    monkeypatch.setattr(PlaywrightRenderer, "close", lambda self: closed.append(self))
+
+    async def scenario() -> None:
+        config = _config(manual_project, tmp_path, renderer="playwright", chunk_cache_enable=False)
+        server = RenderServer(config)
+        host, port = await server.start()
+        try:
+            for _ in range(2):
+                events = await asyncio.to_thread(
+                    _post_job, f"http://{host}:{port}/jobs", {"section": "SECTION1"}
+                )
+                assert events[-1]["type"] == "JobFinished"
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+    assert len(engines) >= 2 and len(set(map(id, engines))) == 1
+    assert engines[0].keep_browser and closed == engines[:1]